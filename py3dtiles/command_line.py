@@ -1,6 +1,28 @@
 import argparse
-
-from py3dtiles import convert, export, info, merger
+import importlib
+import sys
+from typing import Optional
+
+# The module and the help of each command. Only the module of the command that is run is
+# imported, so that a command doesn't load the dependencies of the others (zmq, numba,
+# laspy...), which matters when a light command like info is called by scripts.
+COMMANDS = {
+    "convert": ("py3dtiles.convert", "Convert input 3D data to a 3dtiles tileset."),
+    "info": ("py3dtiles.info", "Extract information from a 3DTiles file"),
+    "merge": (
+        "py3dtiles.merger",
+        "Merge several pointcloud tilesets in 1 tileset. All input tilesets must be relative to the output tileset.",
+    ),
+    "export": ("py3dtiles.export", "Generate a tileset from a set of geometries"),
+}
+
+
+def _get_command(argv: list[str]) -> Optional[str]:
+    """
+    Returns the command of the command line arguments, the first argument that isn't an
+    option (the main parser has no option with a value).
+    """
+    return next((arg for arg in argv if not arg.startswith("-")), None)
 
 
 def main() -> None:
@@ -10,29 +32,24 @@ def main() -> None:
     )
     sub_parsers = parser.add_subparsers(dest="command")
 
-    # init subparsers
-    command_parsers = [
-        convert._init_parser(sub_parsers),
-        info._init_parser(sub_parsers),
-        merger._init_parser(sub_parsers),
-        export._init_parser(sub_parsers),
-    ]
-    # add the verbose argument for all sub-parsers so that it is after the command.
-    for command_parser in command_parsers:
-        command_parser.add_argument("--verbose", "-v", action="count", default=0)
+    # init subparsers: the parser of the other commands only lists them in the help
+    command = _get_command(sys.argv[1:])
+    command_module = None
+    for name, (module_name, command_help) in COMMANDS.items():
+        if name == command:
+            command_module = importlib.import_module(module_name)
+            command_parser = command_module._init_parser(sub_parsers)
+            # add the verbose argument so that it is after the command.
+            command_parser.add_argument("--verbose", "-v", action="count", default=0)
+        else:
+            sub_parsers.add_parser(name, help=command_help)
 
     args = parser.parse_args()
 
-    if args.command == "convert":
-        convert._main(args)
-    elif args.command == "info":
-        info._main(args)
-    elif args.command == "merge":
-        merger._main(args)
-    elif args.command == "export":
-        export._main(args)
-    else:
+    if command_module is None:
         parser.print_help()
+    else:
+        command_module._main(args)
 
 
 if __name__ == "__main__":
@@ -6,11 +6,15 @@ import sys
 import tempfile
 import time
 import traceback
+from collections.abc import Generator, Sequence
+from dataclasses import replace
 from multiprocessing import Process, cpu_count
 from pathlib import Path
 from time import sleep
 from typing import Any, Optional, Union
 
+import numpy as np
+import numpy.typing as npt
 import psutil
 import zmq
 from pyproj import CRS
@@ -22,25 +26,25 @@ from py3dtiles.exceptions import (
     TilerException,
     WorkerException,
 )
+from py3dtiles.reader import xyz_reader
+from py3dtiles.reader.array_reader import PointArrayType, PointStream
+from py3dtiles.reader.point_filter import PointFilter, read_geojson_polygon
 from py3dtiles.tilers.base_tiler import Tiler
 from py3dtiles.tilers.base_tiler.message_type import ManagerMessage, WorkerMessageType
 from py3dtiles.tilers.base_tiler.tiler_worker import TilerWorker
-from py3dtiles.tilers.point.point_tiler import PointTiler
+from py3dtiles.tilers.point.point_tiler import PREVIEW_MAX_DEPTH, PointTiler
+from py3dtiles.tilers.point.tiling_profile import (
+    TILING_PROFILES,
+    PointSelection,
+    TilingProfile,
+    get_tiling_profile,
+)
 from py3dtiles.utils import mkdir_or_raise, str_to_CRS
 
 TOTAL_MEMORY_MB = int(psutil.virtual_memory().total / (1024 * 1024))
 DEFAULT_CACHE_SIZE = int(TOTAL_MEMORY_MB / 10)
 CPU_COUNT = cpu_count()
 
-# IPC protocol is not supported on Windows
-if os.name == "nt":
-    URI = "tcp://127.0.0.1:0"
-else:
-    # Generate a unique name for this socket
-    tmpdir = tempfile.TemporaryDirectory()
-    URI = f"ipc://{tmpdir.name}/py3dtiles.sock"
-
-
 META_TILER_NAME = b"meta"
 
 
@@ -152,8 +156,18 @@ class _ZmqManager:
 
         self.number_of_jobs = number_of_jobs
 
+        # IPC protocol is not supported on Windows
+        self.socket_dir: Optional[tempfile.TemporaryDirectory[str]] = None
+        if os.name == "nt":
+            uri = "tcp://127.0.0.1:0"
+        else:
+            # Generate a unique name for this socket, when the conversion starts rather than
+            # when the module is imported
+            self.socket_dir = tempfile.TemporaryDirectory()
+            uri = f"ipc://{self.socket_dir.name}/py3dtiles.sock"
+
         self.socket = self.context.socket(zmq.ROUTER)
-        self.socket.bind(URI)
+        self.socket.bind(uri)
         # Useful only when TCP is used to get the URI with the opened port
         self.uri = self.socket.getsockopt(zmq.LAST_ENDPOINT)
         if not isinstance(self.uri, bytes):
@@ -231,9 +245,14 @@ class _ZmqManager:
         for p in self.processes:
             p.join()
 
+    def destroy(self) -> None:
+        self.context.destroy()
+        if self.socket_dir is not None:
+            self.socket_dir.cleanup()
+
 
 def convert(
-    files: Union[list[Union[str, Path]], str, Path],
+    files: Union[Sequence[Union[str, Path, PointArrayType]], str, Path, PointArrayType],
     outfolder: Union[str, Path] = "./3dtiles",
     overwrite: bool = False,
     jobs: int = CPU_COUNT,
@@ -249,11 +268,17 @@ def convert(
     color_scale: Optional[float] = None,
     use_process_pool: bool = True,
     verbose: int = False,
+    tiling_profile: Union[TilingProfile, str, None] = None,
+    density_prepass: bool = False,
+    metadata_cache: Union[str, Path, None] = None,
+    reprojection_tolerance: Optional[float] = None,
+    preview: Optional[float] = None,
+    point_filter: Optional[PointFilter] = None,
 ) -> None:
     """
     Convert the input dataset into 3dtiles. For the argument list and their effects, please see :py:class:`.Converter`.
 
-    :param files: Filenames to process. The file must use the .las, .laz, .xyz or .ply format.
+    :param files: Filenames to process. The file must use the .las, .laz, .xyz, .ply or .npy format, or be a raw binary .bin file with a json sidecar (see :py:mod:`py3dtiles.reader.npy_reader`). Points already in memory can be given as numpy arrays, or as a :py:class:`.PointStream` of chunks with a declared aabb and point count: they are copied in shared memory instead of being written to a file (see :py:mod:`py3dtiles.reader.array_reader`).
     :param outfolder: The folder where the resulting tileset will be written.
     :param overwrite: Overwrite the ouput folder if it already exists.
     :param jobs: The number of parallel jobs to start. Default to the number of cpu.
@@ -267,6 +292,12 @@ def convert(
     :param classification: Export classification attribute.
     :param intensity: Export intensity attributes. This support is currently limited to unsigned 8 bits integer for ply files, and to integers for xyz files.
     :param color_scale: Scale the color with the specified amount. Useful to lighten or darken black pointclouds with only intensity.
+    :param tiling_profile: The parameters of the subdivision and of the level of detail, either a :py:class:`.TilingProfile` or the name of a preset ("default", "web" or "desktop"). Default to the "default" preset.
+    :param density_prepass: Sample the input points before the conversion, to adapt the spacing, the grid size and the subdivision to the actual point density. Useful for sparse or irregular datasets.
+    :param metadata_cache: A folder where the metadata of the input files (aabb, point count, crs and portions) are stored, so that the next conversions of the same files don't scan them again. An entry is invalidated when the size or the modification time of its file changes.
+    :param reprojection_tolerance: When crs_out is set, reproject the points by interpolating exact reprojections computed on a grid over the input aabb, with an error lower than this tolerance (in the unit of crs_out). This is several times faster than reprojecting each point. The points are reprojected exactly if the tolerance can't be reached.
+    :param preview: Convert about this percentage of the points (one point out of round(100 / preview) of each portion), and stop the tree at a depth of 8 unless the tiling profile sets a maximum depth. This produces a low resolution tileset in a fraction of the time, to check a dataset before converting it fully.
+    :param point_filter: Convert only the points selected by this :py:class:`.PointFilter`, by their classification, an aabb or a polygon (in the coordinates of the input files). The other points are discarded by the readers.
 
     :raises SrsInMissingException: if py3dtiles couldn't find srs informations in input files and srs_in is not specified
     :raises SrsInMixinException: if the input files have different CRS
@@ -289,6 +320,12 @@ def convert(
         color_scale=color_scale,
         use_process_pool=use_process_pool,
         verbose=verbose,
+        tiling_profile=tiling_profile,
+        density_prepass=density_prepass,
+        metadata_cache=metadata_cache,
+        reprojection_tolerance=reprojection_tolerance,
+        preview=preview,
+        point_filter=point_filter,
     )
     return converter.convert()
 
@@ -296,7 +333,9 @@ def convert(
 class _Convert:
     def __init__(
         self,
-        files: Union[list[Union[str, Path]], str, Path],
+        files: Union[
+            Sequence[Union[str, Path, PointArrayType]], str, Path, PointArrayType
+        ],
         outfolder: Union[str, Path] = "./3dtiles",
         overwrite: bool = False,
         jobs: int = CPU_COUNT,
@@ -312,9 +351,15 @@ class _Convert:
         color_scale: Optional[float] = None,
         use_process_pool: bool = True,
         verbose: int = False,
+        tiling_profile: Union[TilingProfile, str, None] = None,
+        density_prepass: bool = False,
+        metadata_cache: Union[str, Path, None] = None,
+        reprojection_tolerance: Optional[float] = None,
+        preview: Optional[float] = None,
+        point_filter: Optional[PointFilter] = None,
     ) -> None:
         """
-        :param files: Filenames to process. The file must use the .las, .laz, .xyz or .ply format.
+        :param files: Filenames to process. The file must use the .las, .laz, .xyz, .ply or .npy format, or be a raw binary .bin file with a json sidecar (see :py:mod:`py3dtiles.reader.npy_reader`). Points already in memory can be given as numpy arrays, or as a :py:class:`.PointStream` of chunks with a declared aabb and point count: they are copied in shared memory instead of being written to a file (see :py:mod:`py3dtiles.reader.array_reader`).
         :param outfolder: The folder where the resulting tileset will be written.
         :param overwrite: Overwrite the ouput folder if it already exists.
         :param jobs: The number of parallel jobs to start. Default to the number of cpu.
@@ -328,6 +373,12 @@ class _Convert:
         :param classification: Export classification attribute.
         :param intensity: Export intensity attribute.
         :param color_scale: Scale the color with the specified amount. Useful to lighten or darken black pointclouds with only intensity.
+        :param tiling_profile: The parameters of the subdivision and of the level of detail, either a :py:class:`.TilingProfile` or the name of a preset ("default", "web" or "desktop"). Default to the "default" preset.
+        :param density_prepass: Sample the input points before the conversion, to adapt the spacing, the grid size and the subdivision to the actual point density. Useful for sparse or irregular datasets.
+        :param metadata_cache: A folder where the metadata of the input files (aabb, point count, crs and portions) are stored, so that the next conversions of the same files don't scan them again. An entry is invalidated when the size or the modification time of its file changes.
+        :param reprojection_tolerance: When crs_out is set, reproject the points by interpolating exact reprojections computed on a grid over the input aabb, with an error lower than this tolerance (in the unit of crs_out). This is several times faster than reprojecting each point. The points are reprojected exactly if the tolerance can't be reached.
+        :param preview: Convert about this percentage of the points (one point out of round(100 / preview) of each portion), and stop the tree at a depth of 8 unless the tiling profile sets a maximum depth. This produces a low resolution tileset in a fraction of the time, to check a dataset before converting it fully.
+        :param point_filter: Convert only the points selected by this :py:class:`.PointFilter`, by their classification, an aabb or a polygon (in the coordinates of the input files). The other points are discarded by the readers.
 
         :raises SrsInMissingException: if py3dtiles couldn't find srs informations in input files and srs_in is not specified
         :raises SrsInMixinException: if the input files have different CRS
@@ -350,6 +401,12 @@ class _Convert:
                 color_scale,
                 cache_size,
                 verbose,
+                get_tiling_profile(tiling_profile),
+                density_prepass,
+                Path(metadata_cache) if metadata_cache is not None else None,
+                reprojection_tolerance,
+                preview,
+                point_filter,
             )
         ]
 
@@ -372,8 +429,12 @@ class _Convert:
                     crs_out, self.working_dir / str(tiler.name), self.jobs
                 )
             except Py3dtilesException as e:
+                tiler.release()
                 shutil.rmtree(self.out_folder)
                 raise e
+            except Exception:
+                tiler.release()
+                raise
 
             worker_tilers[tiler.name] = tiler.get_worker()
 
@@ -449,12 +510,15 @@ class _Convert:
             self.zmq_manager.shutdown_all_processes()
             self.zmq_manager.join_all_processes()
 
+            for tiler in self.tilers:
+                tiler.release()
+
             if self.verbose >= 1:
                 print(
                     "destroy", round(self.zmq_manager.time_waiting_an_idle_process, 2)
                 )
 
-            self.zmq_manager.context.destroy()
+            self.zmq_manager.destroy()
 
     def process_message(self, tiler: Tiler[Any, Any]) -> bool:
         at_least_one_job_ended = False
@@ -501,7 +565,7 @@ def _init_parser(
     parser.add_argument(
         "files",
         nargs="+",
-        help="Filenames to process. The file must use the .las, .laz (lastools must be installed), .xyz or .ply format.",
+        help="Filenames to process. The file must use the .las, .laz (lastools must be installed), .xyz, .ply or .npy format, or be a raw binary .bin file with a FILE.bin.json sidecar describing its numpy dtype. '-' (the standard input) and named pipes are read as .xyz/.csv text streams, in a single pass (see --aabb).",
     )
     parser.add_argument(
         "--out",
@@ -559,6 +623,90 @@ def _init_parser(
         help="Disables using a process pool when writing 3D tiles. Useful for running in environments lacking shared memory.",
         action="store_true",
     )
+    parser.add_argument(
+        "--tiling-profile",
+        help="The preset of subdivision and level of detail parameters. 'web' produces smaller tiles for web streaming, 'desktop' produces fewer and bigger tiles.",
+        choices=list(TILING_PROFILES),
+        default="default",
+    )
+    parser.add_argument(
+        "--point-selection",
+        help="How the points of each level of detail are selected. 'poisson' keeps the points farther than the spacing from the already kept ones. The voxel based selections keep one point per voxel of the size of the spacing (the first one, the closest to the voxel center or a random one), and are several times faster.",
+        choices=[selection.value for selection in PointSelection],
+        default=PointSelection.POISSON.value,
+    )
+    parser.add_argument(
+        "--quantized-storage",
+        help="Store the point positions of the levels of detail as 16 bits integers in the temporary node storage, to reduce the memory used by the conversion. This is lossy: these points move by up to 10%% of the spacing of their tile. The points of the leaf tiles are kept at full resolution. Not available with the voxel-center and voxel-random point selections.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--remove-duplicates",
+        help="Write a single point of the points of a leaf tile that are closer than this distance (in the unit of the output srs, on a grid of this size), to remove the duplicates of overlapping inputs.",
+        type=float,
+        metavar="DISTANCE",
+    )
+    parser.add_argument(
+        "--density-prepass",
+        help="Sample the input points before the conversion, to adapt the spacing, the grid size and the subdivision to the actual point density.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--metadata-cache",
+        help="A folder where the metadata of the input files are stored, so that the next conversions of the same files start without scanning them again.",
+        type=str,
+    )
+    parser.add_argument(
+        "--aabb",
+        help="The bounding box of the points of the text streams (the standard input and the named pipes), that are not scanned before the conversion. The points outside of it are rejected, and counted with the filtered points.",
+        nargs=6,
+        type=float,
+        metavar=("XMIN", "YMIN", "ZMIN", "XMAX", "YMAX", "ZMAX"),
+    )
+    parser.add_argument(
+        "--reprojection-tolerance",
+        help="Reproject the points by interpolating on a grid of exact reprojections, with an error lower than this tolerance (in the unit of the output srs). Faster than reprojecting each point exactly.",
+        type=float,
+    )
+    parser.add_argument(
+        "--preview",
+        help="Convert only about this percentage of the points (for instance 1 for one point out of 100), with a tree of a limited depth, to quickly check a dataset before converting it.",
+        type=float,
+        metavar="PERCENTAGE",
+    )
+    parser.add_argument(
+        "--max-depth",
+        help=f"The maximum depth of the tree, the root being at depth 0. Default to {PREVIEW_MAX_DEPTH} with --preview, unlimited otherwise.",
+        type=int,
+    )
+    parser.add_argument(
+        "--classes",
+        help="Convert only the points of these classifications.",
+        nargs="+",
+        type=int,
+        metavar="CLASS",
+    )
+    parser.add_argument(
+        "--exclude-classes",
+        help="Don't convert the points of these classifications (for instance 7 18 for the noise).",
+        nargs="+",
+        type=int,
+        default=[],
+        metavar="CLASS",
+    )
+    parser.add_argument(
+        "--crop",
+        help="Convert only the points inside this bounding box, in the coordinates of the input files.",
+        nargs=6,
+        type=float,
+        metavar=("XMIN", "YMIN", "ZMIN", "XMAX", "YMAX", "ZMAX"),
+    )
+    parser.add_argument(
+        "--clip-polygon",
+        help="Convert only the points inside the polygons of this GeoJSON file, in the coordinates of the input files.",
+        type=str,
+        metavar="GEOJSON",
+    )
     parser.add_argument(
         "--pyproj-always-xy",
         help="When converting from a CRS to another, pass the `always_xy` flag to pyproj. This is useful if your data is in a CRS whose definition specifies an axis order other than easting/northing, but your data still have the easting component in the first field (often named X or longitude). See https://pyproj4.github.io/pyproj/stable/gotchas.html#axis-order-changes-in-proj-6 for more information. ",
@@ -568,10 +716,64 @@ def _init_parser(
     return parser
 
 
+def _open_stream(file: str, aabb: Optional[list[float]]) -> Union[str, PointStream]:
+    """
+    Returns the standard input ('-') or a named pipe as a text stream, the other files
+    are returned as they are.
+    """
+    if file != "-" and not Path(file).is_fifo():
+        return file
+
+    if aabb is None:
+        print(
+            f"{file} is read as a stream and can't be scanned, its bounding box must be given with --aabb",
+            file=sys.stderr,
+        )
+        sys.exit(EXIT_CODES.MISSING_ARGS.value)
+
+    return PointStream(_read_text_stream(file), [aabb[:3], aabb[3:]])
+
+
+def _read_text_stream(file: str) -> Generator[npt.NDArray[np.void], None, None]:
+    """
+    Reads the points of the standard input ('-') or of a named pipe, the pipe is closed
+    when the stream is exhausted or fails.
+    """
+    if file == "-":
+        yield from xyz_reader.read_stream(sys.stdin.buffer, file)
+        return
+    with open(file, "rb") as stream:
+        yield from xyz_reader.read_stream(stream, file)
+
+
+def _get_point_filter(args: argparse.Namespace) -> Optional[PointFilter]:
+    """
+    Returns the filter of the points given by the arguments, or None if no point is filtered.
+    """
+    if (
+        args.classes is None
+        and not args.exclude_classes
+        and args.crop is None
+        and args.clip_polygon is None
+    ):
+        return None
+
+    return PointFilter(
+        classifications=args.classes,
+        excluded_classifications=args.exclude_classes,
+        aabb=None if args.crop is None else [args.crop[:3], args.crop[3:]],
+        polygon=(
+            None
+            if args.clip_polygon is None
+            else read_geojson_polygon(Path(args.clip_polygon))
+        ),
+    )
+
+
 def _main(args: argparse.Namespace) -> None:
     try:
         return convert(
-            args.files,
+            [_open_stream(file, args.aabb) for file in args.files],
             outfolder=args.out,
             overwrite=args.overwrite,
             jobs=args.jobs,
@@ -587,6 +789,18 @@ def _main(args: argparse.Namespace) -> None:
             color_scale=args.color_scale,
             use_process_pool=not args.disable_processpool,
             verbose=args.verbose,
+            tiling_profile=replace(
+                get_tiling_profile(args.tiling_profile),
+                point_selection=PointSelection(args.point_selection),
+                quantized_storage=args.quantized_storage,
+                max_depth=args.max_depth,
+                duplicate_point_distance=args.remove_duplicates,
+            ),
+            density_prepass=args.density_prepass,
+            metadata_cache=args.metadata_cache,
+            reprojection_tolerance=args.reprojection_tolerance,
+            preview=args.preview,
+            point_filter=_get_point_filter(args),
         )
     except SrsInMissingException:
         print(
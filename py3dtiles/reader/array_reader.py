@@ -0,0 +1,400 @@
+"""
+Reads points given as numpy arrays in memory, without writing them to a file first.
+
+The points are copied by the manager into a shared memory block, that the workers read like a
+file. A block starts with a npy header (see :py:mod:`numpy.lib.format`) describing the structured
+array that follows it, so that the workers only need the name of the block. The names of the
+blocks end with `SHARED_MEMORY_SUFFIX`, so that they are dispatched to this reader like files.
+
+The arrays are either 1D structured arrays with the fields x, y and z (and optionally red, green,
+blue, classification and intensity, see :py:mod:`py3dtiles.reader.npy_reader`), or (N, 3) arrays of
+coordinates.
+"""
+
+import contextlib
+import io
+import itertools
+import os
+import secrets
+import struct
+from collections.abc import Generator, Iterable, Iterator
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import numpy as np
+import numpy.typing as npt
+from pyproj import Transformer
+
+from py3dtiles.reader import npy_reader
+from py3dtiles.reader.point_filter import PointFilter
+from py3dtiles.typing import MetadataReaderType, OffsetScaleType, PortionItemType
+
+SHARED_MEMORY_SUFFIX = ".shm"
+# the npy magic string and version, followed by the header length (version 2.0)
+NPY_PREFIX_SIZE = 8
+
+
+@dataclass(frozen=True)
+class PointStream:
+    """
+    Points produced chunk by chunk, for instance by a generator.
+
+    The aabb (``[[min x, min y, min z], [max x, max y, max z]]``) is declared, so that the
+    conversion starts without going through the points. The chunks are then pulled when the
+    workers need them and must all have the same dtype.
+
+    If the point count is unknown (for instance for points read from a pipe), the stream is
+    pulled portion by portion until its end, each portion being copied in its own shared
+    memory block. The points of such a stream outside of its aabb are then rejected, otherwise
+    they are an error.
+    """
+
+    chunks: Iterable[npt.NDArray[Any]]
+    aabb: npt.ArrayLike
+    point_count: Optional[int] = None
+
+
+PointArrayType = Union[npt.NDArray[Any], PointStream]
+
+
+class SharedPointArray:
+    """
+    A shared memory block holding the points of an array or of a stream.
+
+    The block is created and filled by the manager: at once for an array, as its portions are
+    sent to the workers for a stream. It must be released at the end of the conversion.
+    """
+
+    def __init__(self, points: PointArrayType) -> None:
+        self.chunks: Optional[Iterator[npt.NDArray[Any]]]
+        self.declared_aabb: Optional[npt.NDArray[np.float64]]
+        if isinstance(points, PointStream):
+            if points.point_count is None:
+                raise ValueError(
+                    "The point count of the stream must be declared, see SharedPointStream."
+                )
+            chunks = iter(points.chunks)
+            first_chunk = next(chunks, None)
+            if first_chunk is None:
+                raise ValueError("The point stream has no chunk.")
+            dtype = _get_dtype(first_chunk)
+            point_count = points.point_count
+            self.chunks = itertools.chain([first_chunk], chunks)
+            self.declared_aabb = np.array(points.aabb, dtype=np.float64)
+        else:
+            dtype = _get_dtype(points)
+            point_count = len(points)
+            self.chunks = None
+            self.declared_aabb = None
+
+        header = io.BytesIO()
+        np.lib.format.write_array_header_2_0(  # type: ignore [no-untyped-call]
+            header,
+            {
+                "descr": np.lib.format.dtype_to_descr(dtype),  # type: ignore [no-untyped-call]
+                "fortran_order": False,
+                "shape": (point_count,),
+            },
+        )
+        header_bytes = header.getvalue()
+
+        # some platforms limit the names of the shared memory blocks to 31 characters
+        self.name = f"py3dtiles_{secrets.token_hex(6)}{SHARED_MEMORY_SUFFIX}"
+        self.shared_memory = SharedMemory(
+            self.name,
+            create=True,
+            size=len(header_bytes) + point_count * dtype.itemsize,
+        )
+        _get_buffer(self.shared_memory)[: len(header_bytes)] = header_bytes
+        self.points = _get_points(self.shared_memory)
+
+        self.filled_point_count = 0
+        if not isinstance(points, PointStream):
+            _copy_points(self.points, points)
+            self.filled_point_count = point_count
+
+    def get_metadata(self) -> MetadataReaderType:
+        if self.declared_aabb is None:
+            return npy_reader.get_points_metadata(self.name, self.points, None)
+
+        point_count = len(self.points)
+        return {
+            # the portions are read from the end of the list, the first portion of the stream
+            # is put last so that the chunks are pulled in order
+            "portions": npy_reader.get_portions(self.name, point_count)[::-1],
+            "aabb": self.declared_aabb.copy(),
+            "crs_in": None,
+            "point_count": point_count,
+            "avg_min": self.declared_aabb[0].copy(),
+        }
+
+    def fill(self, point_count: Optional[int] = None) -> None:
+        """
+        Pulls the chunks of a stream until its first point_count points (all of them by default)
+        are in the block.
+        """
+        if self.chunks is None:
+            return
+
+        total_point_count = len(self.points)
+        if point_count is None:
+            point_count = total_point_count
+
+        while self.filled_point_count < point_count:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                raise ValueError(
+                    f"The point stream ended after {self.filled_point_count} points, "
+                    f"{total_point_count} points were declared."
+                )
+            if _get_dtype(chunk) != self.points.dtype:
+                raise ValueError(
+                    f"The chunks of a point stream must have the same dtype, got {chunk.dtype} "
+                    f"after {self.points.dtype}."
+                )
+
+            end = self.filled_point_count + len(chunk)
+            if end > total_point_count:
+                raise ValueError(
+                    f"The point stream has more points than the {total_point_count} declared."
+                )
+            destination = self.points[self.filled_point_count : end]
+            _copy_points(destination, chunk)
+            self._check_aabb(destination)
+            self.filled_point_count = end
+
+        if self.filled_point_count == total_point_count:
+            if any(len(chunk) for chunk in self.chunks):
+                raise ValueError(
+                    f"The point stream has more points than the {total_point_count} declared."
+                )
+            self.chunks = None
+
+    def release(self) -> None:
+        # the views on the block must be released before closing it
+        del self.points
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+
+    def _check_aabb(self, points: npt.NDArray[np.void]) -> None:
+        if self.declared_aabb is None or len(points) == 0:
+            return
+        for i, coord in enumerate(("x", "y", "z")):
+            if (
+                np.min(points[coord]) < self.declared_aabb[0][i]
+                or np.max(points[coord]) > self.declared_aabb[1][i]
+            ):
+                raise ValueError(
+                    f"The point stream has points outside of its declared aabb {self.declared_aabb.tolist()}."
+                )
+
+
+class SharedPointStream:
+    """
+    A stream whose point count is unknown, pulled portion by portion.
+
+    Each portion is copied in its own shared memory block, that can be released as soon
+    as the portion has been read. The points outside of the aabb of the stream are rejected,
+    their count is kept in rejected_point_count.
+    """
+
+    def __init__(self, stream: PointStream) -> None:
+        if os.name == "posix":
+            # the blocks are created after the workers are started, the tracker of the shared
+            # memory blocks must run before, otherwise each worker starts its own tracker that
+            # unlinks the blocks it attached to when it exits
+            resource_tracker.ensure_running()
+
+        self.chunks = iter(stream.chunks)
+        self.aabb = np.array(stream.aabb, dtype=np.float64)
+        self.dtype: Optional[np.dtype[Any]] = None
+        # the rest of the last chunk, that didn't fit in the previous portion
+        self.pending_chunk: Optional[npt.NDArray[Any]] = None
+        self.point_count = 0
+        self.rejected_point_count = 0
+
+    def get_metadata(self) -> MetadataReaderType:
+        """
+        Returns the metadata of the stream before it is pulled: its portions and its point
+        count are only known as it is pulled.
+        """
+        return {
+            "portions": [],
+            "aabb": self.aabb.copy(),
+            "crs_in": None,
+            "point_count": 0,
+            "avg_min": self.aabb[0].copy(),
+        }
+
+    def pull(self) -> Optional[SharedPointArray]:
+        """
+        Pulls the next portion of the stream (of PORTION_POINT_COUNT points at most) in a shared
+        memory block, or returns None at the end of the stream.
+        """
+        chunks = []
+        chunk_point_count = 0
+        while chunk_point_count < npy_reader.PORTION_POINT_COUNT:
+            chunk: Optional[npt.NDArray[Any]]
+            if self.pending_chunk is not None:
+                chunk, self.pending_chunk = self.pending_chunk, None
+            else:
+                chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+
+            if self.dtype is None:
+                self.dtype = _get_dtype(chunk)
+            elif _get_dtype(chunk) != self.dtype:
+                raise ValueError(
+                    f"The chunks of a point stream must have the same dtype, got {chunk.dtype} "
+                    f"after {self.dtype}."
+                )
+            chunk = self._reject_outside_points(chunk)
+
+            missing_point_count = npy_reader.PORTION_POINT_COUNT - chunk_point_count
+            if len(chunk) > missing_point_count:
+                chunk, self.pending_chunk = (
+                    chunk[:missing_point_count],
+                    chunk[missing_point_count:],
+                )
+            chunks.append(chunk)
+            chunk_point_count += len(chunk)
+
+        if chunk_point_count == 0:
+            if self.point_count == 0 and self.rejected_point_count:
+                raise ValueError(
+                    f"All the {self.rejected_point_count} points of the point stream are outside "
+                    f"of its declared aabb {self.aabb.tolist()}."
+                )
+            if self.point_count == 0:
+                raise ValueError("There is no point in the point stream.")
+            return None
+
+        shared_array = SharedPointArray(
+            PointStream(chunks, self.aabb, chunk_point_count)
+        )
+        try:
+            shared_array.fill()
+        except BaseException:
+            shared_array.release()
+            raise
+        self.point_count += chunk_point_count
+        return shared_array
+
+    def _reject_outside_points(self, chunk: npt.NDArray[Any]) -> npt.NDArray[Any]:
+        """
+        Returns the points of chunk inside the aabb of the stream.
+        """
+        if chunk.dtype.names is None:
+            coords = [chunk[:, i] for i in range(3)]
+        else:
+            coords = [chunk[coord] for coord in ("x", "y", "z")]
+        inside = np.ones(len(chunk), dtype=bool)
+        for i, values in enumerate(coords):
+            inside &= (values >= self.aabb[0][i]) & (values <= self.aabb[1][i])
+
+        rejected_point_count = len(chunk) - int(np.count_nonzero(inside))
+        if rejected_point_count == 0:
+            return chunk
+        self.rejected_point_count += rejected_point_count
+        return chunk[inside]  # type: ignore [no-any-return]
+
+
+def get_metadata(path: Path, fraction: int = 100) -> MetadataReaderType:
+    shared_memory = SharedMemory(path.name)
+    try:
+        return npy_reader.get_points_metadata(
+            str(path), _get_points(shared_memory), None, fraction
+        )
+    finally:
+        _close(shared_memory)
+
+
+def run(
+    filename: str,
+    offset_scale: OffsetScaleType,
+    portion: PortionItemType,
+    transformer: Optional[Transformer],
+    color_scale: Optional[float],
+    write_intensity: bool,
+    stride: int = 1,
+    point_filter: Optional[PointFilter] = None,
+) -> Generator[
+    tuple[
+        npt.NDArray[np.float32],
+        npt.NDArray[np.uint8],
+        npt.NDArray[np.uint8],
+        npt.NDArray[np.uint8],
+    ],
+    None,
+    None,
+]:
+    """
+    Reads points from a shared memory block, one point out of stride, and keeps the ones
+    selected by point_filter.
+    """
+    shared_memory = SharedMemory(Path(filename).name)
+    try:
+        # the portion is copied, so that the block can be closed right away
+        points = _get_points(shared_memory)[portion[0] : portion[1]].copy()
+    finally:
+        _close(shared_memory)
+
+    yield from npy_reader.read_points(
+        points,
+        offset_scale,
+        (0, len(points)),
+        transformer,
+        color_scale,
+        write_intensity,
+        stride,
+        point_filter,
+    )
+
+
+def _get_dtype(points: npt.NDArray[Any]) -> np.dtype[Any]:
+    """
+    Returns the structured dtype of points in a shared memory block.
+    """
+    if points.dtype.names is None and points.ndim == 2 and points.shape[1] == 3:
+        return np.dtype([(coord, points.dtype) for coord in ("x", "y", "z")])
+    npy_reader.check_points(points, "the array")
+    return points.dtype
+
+
+def _copy_points(destination: npt.NDArray[np.void], points: npt.NDArray[Any]) -> None:
+    if points.dtype.names is None:
+        for i, coord in enumerate(("x", "y", "z")):
+            destination[coord] = points[:, i]
+    else:
+        destination[...] = points
+
+
+def _get_buffer(shared_memory: SharedMemory) -> memoryview:
+    if shared_memory.buf is None:
+        raise ValueError(f"The shared memory block {shared_memory.name} is closed.")
+    return shared_memory.buf
+
+
+def _get_points(shared_memory: SharedMemory) -> npt.NDArray[np.void]:
+    """
+    Returns a view on the points of a shared memory block, described by its npy header.
+    """
+    buffer = _get_buffer(shared_memory)
+    (header_length,) = struct.unpack_from("<I", buffer, NPY_PREFIX_SIZE)
+    header = io.BytesIO(bytes(buffer[: NPY_PREFIX_SIZE + 4 + header_length]))
+    np.lib.format.read_magic(header)  # type: ignore [no-untyped-call]
+    shape, _, dtype = np.lib.format.read_array_header_2_0(  # type: ignore [no-untyped-call]
+        header
+    )
+    return np.ndarray(shape, dtype=dtype, buffer=buffer, offset=header.tell())
+
+
+def _close(shared_memory: SharedMemory) -> None:
+    # a view on the block can still be referenced by the traceback of an exception, the block
+    # is then closed when this view is garbage collected
+    with contextlib.suppress(BufferError):
+        shared_memory.close()
@@ -1,42 +1,320 @@
 import math
-from collections.abc import Generator
+import os
+import struct
+from collections.abc import Generator, Iterator
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
 import laspy
 import numpy as np
 import numpy.typing as npt
+from laspy.copc import CopcInfoVlr, Entry, HierarchyPage, VoxelKey
 from pyproj import Transformer
 
+from py3dtiles.reader.point_filter import PointFilter
+from py3dtiles.reader.post_processing import (
+    OutputBuffers,
+    convert_colors,
+    get_sampled_point_count,
+    sample,
+    transform_coordinates,
+)
 from py3dtiles.typing import MetadataReaderType, OffsetScaleType, PortionItemType
 
+# the number of points of a portion, for uncompressed files
+PORTION_POINT_COUNT = 1_000_000
+# chunk size of the LasZipVlr for variable-sized chunks
+VARIABLE_CHUNK_SIZE = 0xFFFFFFFF
 
-def get_metadata(path: Path, fraction: int = 100) -> MetadataReaderType:
-    pointcloud_file_portions = []
 
+def get_metadata(path: Path, fraction: int = 100) -> MetadataReaderType:
     filename = str(path)
-    with laspy.open(filename) as f:
-        point_count = f.header.point_count * fraction // 100
+    with open(filename, "rb") as f:
+        header = laspy.LasHeader.read_from(f, read_evlrs=True)
 
-        _1M = min(point_count, 1_000_000)
-        steps = math.ceil(point_count / _1M)
-        portions: list[PortionItemType] = [
-            (i * _1M, min(point_count, (i + 1) * _1M)) for i in range(steps)
-        ]
-        for p in portions:
-            pointcloud_file_portions += [(filename, p)]
+    point_count = header.point_count * fraction // 100
 
-        crs_in = f.header.parse_crs()
+    portions = _get_copc_portions(filename, header, point_count)
+    if portions is None:
+        portions = _get_chunk_portions(filename, header, point_count)
 
     return {
-        "portions": pointcloud_file_portions,
-        "aabb": np.array([f.header.mins, f.header.maxs]),
-        "crs_in": crs_in,
+        "portions": [(filename, p) for p in portions],
+        "aabb": np.array([header.mins, header.maxs]),
+        "crs_in": header.parse_crs(),
         "point_count": point_count,
-        "avg_min": np.array(f.header.mins),
+        "avg_min": np.array(header.mins),
     }
 
 
+def _get_chunk_portions(
+    filename: str, header: laspy.LasHeader, point_count: int
+) -> list[PortionItemType]:
+    """
+    Returns the portions of a las or laz file, of about PORTION_POINT_COUNT points.
+
+    The portions of a file with variable-sized chunks also have the byte offset and the index
+    of their first chunk, so that the readers don't go through the chunk table from its start.
+    """
+    chunk_point_counts = _get_chunk_point_counts(filename, header)
+    if chunk_point_counts is None:
+        _1M = min(point_count, PORTION_POINT_COUNT)
+        steps = math.ceil(point_count / _1M)
+        return [(i * _1M, min(point_count, (i + 1) * _1M)) for i in range(steps)]
+    chunk_table = _read_chunk_table(filename, header)
+
+    # align the portions on the chunks, so that each portion is decompressed from its first point
+    portions: list[PortionItemType] = []
+    start = 0
+    end = 0
+    # the first chunk of the portion, see _read_point_records
+    first_chunk = (_get_first_chunk_offset(header), 0)
+    chunk_offset = first_chunk[0]
+    for chunk_index, chunk_point_count in enumerate(chunk_point_counts):
+        end += chunk_point_count
+        if chunk_table is not None:
+            chunk_offset += chunk_table[chunk_index][1]
+        if end >= point_count:
+            break
+        if end - start >= PORTION_POINT_COUNT:
+            portions.append(
+                (start, end) if chunk_table is None else (start, end, *first_chunk)
+            )
+            start = end
+            first_chunk = (chunk_offset, chunk_index + 1)
+    end = min(end, point_count)
+    portions.append((start, end) if chunk_table is None else (start, end, *first_chunk))
+    return portions
+
+
+def _get_copc_portions(
+    filename: str, header: laspy.LasHeader, point_count: int
+) -> Optional[list[PortionItemType]]:
+    """
+    Returns the portions of a COPC file, made of the nodes of its octree hierarchy, or None
+    if the file is not a COPC file.
+
+    The point count of each node is known from the hierarchy and the points of a node are
+    a chunk of the file. The nodes are sorted in depth first order, so that the successive
+    portions are spatially coherent, and the successive nodes that are also contiguous
+    in the file are gathered in portions of about PORTION_POINT_COUNT points.
+    """
+    if not header.vlrs or not isinstance(header.vlrs[0], CopcInfoVlr):
+        return None
+    copc_info = header.vlrs[0]
+
+    entries: list[Entry] = []
+    with open(filename, "rb") as f:
+        pages = [(copc_info.hierarchy_root_offset, copc_info.hierarchy_root_size)]
+        while pages:
+            offset, size = pages.pop()
+            f.seek(offset)
+            for entry in HierarchyPage.from_bytes(f.read(size)).entries.values():
+                if entry.point_count == -1:
+                    # the entries of this subtree are in another page
+                    pages.append((entry.offset, entry.byte_size))
+                elif entry.point_count > 0:
+                    entries.append(entry)
+
+    if sum(entry.point_count for entry in entries) != header.point_count:
+        return None
+
+    # the chunks are in the order of their offset in the file, so are the points
+    node_ranges = {}
+    start = 0
+    for chunk_index, entry in enumerate(
+        sorted(entries, key=lambda entry: entry.offset)
+    ):
+        node_ranges[entry.key] = (start, start + entry.point_count, chunk_index)
+        start += entry.point_count
+
+    # like the ones of the other files with variable-sized chunks, the portions have the byte
+    # offset and the index of their first chunk
+    portions: list[PortionItemType] = []
+    for entry in sorted(entries, key=lambda entry: _copc_node_path(entry.key)):
+        node_start, node_end, chunk_index = node_ranges[entry.key]
+        if node_start >= point_count:
+            continue
+        node_end = min(node_end, point_count)
+        if (
+            portions
+            and portions[-1][1] == node_start
+            and portions[-1][1] - portions[-1][0] < PORTION_POINT_COUNT
+        ):
+            portions[-1] = (portions[-1][0], node_end, *portions[-1][2:])
+        else:
+            portions.append((node_start, node_end, entry.offset, chunk_index))
+    return portions
+
+
+def _copc_node_path(key: VoxelKey) -> tuple[int, ...]:
+    """
+    Returns the octants from the root to the node of a COPC hierarchy. Sorting the nodes by
+    their path sorts them in depth first order.
+    """
+    return tuple(
+        ((key.x >> shift) & 1)
+        | ((key.y >> shift) & 1) << 1
+        | ((key.z >> shift) & 1) << 2
+        for shift in range(key.level - 1, -1, -1)
+    )
+
+
+def _get_chunk_point_counts(
+    filename: str, header: laspy.LasHeader
+) -> Optional[list[int]]:
+    """
+    Returns the number of points of each chunk of a laz file, or None if the file
+    is not compressed or if the chunk table can't be read.
+    """
+    if not header.are_points_compressed or header.point_count == 0:
+        return None
+
+    laszip_vlrs = header.vlrs.get("LasZipVlr")
+    if not laszip_vlrs:
+        return None
+    # the chunk size is after the compressor, coder, version and options fields
+    (chunk_size,) = struct.unpack_from("<I", laszip_vlrs[0].record_data, 12)
+
+    if chunk_size != VARIABLE_CHUNK_SIZE:
+        chunk_count = math.ceil(header.point_count / chunk_size)
+        return [chunk_size] * (chunk_count - 1) + [
+            header.point_count - (chunk_count - 1) * chunk_size
+        ]
+
+    chunk_table = _read_chunk_table(filename, header)
+    if chunk_table is None:
+        return None
+    return [chunk_point_count for chunk_point_count, _ in chunk_table]
+
+
+def _read_chunk_table(
+    filename: str, header: laspy.LasHeader
+) -> Optional[list[tuple[int, int]]]:
+    """
+    Returns the point count and the byte size of each chunk of a laz file with variable-sized
+    chunks, or None if the file doesn't have variable-sized chunks or if lazrs is not installed.
+    """
+    laszip_vlrs = header.vlrs.get("LasZipVlr")
+    if not header.are_points_compressed or not laszip_vlrs:
+        return None
+    (chunk_size,) = struct.unpack_from("<I", laszip_vlrs[0].record_data, 12)
+    if chunk_size != VARIABLE_CHUNK_SIZE:
+        return None
+
+    stat = os.stat(filename)
+    return _read_cached_chunk_table(
+        filename,
+        stat.st_mtime_ns,
+        stat.st_size,
+        header.offset_to_point_data,
+        bytes(laszip_vlrs[0].record_data),
+    )
+
+
+@lru_cache(maxsize=16)
+def _read_cached_chunk_table(
+    filename: str,
+    mtime_ns: int,
+    size: int,
+    offset_to_point_data: int,
+    laszip_record_data: bytes,
+) -> Optional[list[tuple[int, int]]]:
+    """
+    Reads the chunk table of a laz file once per process, as each of its portions needs it.
+    The modification time and the size of the file are only part of the key, so that a file
+    modified since it has been read is read again.
+    """
+    try:
+        import lazrs
+    except ImportError:
+        return None
+
+    with open(filename, "rb") as f:
+        f.seek(offset_to_point_data)
+        try:
+            chunk_table: list[tuple[int, int]] = lazrs.read_chunk_table(
+                f, lazrs.LazVlr(laszip_record_data)
+            )
+        except lazrs.LazrsError:
+            return None
+    return chunk_table
+
+
+def _get_first_chunk_offset(header: laspy.LasHeader) -> int:
+    """
+    Returns the byte offset of the first chunk of a laz file, that follows the offset to the
+    chunk table.
+    """
+    return int(header.offset_to_point_data) + 8
+
+
+def _read_point_records(
+    f: laspy.LasReader, filename: str, portion: PortionItemType
+) -> Iterator[laspy.PackedPointRecord]:
+    """
+    Reads the point records of a portion, by batches.
+
+    The point records of uncompressed files are memory-mapped, compressed files are decoded by
+    laspy from the first point of the portion, that is the first point of a chunk (see
+    get_metadata). The files with variable-sized chunks (like COPC files) are decoded chunk by
+    chunk instead, as lazrs doesn't seek correctly in them, from the first chunk of the portion.
+    """
+    header = f.header
+    point_count = portion[1] - portion[0]
+    step = min(point_count, max(point_count // 10, 100_000))
+
+    if not header.are_points_compressed:
+        point_records = np.memmap(
+            filename,
+            dtype=header.point_format.dtype(),
+            mode="r",
+            offset=header.offset_to_point_data + portion[0] * header.point_format.size,
+            shape=(point_count,),
+        )
+        for start in range(0, point_count, step):
+            yield laspy.PackedPointRecord(
+                point_records[start : start + step], header.point_format
+            )
+        return
+
+    chunk_table = _read_chunk_table(filename, header)
+    if chunk_table is None:
+        f.seek(portion[0])
+        for start in range(0, point_count, step):
+            yield f.read_points(min(step, point_count - start))
+        return
+
+    import lazrs
+
+    laszip_vlr = header.vlrs.get("LasZipVlr")[0]
+    # the portion starts at the start of a chunk, whose offset and index are known
+    chunk_start, _, chunk_offset, first_chunk_index = portion[:4]
+    with open(filename, "rb") as source:
+        for chunk_point_count, chunk_byte_size in chunk_table[first_chunk_index:]:
+            chunk_end = chunk_start + chunk_point_count
+            if chunk_end > portion[0]:
+                source.seek(chunk_offset)
+                records = np.zeros(
+                    chunk_point_count * header.point_format.size, dtype=np.uint8
+                )
+                lazrs.decompress_points_with_chunk_table(
+                    source.read(chunk_byte_size),
+                    laszip_vlr.record_data,
+                    records,
+                    [(chunk_point_count, chunk_byte_size)],
+                )
+                yield laspy.PackedPointRecord.from_buffer(records, header.point_format)[
+                    max(portion[0] - chunk_start, 0) : portion[1] - chunk_start
+                ]
+
+            chunk_start = chunk_end
+            chunk_offset += chunk_byte_size
+            if chunk_start >= portion[1]:
+                break
+
+
 def run(
     filename: str,
     offset_scale: OffsetScaleType,
@@ -44,6 +322,8 @@ def run(
     transformer: Optional[Transformer],
     color_scale: Optional[float],
     write_intensity: bool,
+    stride: int = 1,
+    point_filter: Optional[PointFilter] = None,
 ) -> Generator[
     tuple[
         npt.NDArray[np.float32],
@@ -55,72 +335,77 @@ def run(
     None,
 ]:
     """
-    Reads points from a las file
+    Reads points from a las file, one point out of stride, and keeps the ones selected by
+    point_filter.
     """
     with laspy.open(filename) as f:
+        header = f.header
 
-        point_count = portion[1] - portion[0]
-
-        step = min(point_count, max(point_count // 10, 100_000))
-
-        indices = list(range(math.ceil(point_count / step)))
-
-        for index in indices:
-            start_offset = portion[0] + index * step
-            num = min(step, portion[1] - start_offset)
-
-            # read scaled values and apply offset
-            f.seek(start_offset)
-            points = next(f.chunk_iterator(num))
-
-            x, y, z = points.x, points.y, points.z
-            if transformer:
-                x, y, z = transformer.transform(x, y, z)
-
-            x = (x + offset_scale[0][0]) * offset_scale[1][0]
-            y = (y + offset_scale[0][1]) * offset_scale[1][1]
-            z = (z + offset_scale[0][2]) * offset_scale[1][2]
-
-            coords = np.vstack((x, y, z)).transpose()
-
-            if offset_scale[2] is not None:
-                # Apply transformation matrix (because the tile's transform will contain
-                # the inverse of this matrix)
-                coords = np.dot(coords, offset_scale[2])
-
-            coords = np.ascontiguousarray(coords.astype(np.float32))
+        buffers = OutputBuffers(
+            get_sampled_point_count(portion[1] - portion[0], stride)
+        )
+        start = 0
+        for point_records in _read_point_records(f, filename, portion):
+            points = laspy.PackedPointRecord(
+                sample(point_records.array, start, stride), header.point_format
+            )
+            start += len(point_records)
+            if point_filter is not None:
+                points = laspy.PackedPointRecord(
+                    points.array[
+                        point_filter.mask(
+                            points.array["X"] * header.scales[0] + header.offsets[0],
+                            points.array["Y"] * header.scales[1] + header.offsets[1],
+                            points.array["Z"] * header.scales[2] + header.offsets[2],
+                            (
+                                np.asarray(points["classification"])
+                                if "classification"
+                                in header.point_format.dimension_names
+                                else None
+                            ),
+                        )
+                    ],
+                    header.point_format,
+                )
+            num = len(points)
+            coords_out, colors_out = buffers.next_rows(num)
+            coords = transform_coordinates(
+                points.array["X"],
+                points.array["Y"],
+                points.array["Z"],
+                offset_scale,
+                transformer,
+                header.scales,
+                header.offsets,
+                coords_out,
+            )
 
             # Read colors
-            if "red" in f.header.point_format.dimension_names:
-                red = points["red"]
-                green = points["green"]
-                blue = points["blue"]
+            if "red" in header.point_format.dimension_names:
+                red = points.array["red"]
+                green = points.array["green"]
+                blue = points.array["blue"]
             else:
-                red = points["intensity"]
-                green = points["intensity"]
-                blue = points["intensity"]
-
-            colors = np.vstack((red, green, blue)).transpose()
-
-            if color_scale is not None:
-                colors = np.clip(colors * color_scale, 0, 65535)
+                red = points.array["intensity"]
+                green = points.array["intensity"]
+                blue = points.array["intensity"]
 
             # NOTE las spec says rgb is 16bits by components
             # pnts are 8 bits (by default) by component, hence we divide by 256
-            colors = (colors / 256).astype(np.uint8)
+            colors = convert_colors(red, green, blue, color_scale, 256, colors_out)
 
-            if "classification" in f.header.point_format.dimension_names:
+            if "classification" in header.point_format.dimension_names:
                 classification = np.array(
                     points["classification"], dtype=np.uint8
                 ).reshape(-1, 1)
             else:
-                classification = np.zeros((len(points.x), 1), dtype=np.uint8)
+                classification = np.zeros((num, 1), dtype=np.uint8)
 
-            if "intensity" in f.header.point_format.dimension_names:
+            if "intensity" in header.point_format.dimension_names:
                 intensity = np.array(points["intensity"] / 256, dtype=np.uint8).reshape(
                     -1, 1
                 )
             else:
-                intensity = np.zeros((len(points.x), 1), dtype=np.uint8)
+                intensity = np.zeros((num, 1), dtype=np.uint8)
 
             yield coords, colors, classification, intensity
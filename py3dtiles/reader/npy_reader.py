@@ -0,0 +1,279 @@
+"""
+Reads points stored as numpy structured arrays, either in a .npy file or in a raw binary file
+described by a json sidecar.
+
+The fields x, y and z are required. The fields red, green, blue, classification and intensity are
+read if they are present, the other fields are ignored. The colors and the intensity are
+expected as 8 bits integers, or as 16 bits integers like in las files.
+
+The sidecar of a raw binary file `points.bin` is `points.bin.json`, for instance:
+
+.. code-block:: json
+
+    {
+        "dtype": [["x", "<f8"], ["y", "<f8"], ["z", "<f8"], ["classification", "u1"]],
+        "offset": 0,
+        "crs": "EPSG:2154"
+    }
+
+`dtype` is the description of a numpy structured dtype, `offset` (optional) is the size of the
+header before the first point and `crs` (optional) is the crs of the points.
+"""
+
+import json
+import math
+from collections.abc import Generator
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+from pyproj import CRS, Transformer
+
+from py3dtiles.reader.point_filter import PointFilter
+from py3dtiles.reader.post_processing import (
+    OutputBuffers,
+    convert_colors,
+    get_sampled_point_count,
+    sample,
+    transform_coordinates,
+)
+from py3dtiles.typing import (
+    MetadataReaderType,
+    OffsetScaleType,
+    PortionItemType,
+    PortionsType,
+)
+
+# the number of points of a portion
+PORTION_POINT_COUNT = 1_000_000
+
+
+def get_metadata(path: Path, fraction: int = 100) -> MetadataReaderType:
+    points, crs_in = _memory_map_points(path)
+    return get_points_metadata(str(path), points, crs_in, fraction)
+
+
+def get_points_metadata(
+    filename: str,
+    points: npt.NDArray[np.void],
+    crs_in: Optional[CRS],
+    fraction: int = 100,
+) -> MetadataReaderType:
+    """
+    Returns the metadata of a structured array of points, whose portions refer to filename.
+    """
+    point_count = len(points) * fraction // 100
+
+    # the aabb is computed by chunks, so that only a part of the file is loaded at once
+    aabb = None
+    for start in range(0, len(points), PORTION_POINT_COUNT):
+        chunk = points[start : start + PORTION_POINT_COUNT]
+        chunk_aabb = np.array(
+            [
+                [np.min(chunk["x"]), np.min(chunk["y"]), np.min(chunk["z"])],
+                [np.max(chunk["x"]), np.max(chunk["y"]), np.max(chunk["z"])],
+            ],
+            dtype=np.float64,
+        )
+        if aabb is None:
+            aabb = chunk_aabb
+        else:
+            aabb[0] = np.minimum(aabb[0], chunk_aabb[0])
+            aabb[1] = np.maximum(aabb[1], chunk_aabb[1])
+
+    if aabb is None:
+        raise ValueError(f"There is no point in the file {filename}")
+
+    return {
+        "portions": get_portions(filename, point_count),
+        "aabb": aabb,
+        "crs_in": crs_in,
+        "point_count": point_count,
+        "avg_min": aabb[0],
+    }
+
+
+def get_portions(filename: str, point_count: int) -> PortionsType:
+    """
+    Splits point_count points in portions of PORTION_POINT_COUNT points.
+    """
+    _1M = min(point_count, PORTION_POINT_COUNT)
+    steps = math.ceil(point_count / _1M) if _1M > 0 else 0
+    return [
+        (filename, (i * _1M, min(point_count, (i + 1) * _1M))) for i in range(steps)
+    ]
+
+
+def run(
+    filename: str,
+    offset_scale: OffsetScaleType,
+    portion: PortionItemType,
+    transformer: Optional[Transformer],
+    color_scale: Optional[float],
+    write_intensity: bool,
+    stride: int = 1,
+    point_filter: Optional[PointFilter] = None,
+) -> Generator[
+    tuple[
+        npt.NDArray[np.float32],
+        npt.NDArray[np.uint8],
+        npt.NDArray[np.uint8],
+        npt.NDArray[np.uint8],
+    ],
+    None,
+    None,
+]:
+    """
+    Reads points from a .npy file or a raw binary file, one point out of stride, and keeps the
+    ones selected by point_filter.
+    """
+    all_points, _ = _memory_map_points(Path(filename))
+    yield from read_points(
+        all_points,
+        offset_scale,
+        portion,
+        transformer,
+        color_scale,
+        write_intensity,
+        stride,
+        point_filter,
+    )
+
+
+def read_points(
+    all_points: npt.NDArray[np.void],
+    offset_scale: OffsetScaleType,
+    portion: PortionItemType,
+    transformer: Optional[Transformer],
+    color_scale: Optional[float],
+    write_intensity: bool,
+    stride: int = 1,
+    point_filter: Optional[PointFilter] = None,
+) -> Generator[
+    tuple[
+        npt.NDArray[np.float32],
+        npt.NDArray[np.uint8],
+        npt.NDArray[np.uint8],
+        npt.NDArray[np.uint8],
+    ],
+    None,
+    None,
+]:
+    """
+    Reads a portion of a structured array of points, one point out of stride, and keeps the
+    ones selected by point_filter.
+    """
+    fields = all_points.dtype.names or ()
+
+    point_count = portion[1] - portion[0]
+    step = min(point_count, max(point_count // 10, 100_000))
+    buffers = OutputBuffers(get_sampled_point_count(point_count, stride))
+
+    for start_offset in range(portion[0], portion[1], step):
+        points = sample(
+            all_points[start_offset : min(start_offset + step, portion[1])],
+            start_offset - portion[0],
+            stride,
+        )
+        if point_filter is not None:
+            points = points[
+                point_filter.mask(
+                    points["x"],
+                    points["y"],
+                    points["z"],
+                    points["classification"] if "classification" in fields else None,
+                )
+            ]
+
+        coords_out, colors_out = buffers.next_rows(len(points))
+        coords = transform_coordinates(
+            points["x"],
+            points["y"],
+            points["z"],
+            offset_scale,
+            transformer,
+            out=coords_out,
+        )
+
+        if "red" in fields:
+            colors = convert_colors(
+                points["red"],
+                points["green"],
+                points["blue"],
+                color_scale,
+                _8_bits_divisor(points["red"].dtype),
+                colors_out,
+            )
+        else:
+            colors = np.zeros((len(points), 3), dtype=np.uint8)
+
+        if "classification" in fields:
+            classification = np.array(points["classification"], dtype=np.uint8)
+        else:
+            classification = np.zeros(len(points), dtype=np.uint8)
+
+        if "intensity" in fields and write_intensity:
+            intensity = (
+                points["intensity"] / _8_bits_divisor(points["intensity"].dtype)
+            ).astype(np.uint8)
+        else:
+            intensity = np.zeros(len(points), dtype=np.uint8)
+
+        yield coords, colors, classification.reshape(-1, 1), intensity.reshape(-1, 1)
+
+
+def _8_bits_divisor(dtype: np.dtype[Any]) -> int:
+    """
+    Returns the divisor that converts values of dtype to 8 bits values: 16 bits values are
+    divided by 256, like the las reader does.
+    """
+    if dtype.itemsize == 2 and dtype.kind in "iu":
+        return 256
+    return 1
+
+
+def _memory_map_points(path: Path) -> tuple[npt.NDArray[np.void], Optional[CRS]]:
+    """
+    Memory-maps the points of a .npy file or of a raw binary file, and returns them with
+    the crs given by the sidecar of the raw binary file.
+    """
+    crs_in = None
+    if path.suffix == ".npy":
+        points = np.load(path, mmap_mode="r", allow_pickle=False)
+    else:
+        sidecar_path = path.with_name(path.name + ".json")
+        if not sidecar_path.exists():
+            raise FileNotFoundError(
+                f"The raw binary file {path} has no json sidecar {sidecar_path}"
+            )
+        with sidecar_path.open() as f:
+            schema = json.load(f)
+        dtype = np.dtype([tuple(field) for field in schema["dtype"]])
+        offset = schema.get("offset", 0)
+        if "crs" in schema:
+            crs_in = CRS.from_user_input(schema["crs"])
+        point_count = (path.stat().st_size - offset) // dtype.itemsize
+        if point_count == 0:
+            points = np.zeros(0, dtype=dtype)
+        else:
+            points = np.memmap(
+                path, dtype=dtype, mode="r", offset=offset, shape=(point_count,)
+            )
+
+    check_points(points, str(path))
+    return points, crs_in
+
+
+def check_points(points: npt.NDArray[Any], name: str) -> None:
+    """
+    Checks that points is a 1D structured array with the fields x, y and z.
+    """
+    if (
+        points.ndim != 1
+        or points.dtype.names is None
+        or any(coord not in points.dtype.names for coord in ("x", "y", "z"))
+    ):
+        raise KeyError(
+            f"The points of {name} must be a 1D structured array with the fields x, y and z."
+        )
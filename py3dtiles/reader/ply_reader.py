@@ -8,6 +8,14 @@ import numpy.typing as npt
 from plyfile import PlyData, PlyElement
 from pyproj import Transformer
 
+from py3dtiles.reader.point_filter import PointFilter
+from py3dtiles.reader.post_processing import (
+    OutputBuffers,
+    convert_colors,
+    get_sampled_point_count,
+    sample,
+    transform_coordinates,
+)
 from py3dtiles.typing import (
     MetadataReaderType,
     OffsetScaleType,
@@ -15,28 +23,75 @@ from py3dtiles.typing import (
     PortionsType,
 )
 
+# the number of points of a portion, for memory-mapped files
+PORTION_POINT_COUNT = 1_000_000
+
+# the numpy types of the ply scalar types
+PLY_TYPES = {
+    "char": "i1",
+    "int8": "i1",
+    "uchar": "u1",
+    "uint8": "u1",
+    "short": "i2",
+    "int16": "i2",
+    "ushort": "u2",
+    "uint16": "u2",
+    "int": "i4",
+    "int32": "i4",
+    "uint": "u4",
+    "uint32": "u4",
+    "float": "f4",
+    "float32": "f4",
+    "double": "f8",
+    "float64": "f8",
+}
+PLY_BYTE_ORDERS = {"binary_little_endian": "<", "binary_big_endian": ">"}
+
 
 def get_metadata(path: Path, fraction: int = 100) -> MetadataReaderType:
     """Get metadata in case of a input ply file."""
-    ply_point_cloud = PlyData.read(path)
-    if "vertex" not in [e.name for e in ply_point_cloud.elements]:
-        raise KeyError(
-            "The ply data does not contain any 'vertex' item. Are you sure the file is valid?"
-        )
-    ply_vertices = ply_point_cloud["vertex"]
-    point_count = ply_vertices.count * fraction // 100
-    ply_features = [ply_prop.name for ply_prop in ply_vertices.properties]
-    if any(coord not in ply_features for coord in ("x", "y", "z")):
+    vertices, memory_mapped = _read_vertices(path)
+    point_count = len(vertices) * fraction // 100
+
+    if vertices.dtype.names is None or any(
+        coord not in vertices.dtype.names for coord in ("x", "y", "z")
+    ):
         raise KeyError(
             "At least one of the basic coordinate feature (x, y, z) is missing in the input file."
         )
 
-    data = np.array(
-        [ply_vertices["x"], ply_vertices["y"], ply_vertices["z"]]
-    ).transpose()
-    aabb = np.array((np.min(data, axis=0), np.max(data, axis=0)))
+    # the aabb is computed by chunks, so that only a part of a memory-mapped file is loaded at once
+    aabb = None
+    for start in range(0, len(vertices), PORTION_POINT_COUNT):
+        chunk = vertices[start : start + PORTION_POINT_COUNT]
+        chunk_aabb = np.array(
+            [
+                [np.min(chunk["x"]), np.min(chunk["y"]), np.min(chunk["z"])],
+                [np.max(chunk["x"]), np.max(chunk["y"]), np.max(chunk["z"])],
+            ],
+            dtype=np.float64,
+        )
+        if aabb is None:
+            aabb = chunk_aabb
+        else:
+            aabb[0] = np.minimum(aabb[0], chunk_aabb[0])
+            aabb[1] = np.maximum(aabb[1], chunk_aabb[1])
+
+    if aabb is None:
+        raise ValueError(f"There is no point in the file {path}")
+
+    if memory_mapped and point_count > 0:
+        # each portion is read by a worker directly from the file
+        _1M = min(point_count, PORTION_POINT_COUNT)
+        portions: list[PortionItemType] = [
+            (i * _1M, min(point_count, (i + 1) * _1M))
+            for i in range(math.ceil(point_count / _1M))
+        ]
+    else:
+        # the whole file is parsed by plyfile, it is read at once
+        portions = [(0, point_count)]
 
-    pointcloud_file_portions: PortionsType = [(str(path), (0, point_count))]
+    pointcloud_file_portions: PortionsType = [(str(path), p) for p in portions]
 
     return {
         "portions": pointcloud_file_portions,
@@ -54,6 +109,8 @@ def run(
     transformer: Optional[Transformer],
     color_scale: Optional[float],
     write_intensity: bool,
+    stride: int = 1,
+    point_filter: Optional[PointFilter] = None,
 ) -> Generator[
     tuple[
         npt.NDArray[np.float32],
@@ -65,80 +122,89 @@ def run(
     None,
 ]:
     """
-    Reads points from a ply file.
+    Reads points from a ply file, one point out of stride, and keeps the ones selected by
+    point_filter.
     """
-    ply_point_cloud = PlyData.read(filename)
-    ply_vertices = ply_point_cloud["vertex"]
+    ply_vertices, _ = _read_vertices(Path(filename))
+    vertex_properties = ply_vertices.dtype.names or ()
 
     point_count = portion[1] - portion[0]
     step = min(point_count, max(point_count // 10, 100_000))
     indices = list(range(math.ceil(point_count / step)))
+    buffers = OutputBuffers(get_sampled_point_count(point_count, stride))
 
     for index in indices:
         start_offset = portion[0] + index * step
         num = min(step, portion[1] - start_offset)
+        vertices = sample(
+            ply_vertices[start_offset : (start_offset + num)],
+            start_offset - portion[0],
+            stride,
+        )
+        if point_filter is not None:
+            vertices = vertices[
+                point_filter.mask(
+                    vertices["x"],
+                    vertices["y"],
+                    vertices["z"],
+                    (
+                        vertices["classification"]
+                        if "classification" in vertex_properties
+                        else None
+                    ),
+                )
+            ]
+        num = len(vertices)
 
-        x = ply_vertices["x"][start_offset : (start_offset + num)]
-        y = ply_vertices["y"][start_offset : (start_offset + num)]
-        z = ply_vertices["z"][start_offset : (start_offset + num)]
-        if transformer:
-            x, y, z = transformer.transform(x, y, z)
-
-        x = (x + offset_scale[0][0]) * offset_scale[1][0]
-        y = (y + offset_scale[0][1]) * offset_scale[1][1]
-        z = (z + offset_scale[0][2]) * offset_scale[1][2]
-
-        coords = np.vstack((x, y, z)).transpose()
-
-        if offset_scale[2] is not None:
-            # Apply transformation matrix (because the tile's transform will contain
-            # the inverse of this matrix)
-            coords = np.dot(coords, offset_scale[2])
-
-        coords = np.ascontiguousarray(coords.astype(np.float32))
+        coords_out, colors_out = buffers.next_rows(num)
+        coords = transform_coordinates(
+            vertices["x"],
+            vertices["y"],
+            vertices["z"],
+            offset_scale,
+            transformer,
+            out=coords_out,
+        )
 
         # NOTE this code assume all the colors have the same type
         # I think it's a reasonable assumption to make at this point but it's
         # not mandated by the spec!
-        if "red" in ply_vertices:
-            # val_dtype is of the form: i<nbytes>, u<nbytes>, float<nbytes>
-            # see https://github.com/dranjan/python-plyfile/blob/d1f73004ed0a296fc8b9c1fad8139b5d90410639/plyfile.py#L32
-            signed = ply_vertices.ply_property("red").val_dtype[0:1] == "i"
-            nbytes = int(ply_vertices.ply_property("red").val_dtype[1:])
+        if "red" in vertex_properties:
+            red_dtype = ply_vertices.dtype["red"]
+            signed = red_dtype.kind == "i"
+            nbytes = red_dtype.itemsize
             # factor is how much we need to divide the data
             # nbytes - 1 is the number of "extra" bytes compared to the 1 byte target
             # but we remove one extra bit if it is signed
             # max, because if the value is *shorter* we don't need to do anything)
             factor = max(1, 2 ** (8 * (nbytes - 1) - (1 if signed else 0)))
-            red = ply_vertices["red"][start_offset : (start_offset + num)] / factor
-            green = ply_vertices["green"][start_offset : (start_offset + num)] / factor
-            blue = ply_vertices["blue"][start_offset : (start_offset + num)] / factor
+            colors = convert_colors(
+                vertices["red"],
+                vertices["green"],
+                vertices["blue"],
+                color_scale,
+                factor,
+                colors_out,
+            )
         else:
-            red = green = blue = np.zeros(num)
+            colors = np.zeros((num, 3), dtype=np.uint8)
 
-        raw_colors = np.vstack((red, green, blue)).transpose()
-
-        if color_scale is not None:
-            raw_colors = np.clip(raw_colors * color_scale, 0, 255)
-
-        colors = raw_colors.astype(np.uint8)
-
-        if "classification" in ply_vertices:
+        if "classification" in vertex_properties:
             classification = np.array(
-                ply_vertices["classification"].reshape(-1, 1), dtype=np.uint8
+                vertices["classification"].reshape(-1, 1), dtype=np.uint8
             )
         else:
             classification = np.zeros((coords.shape[0], 1), dtype=np.uint8)
 
-        if "intensity" in ply_vertices and write_intensity:
-            if ply_vertices["intensity"].dtype != np.uint8:
+        if "intensity" in vertex_properties and write_intensity:
+            if ply_vertices.dtype["intensity"] != np.uint8:
                 print(
                     "Warning: At the moment, only intensity in uint8 format is supported for ply files"
                 )
                 intensity = np.zeros((coords.shape[0], 1), dtype=np.uint8)
             else:
                 intensity = np.array(
-                    ply_vertices["intensity"].reshape(-1, 1), dtype=np.uint8
+                    vertices["intensity"].reshape(-1, 1), dtype=np.uint8
                 )
         else:
             intensity = np.zeros((coords.shape[0], 1), dtype=np.uint8)
@@ -146,6 +212,79 @@ def run(
         yield coords, colors, classification, intensity
 
 
+def _read_vertices(path: Path) -> tuple[npt.NDArray[np.void], bool]:
+    """
+    Returns the vertices of a ply file as a structured array, and whether this array is
+    memory-mapped.
+
+    The vertices of a binary file are memory-mapped when their position in the file can be
+    computed from the header, i.e. when no element with a list property is before them.
+    Otherwise, the whole file is read by plyfile.
+    """
+    vertices = _memory_map_vertices(path)
+    if vertices is not None:
+        return vertices, True
+
+    ply_point_cloud = PlyData.read(path)
+    if "vertex" not in [e.name for e in ply_point_cloud.elements]:
+        raise KeyError(
+            "The ply data does not contain any 'vertex' item. Are you sure the file is valid?"
+        )
+    return ply_point_cloud["vertex"].data, False
+
+
+def _memory_map_vertices(path: Path) -> Optional[npt.NDArray[np.void]]:
+    """
+    Parses the header of a binary ply file and memory-maps its vertices, or returns None
+    if they can't be memory-mapped.
+    """
+    byte_order = None
+    # the elements and their properties (None for an element with a list property)
+    elements: list[tuple[str, int, Optional[list[tuple[str, str]]]]] = []
+    with path.open("rb") as f:
+        if f.readline().strip() != b"ply":
+            return None
+        while True:
+            line = f.readline()
+            if not line:
+                return None
+            words = line.decode("ascii", errors="replace").split()
+            if not words or words[0] in ("comment", "obj_info"):
+                continue
+            if words[0] == "end_header":
+                break
+            if words[0] == "format":
+                byte_order = PLY_BYTE_ORDERS.get(words[1])
+            elif words[0] == "element":
+                elements.append((words[1], int(words[2]), []))
+            elif words[0] == "property" and elements:
+                properties = elements[-1][2]
+                if properties is None:
+                    continue
+                if words[1] == "list" or words[1] not in PLY_TYPES:
+                    elements[-1] = (elements[-1][0], elements[-1][1], None)
+                else:
+                    properties.append((words[2], PLY_TYPES[words[1]]))
+        data_offset = f.tell()
+
+    if byte_order is None:
+        return None
+
+    for name, count, properties in elements:
+        if properties is None:
+            return None
+        dtype = np.dtype([(p, byte_order + t) for p, t in properties])
+        if name == "vertex":
+            if count == 0:
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(
+                path, dtype=dtype, mode="r", offset=data_offset, shape=(count,)
+            )
+        data_offset += count * dtype.itemsize
+
+    return None
+
+
 def create_plydata_with_renamed_property(
     plydata: PlyData, old_property_name: str, new_property_name: str
 ) -> PlyData:
@@ -0,0 +1,165 @@
+"""
+The selection of the points to convert, applied by the readers before the points are sent to
+the tiler.
+
+The bounding box and the polygon are in the coordinates of the input files, before any
+reprojection.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+from numba import njit
+
+
+@dataclass(frozen=True)
+class PointFilter:
+    """
+    Keeps the points whose classification and position match all the given criteria.
+
+    The polygon is a list of rings, each ring being a list of (x, y) vertices. A point is inside
+    the polygon if it is inside an odd number of rings, so that the holes and the parts of a
+    multipolygon can be given as other rings.
+    """
+
+    # the classifications to keep, all of them if None
+    classifications: Sequence[int] | None = None
+    # the classifications to discard
+    excluded_classifications: Sequence[int] = ()
+    # [[min x, min y, min z], [max x, max y, max z]]
+    aabb: npt.ArrayLike | None = None
+    polygon: Sequence[npt.ArrayLike] | None = None
+
+    def __post_init__(self) -> None:
+        if self.polygon is not None:
+            for ring in self.polygon:
+                ring_array = np.asarray(ring)
+                if ring_array.ndim != 2 or ring_array.shape[1] < 2:
+                    raise ValueError(
+                        "The rings of the polygon must be lists of (x, y) vertices."
+                    )
+
+    def mask(
+        self,
+        x: npt.NDArray[Any],
+        y: npt.NDArray[Any],
+        z: npt.NDArray[Any],
+        classification: npt.NDArray[Any] | None,
+    ) -> npt.NDArray[np.bool_]:
+        """
+        Returns the mask of the points to keep.
+
+        :param classification: the classification of the points, None if the points have no classification (they are then of class 0)
+        """
+        mask = np.ones(len(x), dtype=np.bool_)
+        if classification is None:
+            classification = np.zeros(len(x), dtype=np.uint8)
+        if self.classifications is not None:
+            mask &= np.isin(classification, self.classifications)
+        if self.excluded_classifications:
+            mask &= ~np.isin(classification, self.excluded_classifications)
+
+        if self.aabb is not None:
+            aabb = np.asarray(self.aabb, dtype=np.float64)
+            for i, coord in enumerate((x, y, z)):
+                mask &= (coord >= aabb[0][i]) & (coord <= aabb[1][i])
+
+        if self.polygon is not None:
+            (candidates,) = np.nonzero(mask)
+            mask[candidates] = _points_in_polygon(
+                np.asarray(x[candidates], dtype=np.float64),
+                np.asarray(y[candidates], dtype=np.float64),
+                _get_edges(self.polygon),
+            )
+
+        return mask
+
+
+def read_geojson_polygon(path: Path) -> list[npt.NDArray[np.float64]]:
+    """
+    Returns the rings of the polygons and multipolygons of a GeoJSON file (a geometry, a feature
+    or a feature collection). The z coordinates are ignored.
+    """
+    with path.open() as f:
+        geojson = json.load(f)
+
+    if geojson.get("type") == "FeatureCollection":
+        geometries = [feature["geometry"] for feature in geojson["features"]]
+    elif geojson.get("type") == "Feature":
+        geometries = [geojson["geometry"]]
+    else:
+        geometries = [geojson]
+
+    rings = []
+    for geometry in geometries:
+        if geometry["type"] == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry["type"] == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            continue
+        for polygon in polygons:
+            rings += [
+                np.array(ring, dtype=np.float64)[:, :2] for ring in polygon if ring
+            ]
+
+    if not rings:
+        raise ValueError(f"There is no polygon in {path}")
+    return rings
+
+
+def _get_edges(polygon: Sequence[npt.ArrayLike]) -> npt.NDArray[np.float64]:
+    """
+    Returns the edges of all the rings of polygon, as a (N, 4) array of (x0, y0, x1, y1).
+    The rings are closed if their last vertex isn't their first one.
+    """
+    edges = []
+    for ring in polygon:
+        vertices = np.asarray(ring, dtype=np.float64)[:, :2]
+        edges.append(np.hstack((vertices, np.roll(vertices, -1, axis=0))))
+    if not edges:
+        return np.zeros((0, 4), dtype=np.float64)
+    return np.ascontiguousarray(np.vstack(edges))
+
+
+@njit(cache=True, nogil=True)
+def _points_in_polygon(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    edges: npt.NDArray[np.float64],
+) -> npt.NDArray[np.bool_]:
+    """
+    Returns whether each point is inside the polygon given by its edges, with the even-odd rule:
+    a horizontal ray from the point crosses an odd number of edges. The points outside of the
+    bounding box of the edges are rejected without going through them.
+    """
+    inside = np.zeros(len(x), dtype=np.bool_)
+    if len(edges) == 0:
+        return inside
+    min_x = min(np.min(edges[:, 0]), np.min(edges[:, 2]))
+    max_x = max(np.max(edges[:, 0]), np.max(edges[:, 2]))
+    min_y = min(np.min(edges[:, 1]), np.min(edges[:, 3]))
+    max_y = max(np.max(edges[:, 1]), np.max(edges[:, 3]))
+
+    for i in range(len(x)):
+        px = x[i]
+        py = y[i]
+        if px < min_x or px > max_x or py < min_y or py > max_y:
+            continue
+        crossings = False
+        for j in range(len(edges)):
+            x0 = edges[j, 0]
+            y0 = edges[j, 1]
+            x1 = edges[j, 2]
+            y1 = edges[j, 3]
+            if (y0 > py) != (y1 > py) and px < x0 + (py - y0) * (x1 - x0) / (y1 - y0):
+                crossings = not crossings
+        inside[i] = crossings
+    return inside
@@ -0,0 +1,206 @@
+"""
+The conversion of the columns read by the readers to the arrays sent to the tiler.
+
+Each conversion is a single numba kernel, that writes its result in the output array without
+full-size temporaries. The output arrays of a portion can be allocated once with `OutputBuffers`,
+each chunk of the portion being then converted in its rows.
+"""
+
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+from numba import njit
+from pyproj import Transformer
+
+from py3dtiles.typing import OffsetScaleType
+
+
+def transform_coordinates(
+    x: npt.NDArray[Any],
+    y: npt.NDArray[Any],
+    z: npt.NDArray[Any],
+    offset_scale: OffsetScaleType,
+    transformer: Optional[Transformer],
+    input_scales: Optional[npt.ArrayLike] = None,
+    input_offsets: Optional[npt.ArrayLike] = None,
+    out: Optional[npt.NDArray[np.float32]] = None,
+) -> npt.NDArray[np.float32]:
+    """
+    Converts the coordinates read in a file to the float32 coordinates of the tiler.
+
+    :param offset_scale: the offset and the scale of the tiler, and its rotation (because the tile's transform will contain the inverse of this matrix)
+    :param input_scales: the scales of integer coordinates (like the ones of las files)
+    :param input_offsets: the offsets of integer coordinates
+    :param out: the (N, 3) float32 array the coordinates are written in, allocated if None
+    """
+    scales = np.ones(3) if input_scales is None else np.asarray(input_scales)
+    offsets = np.zeros(3) if input_offsets is None else np.asarray(input_offsets)
+
+    if transformer:
+        if input_scales is not None or input_offsets is not None:
+            x = x * scales[0] + offsets[0]
+            y = y * scales[1] + offsets[1]
+            z = z * scales[2] + offsets[2]
+        x, y, z = transformer.transform(x, y, z)
+        scales = np.ones(3)
+        offsets = np.zeros(3)
+
+    return _scale_and_rotate(
+        _to_native_byte_order(x),
+        _to_native_byte_order(y),
+        _to_native_byte_order(z),
+        scales.astype(np.float64),
+        offsets.astype(np.float64),
+        np.asarray(offset_scale[0], dtype=np.float64),
+        np.asarray(offset_scale[1], dtype=np.float64),
+        (
+            np.identity(3)
+            if offset_scale[2] is None
+            else np.asarray(offset_scale[2], dtype=np.float64)
+        ),
+        _get_output(out, len(x), np.float32),
+    )
+
+
+def convert_colors(
+    red: npt.NDArray[Any],
+    green: npt.NDArray[Any],
+    blue: npt.NDArray[Any],
+    color_scale: Optional[float],
+    divisor: float = 1,
+    out: Optional[npt.NDArray[np.uint8]] = None,
+) -> npt.NDArray[np.uint8]:
+    """
+    Converts the color components read in a file to 8 bits colors.
+
+    :param color_scale: the scale applied to the 8 bits components, that are then clipped to 255
+    :param divisor: the divisor that brings the components to 8 bits (256 for 16 bits components)
+    :param out: the (N, 3) uint8 array the colors are written in, allocated if None
+    """
+    return _scale_colors(
+        _to_native_byte_order(red),
+        _to_native_byte_order(green),
+        _to_native_byte_order(blue),
+        (1.0 if color_scale is None else color_scale) / divisor,
+        _get_output(out, len(red), np.uint8),
+    )
+
+
+class OutputBuffers:
+    """
+    The coordinates and the colors of the points of a portion, allocated once and filled chunk
+    by chunk.
+
+    Each chunk is converted in the next rows of the buffers, and keeps them: a chunk may still
+    be sent while the next ones are read (see :py:func:`py3dtiles.utils.prefetch`).
+    """
+
+    def __init__(self, point_count: int) -> None:
+        self.coords = np.empty((point_count, 3), dtype=np.float32)
+        self.colors = np.empty((point_count, 3), dtype=np.uint8)
+        self.start = 0
+
+    def next_rows(
+        self, point_count: int
+    ) -> tuple[Optional[npt.NDArray[np.float32]], Optional[npt.NDArray[np.uint8]]]:
+        """
+        Returns the rows of the next point_count points in the coordinates and the colors, or
+        None if the buffers are full (the arrays of the chunk are then allocated).
+        """
+        end = self.start + point_count
+        if end > len(self.coords):
+            return None, None
+        coords, colors = self.coords[self.start : end], self.colors[self.start : end]
+        self.start = end
+        return coords, colors
+
+
+def sample(values: npt.NDArray[Any], start: int, stride: int) -> npt.NDArray[Any]:
+    """
+    Returns the values whose index in their portion is a multiple of stride, start being the
+    index of the first value in the portion. The points of a portion are then sampled in the
+    same way, whatever the size of the batches they are read by.
+    """
+    if stride == 1:
+        return values
+    return values[-start % stride :: stride]
+
+
+def get_sampled_point_count(point_count: int, stride: int) -> int:
+    """
+    Returns the number of points kept by sample in a portion of point_count points.
+    """
+    return -(-point_count // stride)
+
+
+def _to_native_byte_order(values: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    """
+    Returns the values in the native byte order, that is the only one numba reads correctly
+    (the big endian files are memory-mapped as they are).
+    """
+    if values.dtype.isnative:
+        return values
+    return values.astype(values.dtype.newbyteorder("="))
+
+
+def _get_output(
+    out: Optional[npt.NDArray[Any]], point_count: int, dtype: type[np.generic]
+) -> npt.NDArray[Any]:
+    """
+    Returns out, checked to hold the point_count rows of a kernel, or a new array.
+    """
+    if out is None:
+        return np.empty((point_count, 3), dtype=dtype)
+    if out.shape != (point_count, 3) or out.dtype != dtype:
+        raise ValueError(
+            f"The output array must have the shape {(point_count, 3)} and the dtype "
+            f"{np.dtype(dtype)}, not {out.shape} and {out.dtype}."
+        )
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _scale_and_rotate(
+    x: npt.NDArray[Any],
+    y: npt.NDArray[Any],
+    z: npt.NDArray[Any],
+    input_scales: npt.NDArray[np.float64],
+    input_offsets: npt.NDArray[np.float64],
+    offset: npt.NDArray[np.float64],
+    scale: npt.NDArray[np.float64],
+    rotation: npt.NDArray[np.float64],
+    coords: npt.NDArray[np.float32],
+) -> npt.NDArray[np.float32]:
+    """
+    Applies the input scale and offset, the offset and scale of the tiler and the rotation in
+    a single pass, in coords.
+    """
+    for i in range(len(x)):
+        px = (x[i] * input_scales[0] + input_offsets[0] + offset[0]) * scale[0]
+        py = (y[i] * input_scales[1] + input_offsets[1] + offset[1]) * scale[1]
+        pz = (z[i] * input_scales[2] + input_offsets[2] + offset[2]) * scale[2]
+        for j in range(3):
+            coords[i, j] = (
+                px * rotation[0, j] + py * rotation[1, j] + pz * rotation[2, j]
+            )
+    return coords
+
+
+@njit(cache=True, nogil=True)
+def _scale_colors(
+    red: npt.NDArray[Any],
+    green: npt.NDArray[Any],
+    blue: npt.NDArray[Any],
+    factor: float,
+    colors: npt.NDArray[np.uint8],
+) -> npt.NDArray[np.uint8]:
+    """
+    Scales the color components, clips them to [0, 255] and truncates them to 8 bits in
+    a single pass, in colors.
+    """
+    for i in range(len(red)):
+        colors[i, 0] = min(max(red[i] * factor, 0.0), 255.0)
+        colors[i, 1] = min(max(green[i] * factor, 0.0), 255.0)
+        colors[i, 2] = min(max(blue[i] * factor, 0.0), 255.0)
+    return colors
@@ -1,78 +1,112 @@
+import concurrent.futures
 import csv
-import math
+import io
+import os
 from collections.abc import Generator
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 
 import numpy as np
 import numpy.typing as npt
+from numba import njit
 from pyproj import Transformer
 
+from py3dtiles.reader.point_filter import PointFilter
+from py3dtiles.reader.post_processing import (
+    OutputBuffers,
+    convert_colors,
+    get_sampled_point_count,
+    sample,
+    transform_coordinates,
+)
 from py3dtiles.typing import MetadataReaderType, OffsetScaleType, PortionItemType
 
+# the number of points of a portion
+PORTION_POINT_COUNT = 1_000_000
+# the approximate size of the byte ranges that are scanned in parallel by get_metadata
+SCAN_RANGE_SIZE = 256 * 1024 * 1024
+# the size of the blocks of bytes that are read and parsed at once
+BLOCK_SIZE = 16 * 1024 * 1024
+# only the columns XYZIRGB and the classification are read
+MAX_COLUMN_COUNT = 8
+
+_NEWLINE = ord("\n")
+_SPACE = ord(" ")
+_TAB = ord("\t")
+_CARRIAGE_RETURN = ord("\r")
+_ZERO = ord("0")
+_NINE = ord("9")
+_MINUS = ord("-")
+_PLUS = ord("+")
+_DOT = ord(".")
+_LOWER_E = ord("e")
+_UPPER_E = ord("E")
+# the powers of ten that are exactly represented by a float64
+_EXACT_POWERS_OF_TEN = np.array([10.0**i for i in range(23)])
 
-def get_metadata(path: Path, fraction: int = 100) -> MetadataReaderType:
-    aabb = None
-    count = 0
-    seek_values = []
-
-    with path.open() as f:
-        file_sample = f.read(
-            2048
-        )  # For performance reasons we just snif the first part
-        dialect = csv.Sniffer().sniff(file_sample)
-
-        f.seek(0)
-        if csv.Sniffer().has_header(file_sample):
-            f.readline()
-
-        while True:
-            batch = 10_000
-            points = np.zeros((batch, 3))
-
-            offset = f.tell()
-            for i in range(batch):
-                line = f.readline()
-                if not line:
-                    points = np.resize(points, (i, 3))
-                    break
-                points[i] = [float(s) for s in line.split(dialect.delimiter)][:3]
-
-            if points.shape[0] == 0:
-                break
-
-            if not count % 1_000_000:
-                seek_values += [offset]
-
-            count += points.shape[0]
-            batch_aabb = np.array([np.min(points, axis=0), np.max(points, axis=0)])
 
-            # Update aabb
-            if aabb is None:
-                aabb = batch_aabb
-            else:
-                aabb[0] = np.minimum(aabb[0], batch_aabb[0])
-                aabb[1] = np.maximum(aabb[1], batch_aabb[1])
+def get_metadata(path: Path, fraction: int = 100) -> MetadataReaderType:
+    """
+    Scans the points of the file to get its aabb and its portions.
 
-        # We need an exact point count
-        point_count = count * fraction // 100
+    The file is split in ranges of about SCAN_RANGE_SIZE bytes, starting on a line, that are scanned
+    in parallel by at most one thread per cpu. The portions are made in each range, so the last
+    portion of a range may have less than PORTION_POINT_COUNT points.
+    """
+    with path.open("rb") as f:
+        delimiter, column_count = _read_header(f)
+        range_starts = _get_range_starts(f, path.stat().st_size)
+    range_ends = range_starts[1:] + [-1]
+
+    if len(range_starts) == 1:
+        range_infos = [
+            _scan_range(path, delimiter, column_count, range_starts[0], range_ends[0])
+        ]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(len(range_starts), os.cpu_count() or 1),
+            thread_name_prefix="xyz_scan",
+        ) as executor:
+            range_infos = list(
+                executor.map(
+                    lambda start, end: _scan_range(
+                        path, delimiter, column_count, start, end
+                    ),
+                    range_starts,
+                    range_ends,
+                )
+            )
 
-        _1M = min(count, 1_000_000)
-        steps = math.ceil(count / _1M)
-        if steps != len(seek_values):
-            raise ValueError(
-                "the size of seek_values should be equal to steps,"
-                f"currently steps = {steps} and len(seek_values) = {len(seek_values)}"
+    aabb = None
+    count = 0
+    portions: list[PortionItemType] = []
+    for range_count, range_aabb, seek_values in range_infos:
+        portions += [
+            (
+                count + i * PORTION_POINT_COUNT,
+                count + min(range_count, (i + 1) * PORTION_POINT_COUNT),
+                seek_value,
             )
-        portions: list[PortionItemType] = [
-            (i * _1M, min(count, (i + 1) * _1M), seek_values[i]) for i in range(steps)
+            for i, seek_value in enumerate(seek_values)
         ]
+        count += range_count
 
-        pointcloud_file_portions = [(str(path), p) for p in portions]
+        if range_aabb is None:
+            continue
+        if aabb is None:
+            aabb = range_aabb
+        else:
+            aabb[0] = np.minimum(aabb[0], range_aabb[0])
+            aabb[1] = np.maximum(aabb[1], range_aabb[1])
 
     if aabb is None:
         raise ValueError(f"There is no point in the file {path}")
 
+    # We need an exact point count
+    point_count = count * fraction // 100
+
+    pointcloud_file_portions = [(str(path), p) for p in portions]
+
     return {
         "portions": pointcloud_file_portions,
         "aabb": aabb,
@@ -82,6 +116,64 @@ def get_metadata(path: Path, fraction: int = 100) -> MetadataReaderType:
     }
 
 
+def _get_range_starts(f: BinaryIO, file_size: int) -> list[int]:
+    """
+    Returns the offsets of the lines that start the ranges scanned by get_metadata.
+    f must be positioned on the first point.
+    """
+    range_starts = [f.tell()]
+    for offset in range(range_starts[0] + SCAN_RANGE_SIZE, file_size, SCAN_RANGE_SIZE):
+        # go to the start of the next line (or stay at offset if a line starts there)
+        f.seek(offset - 1)
+        f.readline()
+        range_start = f.tell()
+        if range_starts[-1] < range_start < file_size:
+            range_starts.append(range_start)
+    return range_starts
+
+
+def _scan_range(
+    path: Path, delimiter: str, column_count: int, start: int, end: int
+) -> tuple[int, Optional[npt.NDArray[np.float64]], list[int]]:
+    """
+    Scans the points between the offsets start and end (the end of the file if end is negative).
+
+    Returns the point count, the aabb of the points (None if there is no point) and the offset
+    of every PORTION_POINT_COUNT point, starting from the first one.
+    """
+    aabb = None
+    count = 0
+    seek_values = []
+
+    with path.open("rb") as f:
+        f.seek(start)
+        for rows, row_offsets in _read_rows(
+            f,
+            str(path),
+            delimiter,
+            column_count,
+            max_byte_count=end - start if end >= 0 else -1,
+        ):
+            # the offset of the first point of each portion
+            seek_values += row_offsets[
+                -count % PORTION_POINT_COUNT :: PORTION_POINT_COUNT
+            ].tolist()
+
+            count += len(rows)
+            batch_aabb = np.array(
+                [np.min(rows[:, :3], axis=0), np.max(rows[:, :3], axis=0)]
+            )
+
+            # Update aabb
+            if aabb is None:
+                aabb = batch_aabb
+            else:
+                aabb[0] = np.minimum(aabb[0], batch_aabb[0])
+                aabb[1] = np.maximum(aabb[1], batch_aabb[1])
+
+    return count, aabb, seek_values
+
+
 def run(
     filename: str,
     offset_scale: OffsetScaleType,
@@ -89,6 +181,8 @@ def run(
     transformer: Optional[Transformer],
     color_scale: Optional[float],
     write_intensity: bool,
+    stride: int = 1,
+    point_filter: Optional[PointFilter] = None,
 ) -> Generator[
     tuple[
         npt.NDArray[np.float32],
@@ -117,80 +211,363 @@ def run(
       - 8 columns mean XYZIRGB followed by classification data. Classification data must be integers only.
       - all columns after the 8th column will be ignored.
 
-    NOTE: we assume RGB are 8 bits components.
+    NOTE: we assume RGB are 8 bits components.
+
+    The file is read by blocks of BLOCK_SIZE bytes, each block being parsed at once. Only one
+    point out of stride is kept, then the points selected by point_filter.
 
     (*) See: https://docs.safe.com/fme/html/FME_Desktop_Documentation/FME_ReadersWriters/pointcloudxyz/pointcloudxyz.htm
     """
-    with open(filename) as f:
-
-        dialect = csv.Sniffer().sniff(f.read(2048))
-        f.seek(0)
-        f.readline()  # skip first line in case there is a header we promised to ignore
-        feature_nb = len(f.readline().split(dialect.delimiter))
-        if feature_nb < 8:
-            feature_nb = 7  # we pad to 7 columns with 0
-        if feature_nb > 8:
-            feature_nb = 8  # We ignore other data as downstream only 1 value for classification data is supported.
-            # Once downstream supports multiple classification values this reader will as well
-            # when this line is removed.
+    with open(filename, "rb") as f:
+        delimiter, column_count = _read_header(f)
 
         point_count = portion[1] - portion[0]
 
         step = min(point_count, max((point_count) // 10, 100000))
+        buffers = OutputBuffers(get_sampled_point_count(point_count, stride))
 
         f.seek(portion[2])
 
-        for _ in range(0, point_count, step):
-            points = np.zeros((step, feature_nb), dtype=np.float32)
-
-            for j in range(step):
-                line = f.readline()
-                if not line:
-                    points = np.resize(points, (j, feature_nb))
-                    break
-                line_features: list[Optional[float]] = [
-                    float(s) for s in line.split(dialect.delimiter)[:feature_nb]
-                ]
-                if len(line_features) == 3:
-                    line_features += [None] * 4  # Insert intensity and RGB
-                elif len(line_features) == 4:
-                    line_features += [None] * 3  # Insert RGB
-                elif len(line_features) == 6:
-                    line_features.insert(3, None)  # Insert intensity
-                points[j] = line_features
-
-            x, y, z = (points[:, c] for c in [0, 1, 2])
-
-            if transformer:
-                x, y, z = transformer.transform(x, y, z)
-
-            x = (x + offset_scale[0][0]) * offset_scale[1][0]
-            y = (y + offset_scale[0][1]) * offset_scale[1][1]
-            z = (z + offset_scale[0][2]) * offset_scale[1][2]
-
-            coords = np.vstack((x, y, z)).transpose()
-
-            if offset_scale[2] is not None:
-                # Apply transformation matrix (because the tile's transform will contain
-                # the inverse of this matrix)
-                coords = np.dot(coords, offset_scale[2])
-
-            coords = np.ascontiguousarray(coords.astype(np.float32))
-
-            # Read colors: 3 last columns when excluding classification data
-            if color_scale is None:
-                colors = points[:, 4:7].astype(np.uint8)
-            else:
-                colors = np.clip(points[:, 4:7] * color_scale, 0, 255).astype(np.uint8)
+        block_start = 0
+        for block_rows, _ in _read_rows(
+            f, filename, delimiter, column_count, point_count
+        ):
+            for start in range(0, len(block_rows), step):
+                rows = sample(
+                    block_rows[start : start + step], block_start + start, stride
+                )
+                if point_filter is not None:
+                    rows = rows[
+                        point_filter.mask(
+                            rows[:, 0],
+                            rows[:, 1],
+                            rows[:, 2],
+                            rows[:, 7] if column_count > 7 else None,
+                        )
+                    ]
+
+                coords_out, colors_out = buffers.next_rows(len(rows))
+                coords = transform_coordinates(
+                    rows[:, 0],
+                    rows[:, 1],
+                    rows[:, 2],
+                    offset_scale,
+                    transformer,
+                    out=coords_out,
+                )
+
+                # Read colors: 3 last columns when excluding intensity and classification data
+                if column_count >= 6:
+                    color_column = 3 if column_count == 6 else 4
+                    colors = convert_colors(
+                        rows[:, color_column],
+                        rows[:, color_column + 1],
+                        rows[:, color_column + 2],
+                        color_scale,
+                        out=colors_out,
+                    )
+                else:
+                    colors = np.zeros((len(rows), 3), dtype=np.uint8)
+
+                if column_count > 7:  # we have classification data
+                    classification = np.array(rows[:, 7], dtype=np.uint8).reshape(-1, 1)
+                else:
+                    classification = np.zeros((len(rows), 1), dtype=np.uint8)
+
+                if column_count in (4, 7, 8) and write_intensity:
+                    intensity = np.array(rows[:, 3], dtype=np.uint8).reshape(-1, 1)
+                else:
+                    intensity = np.zeros((len(rows), 1), dtype=np.uint8)
+
+                yield coords, colors, classification, intensity
+
+            block_start += len(block_rows)
+
+
+def read_stream(
+    f: BinaryIO, name: str = "<stdin>"
+) -> Generator[npt.NDArray[np.void], None, None]:
+    """
+    Reads the points of a text stream (a pipe or the standard input) in a single pass without
+    seeking, and yields them by blocks as structured arrays (see :py:mod:`py3dtiles.reader.npy_reader`).
 
-            if feature_nb > 7:  # we have classification data
-                classification = np.array(points[:, 7:], dtype=np.uint8).reshape(-1, 1)
-            else:
-                classification = np.zeros((points.shape[0], 1), dtype=np.uint8)
+    The columns are the same as in the files read by `run`. The points are yielded as soon
+    as their lines have arrived, without waiting for a full block of BLOCK_SIZE bytes.
+    """
+    # read1 returns what is available in the stream instead of waiting for the requested size
+    read = getattr(f, "read1", f.read)
+    # the header is guessed from the first lines of the stream
+    buffer = read(2048)
+    while buffer.count(b"\n") < 2:
+        data = read(2048)
+        if not data:
+            break
+        buffer += data
+    buffer_file = io.BytesIO(buffer)
+    delimiter, column_count = _read_header(buffer_file)
+    data_offset = buffer_file.tell()
+
+    fields = [("x", "<f8"), ("y", "<f8"), ("z", "<f8")]
+    if column_count >= 6:
+        fields += [("red", "<f4"), ("green", "<f4"), ("blue", "<f4")]
+    if column_count in (4, 7, 8):
+        fields.append(("intensity", "<f4"))
+    if column_count > 7:
+        fields.append(("classification", "<f4"))
+    color_column = 3 if column_count == 6 else 4
+
+    for rows, _ in _read_rows(
+        f,
+        name,
+        delimiter,
+        column_count,
+        head=buffer[data_offset:],
+        offset=data_offset,
+        partial_reads=True,
+    ):
+        points = np.empty(len(rows), dtype=fields)
+        for i, coord in enumerate(("x", "y", "z")):
+            points[coord] = rows[:, i]
+        if column_count >= 6:
+            for i, color in enumerate(("red", "green", "blue")):
+                points[color] = rows[:, color_column + i]
+        if column_count in (4, 7, 8):
+            points["intensity"] = rows[:, 3]
+        if column_count > 7:
+            points["classification"] = rows[:, 7]
+        yield points
+
+
+def _read_header(f: BinaryIO) -> tuple[str, int]:
+    """
+    Guesses the delimiter of the columns, skips the header line (if any) and
+    returns the delimiter and the number of columns to read (0 if there is no point).
 
-            if feature_nb in (4, 7, 8) and write_intensity:
-                intensity = np.array(points[:, 3], dtype=np.uint8).reshape(-1, 1)
-            else:
-                intensity = np.zeros((points.shape[0], 1), dtype=np.uint8)
+    The file is then positioned on the first point.
+    """
+    # For performance reasons we just snif the first part
+    file_sample = f.read(2048).decode(errors="replace")
+    sniffer = csv.Sniffer()
+    delimiter = sniffer.sniff(file_sample).delimiter
+
+    f.seek(0)
+    if sniffer.has_header(file_sample):
+        f.readline()
+
+    data_offset = f.tell()
+    first_line = f.readline().decode(errors="replace")
+    f.seek(data_offset)
+
+    column_count = len(first_line.split(None if delimiter.isspace() else delimiter))
+    if column_count in (1, 2, 5):
+        raise ValueError(
+            f"The points must have 3, 4, 6, 7 or more columns, not {column_count}"
+        )
+    return delimiter, min(column_count, MAX_COLUMN_COUNT)
+
+
+def _read_rows(
+    f: BinaryIO,
+    filename: str,
+    delimiter: str,
+    column_count: int,
+    max_row_count: int = -1,
+    max_byte_count: int = -1,
+    head: bytes = b"",
+    offset: Optional[int] = None,
+    partial_reads: bool = False,
+) -> Generator[tuple[npt.NDArray[np.float64], npt.NDArray[np.int64]], None, None]:
+    """
+    Parses the lines of f from its current position, by blocks of BLOCK_SIZE bytes.
+
+    Yields the values of the first column_count columns of each line, and the offset of
+    each line in the file. At most max_row_count lines are parsed and max_byte_count bytes
+    are read, if they are positive.
+
+    For streams that can't seek, head is the bytes already read from f and offset is
+    their offset in the stream. With partial_reads, each read returns what is available in
+    f (at most BLOCK_SIZE bytes) and its complete lines are parsed right away.
+    """
+    if column_count == 0:
+        return
+    read = getattr(f, "read1", f.read) if partial_reads else f.read
+    if offset is None:
+        offset = f.tell()
+    # the lines of head are parsed before reading f, that may wait for the next lines
+    pending = b""
+    block = head
+    at_end = False
+    row_count = 0
+    byte_count = 0
+    while True:
+        data = pending + block
+        if not at_end:
+            # the last line may be incomplete, it is parsed with the next block
+            end = data.rfind(b"\n") + 1
+            data, pending = data[:end], data[end:]
+
+        if data:
+            rows, row_offsets, error_offset = _parse_lines(
+                np.frombuffer(data, dtype=np.uint8),
+                ord(delimiter),
+                column_count,
+                max_row_count - row_count if max_row_count >= 0 else -1,
+            )
+            if error_offset >= 0:
+                line = data[error_offset:].split(b"\n", 1)[0]
+                raise ValueError(
+                    f"Could not read the point {line.decode(errors='replace')!r} "
+                    f"at offset {offset + error_offset} of {filename}"
+                )
+            row_count += len(rows)
+            yield rows, row_offsets + offset
+            offset += len(data)
+
+        if at_end or 0 <= max_row_count <= row_count:
+            break
+        if max_byte_count < 0:
+            block = read(BLOCK_SIZE)
+        else:
+            block = read(min(BLOCK_SIZE, max_byte_count - byte_count))
+        byte_count += len(block)
+        at_end = not block
+
+
+@njit(cache=True, nogil=True)
+def _parse_lines(
+    chars: npt.NDArray[np.uint8],
+    delimiter: int,
+    column_count: int,
+    max_row_count: int,
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.int64], int]:
+    """
+    Parses the first column_count numbers of each line of chars. Blank lines are skipped,
+    whitespaces around the numbers are ignored, and if the delimiter is a whitespace,
+    consecutive whitespaces are a single delimiter.
+
+    Returns the values, the offset of each parsed line and -1, or the offset of the
+    first line that could not be parsed as the third value.
+    """
+    delimiter_is_space = delimiter in (_SPACE, _TAB, _CARRIAGE_RETURN)
+    line_count = 1
+    for char in chars:
+        if char == _NEWLINE:
+            line_count += 1
+    if max_row_count >= 0:
+        line_count = min(line_count, max_row_count)
+
+    values = np.empty((line_count, column_count), dtype=np.float64)
+    offsets = np.empty(line_count, dtype=np.int64)
+    row = 0
+    i = 0
+    n = len(chars)
+    while i < n and row < line_count:
+        line_start = i
+        i = _skip_spaces(chars, i)
+        if i == n:
+            break
+        if chars[i] == _NEWLINE:
+            i += 1
+            continue
+
+        column = 0
+        while column < column_count:
+            value, i = _parse_float(chars, i)
+            if i < 0:
+                return values[:row], offsets[:row], line_start
+            values[row, column] = value
+            column += 1
+
+            field_end = i
+            i = _skip_spaces(chars, i)
+            if i == n or chars[i] == _NEWLINE:
+                break
+            if chars[i] == delimiter:
+                i = _skip_spaces(chars, i + 1)
+            elif not delimiter_is_space or i == field_end:
+                return values[:row], offsets[:row], line_start
+
+        if column < column_count:
+            return values[:row], offsets[:row], line_start
 
-            yield coords, colors, classification, intensity
+        # the other columns are ignored
+        while i < n and chars[i] != _NEWLINE:
+            i += 1
+        i += 1
+
+        offsets[row] = line_start
+        row += 1
+
+    return values[:row], offsets[:row], -1
+
+
+@njit(cache=True, nogil=True)
+def _skip_spaces(chars: npt.NDArray[np.uint8], i: int) -> int:
+    while i < len(chars) and (
+        chars[i] == _SPACE or chars[i] == _TAB or chars[i] == _CARRIAGE_RETURN
+    ):
+        i += 1
+    return i
+
+
+@njit(cache=True, nogil=True)
+def _parse_float(chars: npt.NDArray[np.uint8], i: int) -> tuple[float, int]:
+    """
+    Parses the decimal number starting at i, with an optional sign and exponent.
+
+    Returns the number and the index of the next character, or -1 as index if there is no number at i.
+    The number is exact (like float()) when it has at most 15 significant digits and 22 decimals.
+    """
+    n = len(chars)
+    negative = False
+    if i < n and (chars[i] == _MINUS or chars[i] == _PLUS):
+        negative = chars[i] == _MINUS
+        i += 1
+
+    mantissa = 0
+    exponent = 0
+    digit_count = 0
+    while i < n and _ZERO <= chars[i] <= _NINE:
+        if mantissa < 10**17:
+            mantissa = mantissa * 10 + (chars[i] - _ZERO)
+        else:
+            exponent += 1
+        digit_count += 1
+        i += 1
+    if i < n and chars[i] == _DOT:
+        i += 1
+        while i < n and _ZERO <= chars[i] <= _NINE:
+            if mantissa < 10**17:
+                mantissa = mantissa * 10 + (chars[i] - _ZERO)
+                exponent -= 1
+            digit_count += 1
+            i += 1
+    if digit_count == 0:
+        return 0.0, -1
+
+    if i < n and (chars[i] == _LOWER_E or chars[i] == _UPPER_E):
+        i += 1
+        exponent_sign = 1
+        if i < n and (chars[i] == _MINUS or chars[i] == _PLUS):
+            if chars[i] == _MINUS:
+                exponent_sign = -1
+            i += 1
+        if i == n or not _ZERO <= chars[i] <= _NINE:
+            return 0.0, -1
+        exponent_value = 0
+        while i < n and _ZERO <= chars[i] <= _NINE:
+            if exponent_value < 10_000:
+                exponent_value = exponent_value * 10 + (chars[i] - _ZERO)
+            i += 1
+        exponent += exponent_sign * exponent_value
+
+    # a division by an exact power of ten gives the correctly rounded value
+    if 0 <= exponent < len(_EXACT_POWERS_OF_TEN):
+        value = mantissa * _EXACT_POWERS_OF_TEN[exponent]
+    elif 0 < -exponent < len(_EXACT_POWERS_OF_TEN):
+        value = mantissa / _EXACT_POWERS_OF_TEN[-exponent]
+    elif exponent >= 0:
+        value = mantissa * 10.0**exponent
+    else:
+        value = mantissa / 10.0 ** (-exponent)
+    return (-value if negative else value), i
@@ -82,6 +82,12 @@ class Tiler(ABC, Generic[_SharedMetadataT, _TilerWorkerT]):
         Checks if there is no too much memory used by the tiler and do actions in function
         """
 
+    def release(self) -> None:
+        """
+        Frees the resources held by the tiler outside of its working directory.
+        This method is called at the end of the conversion, even if it failed.
+        """
+
     @abstractmethod
     def print_summary(self) -> None:
         """
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import math
+from pathlib import PurePath
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+from pyproj import Transformer
+
+from py3dtiles.typing import OffsetScaleType, PortionItemType, PortionsType
+from py3dtiles.utils import READER_MAP, SubdivisionType, aabb_size_to_subdivision_type
+
+from .grid_transformer import GridTransformer
+from .pnts import MIN_POINT_SIZE
+
+# the spacing derived from the density is never lower than the default spacing divided by this value
+MAX_SPACING_REDUCTION = 16
+# the grid cell count must stay lower or equal to 8 (see Grid.balance)
+MAX_GRID_CELL_COUNT = 8
+# in cell size unit
+CELL_BOUNDARY_TOLERANCE = 1e-3
+# a child with a lower share of the points of its parent is considered sparse...
+SPARSE_CHILD_SHARE = 1 / 32
+# ... and each sparse child adds this cost to the subdivision (see subdivision_cost)
+SPARSE_CHILD_COST = 1 / 32
+
+
+class DensityHistogram:
+    """
+    A coarse 3D histogram of the point density, built from a sample of the input points.
+
+    The histogram is expressed in the root aabb coordinates (the ones of the nodes). Its cells
+    are cubic, the longest axis of the aabb is divided in `resolution` cells.
+    """
+
+    def __init__(self, aabb: npt.NDArray[np.float64], resolution: int = 32) -> None:
+        self.aabb = aabb.astype(np.float64)
+        size = np.maximum(self.aabb[1] - self.aabb[0], MIN_POINT_SIZE)
+        self.cell_size = float(np.max(size)) / resolution
+        self.shape = np.maximum(np.ceil(size / self.cell_size), 1).astype(np.int64)
+        self.counts = np.zeros(tuple(self.shape), dtype=np.uint32)
+        self.sampled_point_count = 0
+
+    @classmethod
+    def from_portions(
+        cls,
+        aabb: npt.NDArray[np.float64],
+        portions: PortionsType,
+        offset_scale: OffsetScaleType,
+        transformer: Transformer | GridTransformer | None,
+        sample_point_count: int = 1_000_000,
+        max_sampled_portions: int = 256,
+    ) -> DensityHistogram:
+        """
+        Builds the histogram by reading small windows spread over the input portions.
+
+        :param aabb: the root aabb
+        :param portions: the portions of all input files, as returned by the readers
+        :param offset_scale: the offset_scale that is given to the readers (so that the sampled points are in the root aabb coordinates)
+        :param sample_point_count: the approximate number of points to read
+        :param max_sampled_portions: the maximum number of portions to read from, evenly picked among all the portions
+        """
+        histogram = cls(aabb)
+        if not portions:
+            return histogram
+
+        step = max(1, math.ceil(len(portions) / max_sampled_portions))
+        sampled_portions = portions[::step]
+        windows_per_portion = 4
+        window_size = max(
+            1, sample_point_count // (len(sampled_portions) * windows_per_portion)
+        )
+
+        for filename, portion in sampled_portions:
+            reader = READER_MAP[PurePath(filename).suffix]
+            for window in _sample_portion(portion, windows_per_portion, window_size):
+                for coords, _, _, _ in reader.run(
+                    filename, offset_scale, window, transformer, None, False
+                ):
+                    histogram.add_points(coords)
+
+        return histogram
+
+    def add_points(self, xyz: npt.NDArray[np.float32]) -> None:
+        if len(xyz) == 0:
+            return
+        indices = ((xyz - self.aabb[0]) / self.cell_size).astype(np.int64)
+        indices = np.clip(indices, 0, self.shape - 1)
+        flat_indices = np.ravel_multi_index(tuple(indices.T), tuple(self.shape))
+        self.counts += (
+            np.bincount(flat_indices, minlength=self.counts.size)
+            .reshape(self.counts.shape)
+            .astype(np.uint32)
+        )
+        self.sampled_point_count += len(xyz)
+
+    def _cell_range(
+        self, aabb: npt.NDArray[np.floating[Any]]
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        """
+        Returns the range of the histogram cells covered by aabb.
+        """
+        # the tolerance makes the result independent of the aabb precision (float32 or float64)
+        start = np.clip(
+            np.floor(
+                (aabb[0] - self.aabb[0]) / self.cell_size + CELL_BOUNDARY_TOLERANCE
+            ).astype(np.int64),
+            0,
+            self.shape - 1,
+        )
+        end = np.clip(
+            np.ceil(
+                (aabb[1] - self.aabb[0]) / self.cell_size - CELL_BOUNDARY_TOLERANCE
+            ).astype(np.int64),
+            start + 1,
+            self.shape,
+        )
+        return start, end
+
+    def occupied_size(
+        self, aabb: npt.NDArray[np.floating[Any]]
+    ) -> npt.NDArray[np.float64] | None:
+        """
+        Returns the size of the part of aabb that contains sampled points, or None if the histogram has no point in aabb.
+        """
+        start, end = self._cell_range(aabb)
+        occupied = np.argwhere(
+            self.counts[start[0] : end[0], start[1] : end[1], start[2] : end[2]] > 0
+        )
+        if len(occupied) == 0:
+            return None
+
+        occupied_min = self.aabb[0] + (start + occupied.min(axis=0)) * self.cell_size
+        occupied_max = (
+            self.aabb[0] + (start + occupied.max(axis=0) + 1) * self.cell_size
+        )
+        return np.minimum(occupied_max, aabb[1]) - np.maximum(  # type: ignore [no-any-return]
+            occupied_min, aabb[0]
+        )
+
+    def subdivision_type(self, aabb: npt.NDArray[np.floating[Any]]) -> SubdivisionType:
+        """
+        Chooses between a quadtree and an octree subdivision for the node of this aabb.
+
+        When the aabb covers at least 2 histogram cells on each axis, the subdivision with the
+        lowest cost (see `subdivision_cost`) is chosen. Otherwise, the histogram is too coarse
+        to estimate the children occupancy, and the aspect ratio rule is applied on the
+        occupied part of aabb instead of aabb itself.
+        """
+        start, end = self._cell_range(aabb)
+        if np.all(end - start >= 2):
+            counts = self.counts[
+                start[0] : end[0], start[1] : end[1], start[2] : end[2]
+            ]
+            if counts.any():
+                quadtree_cost = subdivision_cost(
+                    _children_counts(counts, SubdivisionType.QUADTREE)
+                )
+                octree_cost = subdivision_cost(
+                    _children_counts(counts, SubdivisionType.OCTREE)
+                )
+                # on equality, the quadtree makes fewer tiles
+                if octree_cost < quadtree_cost:
+                    return SubdivisionType.OCTREE
+                return SubdivisionType.QUADTREE
+
+        size = self.occupied_size(aabb)
+        if size is None:
+            size = aabb[1] - aabb[0]
+        return aabb_size_to_subdivision_type(np.maximum(size, MIN_POINT_SIZE))
+
+    def spacing_factor(self) -> float:
+        """
+        Returns the factor to apply to the default root spacing.
+
+        The default spacing supposes that the points cover the whole horizontal extent of the aabb. The factor is the
+        square root of the ratio between the occupied surface and this extent, so that the points of sparse datasets
+        (corridors, power lines...) are spread on fewer levels.
+        """
+        occupied_cell_count = np.count_nonzero(self.counts)
+        if occupied_cell_count == 0:
+            return 1.0
+        sorted_size = np.sort(np.maximum(self.aabb[1] - self.aabb[0], MIN_POINT_SIZE))
+        covered_ratio = (
+            occupied_cell_count
+            * self.cell_size**2
+            / (sorted_size[2] * sorted_size[1])
+        )
+        return float(np.clip(math.sqrt(covered_ratio), 1 / MAX_SPACING_REDUCTION, 1.0))
+
+    def grid_initial_cell_count(self, default_cell_count: int) -> int:
+        """
+        Returns the initial number of grid cells per axis.
+
+        With sparse data, most of the cells are empty and the occupied ones get crowded. The cell count is increased
+        so that the number of occupied cells stays in the same order as with dense data.
+        """
+        occupied_columns = np.count_nonzero(self.counts.sum(axis=2))
+        if occupied_columns == 0:
+            return default_cell_count
+        occupied_ratio = occupied_columns / (self.shape[0] * self.shape[1])
+        return int(
+            np.clip(
+                round(default_cell_count / math.sqrt(occupied_ratio)),
+                default_cell_count,
+                MAX_GRID_CELL_COUNT,
+            )
+        )
+
+
+def subdivision_cost(children_counts: npt.NDArray[np.uint64]) -> float:
+    """
+    Returns the cost of a subdivision, from the estimated point count of each child.
+
+    The main term is the share of the points that goes in the most populated child: the
+    lower it is, the fewer levels are needed under this node. Each child getting a very small
+    share of the points adds a penalty, as it makes a small tile that is poorly balanced with
+    its siblings (the top of the buildings in an octree subdivision of a city for instance).
+    """
+    total = children_counts.sum()
+    if total == 0:
+        return 0.0
+    shares = children_counts[children_counts > 0] / total
+    sparse_child_count = np.count_nonzero(shares < SPARSE_CHILD_SHARE)
+    return float(shares.max() + SPARSE_CHILD_COST * sparse_child_count)
+
+
+def _children_counts(
+    counts: npt.NDArray[np.uint32], subdivision_type: SubdivisionType
+) -> npt.NDArray[np.uint64]:
+    """
+    Returns the point count of each child of a node from the histogram cells it covers.
+    A cell goes in the child that contains its center.
+    """
+    half = [counts.shape[0] // 2, counts.shape[1] // 2, counts.shape[2] // 2]
+    z_ranges = (
+        [slice(None)]
+        if subdivision_type == SubdivisionType.QUADTREE
+        else [slice(None, half[2]), slice(half[2], None)]
+    )
+    return np.array(
+        [
+            counts[x_range, y_range, z_range].sum(dtype=np.uint64)
+            for x_range in (slice(None, half[0]), slice(half[0], None))
+            for y_range in (slice(None, half[1]), slice(half[1], None))
+            for z_range in z_ranges
+        ],
+        dtype=np.uint64,
+    )
+
+
+def _sample_portion(
+    portion: PortionItemType, window_count: int, window_size: int
+) -> list[PortionItemType]:
+    """
+    Returns small portions spread over portion.
+
+    Portions with a seek offset (the third value) can only be read from their start,
+    so only their first points are sampled.
+    """
+    start, end = portion[0], portion[1]
+    if len(portion) > 2:
+        return [(start, min(end, start + window_count * window_size), *portion[2:])]
+
+    if end - start <= window_count * window_size:
+        return [portion]
+
+    stride = (end - start) // window_count
+    return [
+        (window_start, window_start + window_size)
+        for window_start in range(start, start + window_count * stride, stride)
+    ]
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import numpy.typing as npt
+from numba import njit
+from pyproj import Transformer
+
+# the maximum number of grid nodes (each node stores 3 float64)
+MAX_GRID_NODE_COUNT = 2**18
+# the number of random points where the interpolation is compared to the exact transformation
+VALIDATION_POINT_COUNT = 4096
+
+
+class GridTransformer:
+    """
+    Approximates a pyproj transformer inside an aabb by interpolating the exact transformations
+    of the nodes of a regular 3D grid.
+
+    The grid is refined until the error measured at random points of the aabb is lower than
+    half of the tolerance, the other half being a margin for the points that are not checked.
+    Its cells are as cubic as possible: the longest axes are divided first.
+
+    Like :py:class:`pyproj.Transformer`, it has a `transform(x, y, z)` method, so that the
+    readers use it in place of the exact transformer.
+    """
+
+    def __init__(
+        self,
+        aabb: npt.NDArray[np.float64],
+        node_counts: npt.NDArray[np.int64],
+        values: npt.NDArray[np.float64],
+    ) -> None:
+        self.origin = np.array(aabb[0], dtype=np.float64)
+        self.cell_size = (aabb[1] - aabb[0]) / (node_counts - 1)
+        self.values = values
+
+    @classmethod
+    def from_transformer(
+        cls,
+        transformer: Transformer,
+        aabb: npt.NDArray[np.float64],
+        tolerance: float,
+        max_node_count: int = MAX_GRID_NODE_COUNT,
+    ) -> GridTransformer | None:
+        """
+        Builds the grid of transformer over aabb, or returns None if the tolerance (in the units
+        of the output crs) can't be reached with less than max_node_count nodes.
+        """
+        aabb = np.array(aabb, dtype=np.float64)
+        size = aabb[1] - aabb[0]
+
+        rng = np.random.default_rng(0)
+        samples = aabb[0] + rng.random((VALIDATION_POINT_COUNT, 3)) * size
+        expected = np.array(
+            transformer.transform(samples[:, 0], samples[:, 1], samples[:, 2])
+        ).T
+
+        cell_counts = np.ones(3, dtype=np.int64)
+        while True:
+            node_counts = cell_counts + 1
+            if np.prod(node_counts) > max_node_count:
+                return None
+
+            grid_transformer = cls(
+                aabb, node_counts, _transform_grid(transformer, aabb, node_counts)
+            )
+            error = np.max(
+                np.linalg.norm(
+                    np.array(
+                        grid_transformer.transform(
+                            samples[:, 0], samples[:, 1], samples[:, 2]
+                        )
+                    ).T
+                    - expected,
+                    axis=1,
+                )
+            )
+            if error <= tolerance / 2:
+                return grid_transformer
+
+            # the axes whose cells are the longest are divided
+            cell_sizes = size / cell_counts
+            cell_counts[cell_sizes > np.max(cell_sizes) / math.sqrt(2)] *= 2
+
+    def transform(
+        self,
+        x: npt.ArrayLike,
+        y: npt.ArrayLike,
+        z: npt.ArrayLike,
+    ) -> tuple[
+        npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.float64]
+    ]:
+        coords = _interpolate(
+            np.asarray(x, dtype=np.float64),
+            np.asarray(y, dtype=np.float64),
+            np.asarray(z, dtype=np.float64),
+            self.origin,
+            self.cell_size,
+            self.values,
+        )
+        return coords[:, 0], coords[:, 1], coords[:, 2]
+
+
+def _transform_grid(
+    transformer: Transformer,
+    aabb: npt.NDArray[np.float64],
+    node_counts: npt.NDArray[np.int64],
+) -> npt.NDArray[np.float64]:
+    """
+    Returns the exact transformation of each node of the grid, as a (nx, ny, nz, 3) array.
+    """
+    axes = [
+        np.linspace(aabb[0][i], aabb[1][i], node_counts[i], dtype=np.float64)
+        for i in range(3)
+    ]
+    x, y, z = np.meshgrid(*axes, indexing="ij")
+    transformed = transformer.transform(x.ravel(), y.ravel(), z.ravel())
+    return np.ascontiguousarray(
+        np.stack(transformed, axis=-1).reshape(tuple(node_counts) + (3,))
+    )
+
+
+@njit(cache=True, nogil=True)
+def _interpolate(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    z: npt.NDArray[np.float64],
+    origin: npt.NDArray[np.float64],
+    cell_size: npt.NDArray[np.float64],
+    values: npt.NDArray[np.float64],
+) -> npt.NDArray[np.float64]:
+    """
+    Interpolates trilinearly the values of the grid nodes at each point. The points outside
+    of the grid are extrapolated from the closest cell.
+    """
+    result = np.empty((len(x), 3), dtype=np.float64)
+    point = np.empty(3, dtype=np.float64)
+    cell = np.empty(3, dtype=np.int64)
+    weight = np.empty(3, dtype=np.float64)
+    for i in range(len(x)):
+        point[0] = x[i]
+        point[1] = y[i]
+        point[2] = z[i]
+        for axis in range(3):
+            position = (point[axis] - origin[axis]) / cell_size[axis]
+            cell[axis] = min(max(int(math.floor(position)), 0), values.shape[axis] - 2)
+            weight[axis] = position - cell[axis]
+
+        for j in range(3):
+            result[i, j] = 0.0
+        for corner in range(8):
+            corner_weight = 1.0
+            for axis in range(3):
+                if (corner >> axis) & 1:
+                    corner_weight *= weight[axis]
+                else:
+                    corner_weight *= 1.0 - weight[axis]
+            cx = cell[0] + (corner & 1)
+            cy = cell[1] + ((corner >> 1) & 1)
+            cz = cell[2] + ((corner >> 2) & 1)
+            for j in range(3):
+                result[i, j] += corner_weight * values[cx, cy, cz, j]
+    return result
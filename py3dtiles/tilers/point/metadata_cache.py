@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from py3dtiles.typing import MetadataReaderType
+
+# to increment when the metadata returned by a reader changes
+METADATA_CACHE_VERSION = 3
+
+
+class MetadataCache:
+    """
+    A folder that stores the metadata returned by the readers, so that the input files
+    are not scanned again by the next conversions.
+
+    There is one entry per input file, named after its absolute path. An entry is valid
+    as long as the size and the modification time of the file are unchanged.
+    """
+
+    def __init__(self, folder: Path) -> None:
+        self.folder = folder
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def get(self, path: Path) -> MetadataReaderType | None:
+        """
+        Returns the cached metadata of path, or None if there is no valid entry.
+        """
+        try:
+            with self._entry_path(path).open("rb") as f:
+                key, metadata = pickle.load(f)
+        except Exception:
+            # no entry, a corrupted entry or an entry written by an incompatible version
+            return None
+
+        if key != self._key(path):
+            return None
+
+        # the portions refer to the file as it was given when the entry was written
+        metadata["portions"] = [
+            (str(path), portion) for _, portion in metadata["portions"]
+        ]
+        return metadata  # type: ignore [no-any-return]
+
+    def put(self, path: Path, metadata: MetadataReaderType) -> None:
+        """
+        Stores the metadata of path. The entry is written atomically, so that concurrent
+        conversions never read a partial entry.
+        """
+        entry_path = self._entry_path(path)
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((self._key(path), metadata), f)
+            os.replace(tmp_path, entry_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _entry_path(self, path: Path) -> Path:
+        name = hashlib.sha1(str(path.resolve()).encode()).hexdigest()
+        return self.folder / f"{name}.pickle"
+
+    @staticmethod
+    def _key(path: Path) -> tuple[Any, ...]:
+        stat = path.stat()
+        return (
+            METADATA_CACHE_VERSION,
+            str(path.resolve()),
+            stat.st_size,
+            stat.st_mtime_ns,
+        )
@@ -26,8 +26,10 @@ from py3dtiles.utils import (
     node_name_to_path,
 )
 
+from ..tiling_profile import DEFAULT_TILING_PROFILE, TilingProfile
 from .distance import xyz_to_child_index
 from .points_grid import Grid
+from .quantization import get_quantization
 
 if TYPE_CHECKING:
     from typing_extensions import NotRequired
@@ -44,6 +46,7 @@ def node_to_tileset(
 class _DummyNodeDictType(TypedDict):
     children: NotRequired[list[bytes]]
     grid: NotRequired[Grid]
+    subdivision_type: NotRequired[SubdivisionType]
     points: NotRequired[
         list[
             tuple[
@@ -84,26 +87,44 @@ class Node:
         "grid",
         "points",
         "dirty",
+        "profile",
+        "subdivision_type",
+        "quantization",
     )
 
     def __init__(
-        self, name: bytes, aabb: npt.NDArray[np.float64 | np.float32], spacing: float
+        self,
+        name: bytes,
+        aabb: npt.NDArray[np.float64 | np.float32],
+        spacing: float,
+        profile: TilingProfile = DEFAULT_TILING_PROFILE,
     ) -> None:
         super().__init__()
         self.name = name
+        self.profile = profile
         self.aabb = aabb.astype(
             np.float32
         )  # TODO remove astype once the whole typing is done (and once data type issues on numpy arrays are fixed).
         self.aabb_size = np.maximum(self.aabb[1] - self.aabb[0], MIN_POINT_SIZE)
         self.inv_aabb_size = 1.0 / self.aabb_size
         self.aabb_center = (self.aabb[0] + self.aabb[1]) * 0.5
+        # use the given aabb, the one the NodeCatalog uses to compute the children aabb
+        subdivision_type = profile.subdivision_type(aabb)
+        self.subdivision_type = (
+            subdivision_type
+            if subdivision_type is not None
+            else aabb_size_to_subdivision_type(self.aabb_size)
+        )
         self.spacing = spacing
+        self.quantization = (
+            get_quantization(self.aabb, spacing) if profile.quantized_storage else None
+        )
         self.pending_xyz: list[npt.NDArray[np.float32]] = []
         self.pending_rgb: list[npt.NDArray[np.uint8]] = []
         self.pending_classification: list[npt.NDArray[np.uint8]] = []
         self.pending_intensity: list[npt.NDArray[np.uint8]] = []
         self.children: list[bytes] | None = None
-        self.grid = Grid(self)
+        self.grid = Grid(self, profile.grid_initial_cell_count)
         self.points: list[
             tuple[
                 npt.NDArray[np.float32],
@@ -118,8 +139,15 @@ class Node:
         sub_pickle: dict[str, Any] = {}
         if self.children is not None:
             sub_pickle["children"] = self.children
+            # the grid is only quantized once the node has children, its tile can't be a leaf
+            # tile anymore (the children are not merged in it, see to_tileset)
+            self.grid.quantization = self.quantization if self.children else None
             sub_pickle["grid"] = self.grid
+            # the subdivision type the children have been created with
+            sub_pickle["subdivision_type"] = self.subdivision_type
         else:
+            # the points of a leaf are the full resolution points of the tileset, they are
+            # never quantized
             sub_pickle["points"] = self.points
 
         return pickle.dumps(sub_pickle)
@@ -129,6 +157,11 @@ class Node:
         if "children" in sub_pickle:
             self.children = sub_pickle["children"]
             self.grid = sub_pickle["grid"]
+            if sub_pickle["subdivision_type"] != self.subdivision_type:
+                raise TilerException(
+                    f"The node {self.name!r} has been split as a {sub_pickle['subdivision_type'].name.lower()} "
+                    f"but is now computed as a {self.subdivision_type.name.lower()}"
+                )
         else:
             self.points = sub_pickle["points"]
 
@@ -153,8 +186,16 @@ class Node:
         if self.children is None:
             self.points.append((xyz, rgb, classification, intensity))
             count = sum([xyz.shape[0] for xyz, _, _, _ in self.points])
-            # stop subdividing if spacing is 1mm
-            if count >= 20000 and self.spacing > 0.001 * scale:
+            # stop subdividing if spacing is lower than the profile minimum (1mm by default)
+            # or at the maximum depth of the profile
+            if (
+                count >= self.profile.node_max_point_count
+                and self.spacing > self.profile.min_node_spacing * scale
+                and (
+                    self.profile.max_depth is None
+                    or len(self.name) < self.profile.max_depth
+                )
+            ):
                 self._split(scale)
             self.dirty = True
 
@@ -172,7 +213,12 @@ class Node:
         )
 
         if needs_balance:
-            self.grid.balance(self.aabb_size, self.aabb[0], self.inv_aabb_size)
+            self.grid.balance(
+                self.aabb_size,
+                self.aabb[0],
+                self.inv_aabb_size,
+                self.subdivision_type,
+            )
             self.dirty = True
 
         self.dirty = self.dirty or (len(remainder_xyz) != len(xyz))
@@ -240,8 +286,7 @@ class Node:
         pending_rgb_arr = np.concatenate(self.pending_rgb)
         pending_classification_arr = np.concatenate(self.pending_classification)
         pending_intensity_arr = np.concatenate(self.pending_intensity)
-        t = aabb_size_to_subdivision_type(self.aabb_size)
-        if t == SubdivisionType.QUADTREE:
+        if self.subdivision_type == SubdivisionType.QUADTREE:
             indices = xyz_to_child_index(
                 pending_xyz_arr,
                 np.array(
@@ -299,31 +344,42 @@ class Node:
         include_rgb: bool,
         include_classification: bool,
         include_intensity: bool,
+        duplicate_point_distance: float | None = None,
     ) -> npt.NDArray[np.uint8]:  # todo remove staticmethod
+        """
+        Returns the points of the node, in the layout of points_to_pnts_file.
+
+        If duplicate_point_distance is set (in the node coordinates), a single point is kept
+        among the points of a leaf in the same cell of a grid of this size.
+        """
         if data.children is None:
             points = data.points
-            xyz = (
-                np.concatenate(tuple([xyz for xyz, _, _, _ in points]))
-                .view(np.uint8)
-                .ravel()
+            xyz_float = np.concatenate(tuple([xyz for xyz, _, _, _ in points]))
+            kept = (
+                slice(None)
+                if duplicate_point_distance is None
+                else get_unique_point_indices(xyz_float, duplicate_point_distance)
             )
+            xyz = xyz_float[kept].view(np.uint8).ravel()
 
             if include_rgb:
-                rgb = np.concatenate(tuple([rgb for _, rgb, _, _ in points])).ravel()
+                rgb = np.concatenate(tuple([rgb for _, rgb, _, _ in points]))[
+                    kept
+                ].ravel()
             else:
                 rgb = np.array([], dtype=np.uint8)
 
             if include_classification:
                 classification = np.concatenate(
                     tuple([classification for _, _, classification, _ in points])
-                ).ravel()
+                )[kept].ravel()
             else:
                 classification = np.array([], dtype=np.uint8)
 
             if include_intensity:
                 intensity = np.concatenate(
                     tuple([intensity for _, _, _, intensity in points])
-                ).ravel()
+                )[kept].ravel()
             else:
                 intensity = np.array([], dtype=np.uint8)
 
@@ -346,13 +402,16 @@ class Node:
         pool_executor: ProcessPoolExecutor | None = None,
     ) -> Tile | None:
         # create child tileset parts
-        # if their size is below of 100 points, they will be merged in this node.
+        # if their size is below of profile.prune_point_count points (100 by default),
+        # they will be merged in this node.
         children_tileset_parts: list[Tile] = []
         parameter_to_compute: list[
             tuple[Node, Path, npt.NDArray[np.float32], Node, int]
         ] = []
         for child_name in self.get_child_names():
-            child_node = node_from_name(child_name, self.aabb, self.spacing)
+            child_node = node_from_name(
+                child_name, self.aabb, self.spacing, self.profile
+            )
             child_pnts_path = node_name_to_path(folder, child_name, ".pnts")
 
             if child_pnts_path.exists():
@@ -387,7 +446,14 @@ class Node:
         prune = False  # prune only if the node is a leaf
 
         # If this child is small enough, merge in the current tile
-        if parent_node is not None and depth > 1 and fth.points_length < 100:
+        # With the quantized storage, the points of the parent tile are quantized: merging all
+        # its children in it would make a leaf tile with quantized points.
+        if (
+            parent_node is not None
+            and depth > 1
+            and fth.points_length < self.profile.prune_point_count
+            and not self.profile.quantized_storage
+        ):
             parent_pnts_path = node_name_to_path(folder, parent_node.name, ".pnts")
             parent_tile = read_binary_tile_content(parent_pnts_path)
             parent_fth = parent_tile.body.feature_table.header
@@ -517,6 +583,25 @@ class Node:
         return tile
 
 
+def get_unique_point_indices(
+    xyz: npt.NDArray[np.float32], distance: float
+) -> npt.NDArray[np.int64]:
+    """
+    Returns the indices of the first point of each cell of a grid of size distance, in the
+    order of the points.
+    """
+    cells = np.floor(xyz / distance).astype(np.int64)
+    cells -= np.min(cells, axis=0)
+    shape = np.max(cells, axis=0) + 1
+    if np.prod(shape.astype(np.float64)) < 2**63:
+        # a single key per cell is faster to sort than the rows of cells
+        keys = np.ravel_multi_index(tuple(cells.T), tuple(shape))
+        _, indices = np.unique(keys, return_index=True)
+    else:
+        _, indices = np.unique(cells, axis=0, return_index=True)
+    return np.sort(indices)
+
+
 def split_tileset(tile: Tile, split_name: str, folder: Path) -> Tile:
     tile.set_refine_mode("ADD")
     tileset = TileSet(geometric_error=tile.geometric_error)
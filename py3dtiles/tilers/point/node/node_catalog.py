@@ -8,6 +8,7 @@ import numpy as np
 import numpy.typing as npt
 
 from py3dtiles.tilers.point.node.node import Node
+from py3dtiles.tilers.point.tiling_profile import DEFAULT_TILING_PROFILE, TilingProfile
 from py3dtiles.utils import split_aabb
 
 
@@ -24,26 +25,33 @@ class NodeCatalog:
         name: bytes,
         root_aabb: npt.NDArray[np.float64],
         root_spacing: float,
+        profile: TilingProfile = DEFAULT_TILING_PROFILE,
     ) -> None:
         self.nodes: dict[bytes, Node] = {}
         self.root_aabb = root_aabb
         self.root_spacing = root_spacing
+        self.profile = profile
         self.node_bytes: dict[bytes, bytes] = {}
         self._load_from_store(name, nodes)
 
     def get_node(self, name: bytes) -> Node:
         """Returns the node mathing the given name"""
         if name not in self.nodes:
-            spacing = self.root_spacing / math.pow(2, len(name))
-            aabb = self.root_aabb
-            for i in name:
-                aabb = split_aabb(aabb, int(i))
-            node = Node(name, aabb, spacing)
+            node = self._create_node(name)
             self.nodes[name] = node
         else:
             node = self.nodes[name]
         return node
 
+    def _create_node(self, name: bytes) -> Node:
+        spacing = self.root_spacing / math.pow(2, len(name))
+        aabb = self.root_aabb
+        for i in name:
+            aabb = split_aabb(
+                aabb, int(i), subdivision_type=self.profile.subdivision_type(aabb)
+            )
+        return Node(name, aabb, spacing, self.profile)
+
     def dump(self, name: bytes, max_depth: int) -> bytes:
         """Serialize the stored nodes to a bytes list"""
         node = self.nodes[name]
@@ -60,20 +68,12 @@ class NodeCatalog:
         if len(data) > 0:
             out = pickle.loads(gzip.decompress(data))
             for n in out:
-                spacing = self.root_spacing / math.pow(2, len(n))
-                aabb = self.root_aabb
-                for i in n:
-                    aabb = split_aabb(aabb, int(i))
-                node = Node(n, aabb, spacing)
+                node = self._create_node(n)
                 node.load_from_bytes(out[n])
                 self.node_bytes[n] = out[n]
                 self.nodes[n] = node
         else:
-            spacing = self.root_spacing / math.pow(2, len(name))
-            aabb = self.root_aabb
-            for i in name:
-                aabb = split_aabb(aabb, int(i))
-            node = Node(name, aabb, spacing)
+            node = self._create_node(name)
             self.nodes[name] = node
 
         return self.nodes[name]
@@ -57,7 +57,9 @@ class NodeProcess:
             return
 
         if node.needs_balance():
-            node.grid.balance(node.aabb_size, node.aabb[0], node.inv_aabb_size)
+            node.grid.balance(
+                node.aabb_size, node.aabb[0], node.inv_aabb_size, node.subdivision_type
+            )
             node.dirty = True
 
         if node.children is not None:
@@ -71,16 +73,7 @@ class NodeProcess:
                 )
 
     def infer_depth_from_name(self) -> int:
-        halt_at_depth = 0
-        if len(self.name) >= 7:
-            halt_at_depth = 5
-        elif len(self.name) >= 5:
-            halt_at_depth = 3
-        elif len(self.name) > 2:
-            halt_at_depth = 2
-        elif len(self.name) >= 1:
-            halt_at_depth = 1
-        return halt_at_depth
+        return self.node_catalog.profile.get_process_depth(self.name)
 
     def run(self) -> Generator[tuple[bytes, bytes, int], None, None]:
         log_enabled = self.log_file is not None
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
+import math
 from typing import TYPE_CHECKING, Any
 
 import numpy as np
 import numpy.typing as npt
-from numba import njit  # type: ignore [attr-defined]
-from numba.typed import List
+from numba import njit, types  # type: ignore [attr-defined]
+from numba.typed import Dict, List
 
 from py3dtiles.exceptions import TilerException
 from py3dtiles.utils import SubdivisionType, aabb_size_to_subdivision_type
 
+from ..tiling_profile import PointSelection
 from .distance import is_point_far_enough, xyz_to_key
+from .quantization import QuantizationType, dequantize_xyz, quantize_xyz
 
 if TYPE_CHECKING:
     from .node import Node
@@ -31,6 +34,7 @@ def _insert(
     intensity: npt.NDArray[np.uint8],
     spacing: float,
     shift: int,
+    max_cell_point_count: int,
     force: bool = False,
 ) -> tuple[
     npt.NDArray[np.float32],
@@ -71,7 +75,9 @@ def _insert(
                     (cells_intensity[k], intensity[i].reshape(1, 1))
                 )
                 if cell_count[0] < 8:
-                    needs_balance = needs_balance or cells_xyz[k].shape[0] > 200000
+                    needs_balance = (
+                        needs_balance or cells_xyz[k].shape[0] > max_cell_point_count
+                    )
             else:
                 notinserted[i] = True
 
@@ -84,6 +90,244 @@ def _insert(
         )
 
 
+# the codes of the voxel based point selections, used in _insert_in_voxels
+_VOXEL_FIRST = 0
+_VOXEL_CENTER = 1
+_VOXEL_RANDOM = 2
+_VOXEL_SELECTION_CODES = {
+    PointSelection.VOXEL_FIRST: _VOXEL_FIRST,
+    PointSelection.VOXEL_CENTER: _VOXEL_CENTER,
+    PointSelection.VOXEL_RANDOM: _VOXEL_RANDOM,
+}
+
+
+@njit(fastmath=True, cache=True)  # type: ignore [misc]
+def _voxel_coordinates(
+    xyz: npt.NDArray[np.float32],
+    aabmin: npt.NDArray[np.float32],
+    voxel_size: float,
+    voxel_count: npt.NDArray[np.int64],
+) -> npt.NDArray[np.int64]:
+    v = np.floor((xyz - aabmin) / voxel_size).astype(np.int64)
+    return np.minimum(np.maximum(v, 0), voxel_count - 1)
+
+
+@njit(cache=True)  # type: ignore [misc]
+def _point_hash(xyz: npt.NDArray[np.float32]) -> np.uint64:
+    """
+    Returns a pseudo random value that only depends on the bits of the position of a point
+    (splitmix64 finalizer), so that _VOXEL_RANDOM gives the same result at each conversion.
+    """
+    h = np.uint64(0)
+    for bits in xyz.view(np.uint32):
+        h = (h ^ np.uint64(bits)) * np.uint64(0x9E3779B97F4A7C15)
+        h ^= h >> np.uint64(31)
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+@njit(fastmath=True, cache=True)  # type: ignore [misc]
+def _remove_points(
+    cells_xyz: List[npt.NDArray[np.float32]],
+    cells_rgb: List[npt.NDArray[np.uint8]],
+    cells_classification: List[npt.NDArray[np.uint8]],
+    cells_intensity: List[npt.NDArray[np.uint8]],
+    aabmin: npt.NDArray[np.float32],
+    voxel_size: float,
+    voxel_count: npt.NDArray[np.int64],
+    voxels: Dict[np.int64, np.int64],
+    locations: npt.NDArray[np.int64],
+) -> None:
+    """
+    Removes the points at the given locations (cell index << 32 | index in the cell) from their
+    cell, and updates the location of the points kept in voxels.
+    """
+    locations = np.sort(locations)
+    start = 0
+    while start < len(locations):
+        k = locations[start] >> 32
+        end = start
+        while end < len(locations) and locations[end] >> 32 == k:
+            end += 1
+
+        keep = np.full(cells_xyz[k].shape[0], True)
+        for j in range(start, end):
+            keep[locations[j] & 0xFFFFFFFF] = False
+        kept_indices = np.nonzero(keep)[0]
+        for new_idx in range(len(kept_indices)):
+            old_idx = kept_indices[new_idx]
+            if old_idx == new_idx:
+                continue
+            v = _voxel_coordinates(
+                cells_xyz[k][old_idx], aabmin, voxel_size, voxel_count
+            )
+            voxel = v[0] + voxel_count[0] * (v[1] + voxel_count[1] * v[2])
+            if voxels.get(voxel, -1) == (k << 32) | old_idx:
+                voxels[voxel] = (k << 32) | new_idx
+        cells_xyz[k] = cells_xyz[k][keep]
+        cells_rgb[k] = cells_rgb[k][keep]
+        cells_classification[k] = cells_classification[k][keep]
+        cells_intensity[k] = cells_intensity[k][keep]
+        start = end
+
+
+@njit(fastmath=True, cache=True)  # type: ignore [misc]
+def _build_voxels(
+    cells_xyz: List[npt.NDArray[np.float32]],
+    aabmin: npt.NDArray[np.float32],
+    voxel_size: float,
+    voxel_count: npt.NDArray[np.int64],
+    voxels: Dict[np.int64, np.int64],
+) -> None:
+    """
+    Fills voxels with the location (cell index << 32 | index in the cell) of the points of each voxel.
+    """
+    for k in range(len(cells_xyz)):
+        for idx in range(cells_xyz[k].shape[0]):
+            v = _voxel_coordinates(cells_xyz[k][idx], aabmin, voxel_size, voxel_count)
+            voxel = v[0] + voxel_count[0] * (v[1] + voxel_count[1] * v[2])
+            if voxel not in voxels:
+                voxels[voxel] = (np.int64(k) << 32) | idx
+
+
+@njit(fastmath=True, cache=True)  # type: ignore [misc]
+def _insert_in_voxels(
+    cells_xyz: List[npt.NDArray[np.float32]],
+    cells_rgb: List[npt.NDArray[np.uint8]],
+    cells_classification: List[npt.NDArray[np.uint8]],
+    cells_intensity: List[npt.NDArray[np.uint8]],
+    aabmin: npt.NDArray[np.float32],
+    inv_aabb_size: npt.NDArray[np.float32],
+    cell_count: npt.NDArray[np.int32],
+    xyz: npt.NDArray[np.float32],
+    rgb: npt.NDArray[np.uint8],
+    classification: npt.NDArray[np.uint8],
+    intensity: npt.NDArray[np.uint8],
+    shift: int,
+    max_cell_point_count: int,
+    voxels: Dict[np.int64, np.int64],
+    voxel_size: float,
+    voxel_count: npt.NDArray[np.int64],
+    selection: int,
+) -> tuple[
+    npt.NDArray[np.float32],
+    npt.NDArray[np.uint8],
+    npt.NDArray[np.uint8],
+    npt.NDArray[np.uint8],
+    bool,
+]:
+    """
+    Keeps one point per voxel, in constant time per point.
+
+    The points are selected first, then appended to their cell at once. A point replaced by a
+    better candidate of its voxel (_VOXEL_CENTER and _VOXEL_RANDOM) is removed from its cell
+    and returned with the points that are not inserted: the voxels don't nest in the cells,
+    so its replacement can belong to another cell.
+
+    _VOXEL_RANDOM keeps the point of the voxel with the lowest _point_hash, which is a random
+    choice that doesn't depend on the order of the points.
+    """
+    keys = xyz_to_key(xyz, cell_count, aabmin, inv_aabb_size, shift)
+
+    accepted = np.full(len(xyz), False)
+    point_voxels = np.empty(len(xyz), dtype=np.int64)
+    replaced = np.full(len(xyz), False)
+    replaced_locations = np.empty(len(xyz), dtype=np.int64)
+    replaced_count = 0
+    replaced_xyz = np.empty_like(xyz)
+    replaced_rgb = np.empty_like(rgb)
+    replaced_classification = np.empty_like(classification)
+    replaced_intensity = np.empty_like(intensity)
+
+    for i in range(len(xyz)):
+        v = _voxel_coordinates(xyz[i], aabmin, voxel_size, voxel_count)
+        voxel = v[0] + voxel_count[0] * (v[1] + voxel_count[1] * v[2])
+        point_voxels[i] = voxel
+
+        if voxel not in voxels:
+            # a negative location is a point of this batch, not inserted yet
+            voxels[voxel] = -(i + 1)
+            accepted[i] = True
+            continue
+
+        location = voxels[voxel]
+        if location < 0:
+            current_xyz = xyz[-location - 1]
+        else:
+            current_xyz = cells_xyz[location >> 32][location & 0xFFFFFFFF]
+
+        replace: bool | np.bool_ = False
+        if selection == _VOXEL_CENTER:
+            center = aabmin + (v + 0.5) * voxel_size
+            replace = np.sum((xyz[i] - center) ** 2) < np.sum(
+                (current_xyz - center) ** 2
+            )
+        elif selection == _VOXEL_RANDOM:
+            replace = _point_hash(xyz[i]) < _point_hash(current_xyz)
+
+        if not replace:
+            continue
+
+        if location < 0:
+            accepted[-location - 1] = False
+        else:
+            k = location >> 32
+            idx = location & 0xFFFFFFFF
+            replaced_locations[replaced_count] = location
+            replaced_count += 1
+            replaced[i] = True
+            replaced_xyz[i] = cells_xyz[k][idx]
+            replaced_rgb[i] = cells_rgb[k][idx]
+            replaced_classification[i] = cells_classification[k][idx]
+            replaced_intensity[i] = cells_intensity[k][idx]
+        accepted[i] = True
+        voxels[voxel] = -(i + 1)
+
+    if replaced_count > 0:
+        _remove_points(
+            cells_xyz,
+            cells_rgb,
+            cells_classification,
+            cells_intensity,
+            aabmin,
+            voxel_size,
+            voxel_count,
+            voxels,
+            replaced_locations[:replaced_count],
+        )
+
+    accepted_indices = np.nonzero(accepted)[0]
+    accepted_keys = keys[accepted_indices]
+    needs_balance = False
+    for k in np.unique(accepted_keys):
+        idx = accepted_indices[accepted_keys == k]
+        cell_size = cells_xyz[k].shape[0]
+        for j in range(len(idx)):
+            voxels[point_voxels[idx[j]]] = (np.int64(k) << 32) | (cell_size + j)
+        cells_xyz[k] = np.concatenate((cells_xyz[k], xyz[idx]))
+        cells_rgb[k] = np.concatenate((cells_rgb[k], rgb[idx]))
+        cells_classification[k] = np.concatenate(
+            (cells_classification[k], classification[idx])
+        )
+        cells_intensity[k] = np.concatenate((cells_intensity[k], intensity[idx]))
+        if cell_count[0] < 8:
+            needs_balance = (
+                needs_balance or cells_xyz[k].shape[0] > max_cell_point_count
+            )
+
+    notinserted = ~accepted
+    return (
+        np.concatenate((xyz[notinserted], replaced_xyz[replaced])),
+        np.concatenate((rgb[notinserted], replaced_rgb[replaced])),
+        np.concatenate(
+            (classification[notinserted], replaced_classification[replaced])
+        ),
+        np.concatenate((intensity[notinserted], replaced_intensity[replaced])),
+        needs_balance,
+    )
+
+
 class Grid:
     """docstring for Grid"""
 
@@ -94,6 +338,11 @@ class Grid:
         "cells_classification",
         "cells_intensity",
         "spacing",
+        "max_cell_point_count",
+        "max_cell_insert_point_count",
+        "quantization",
+        "point_selection",
+        "voxels",
     )
 
     def __init__(self, node: Node, initial_count: int = 3) -> None:
@@ -101,6 +350,14 @@ class Grid:
             [initial_count, initial_count, initial_count], dtype=np.int32
         )
         self.spacing = node.spacing * node.spacing
+        self.max_cell_point_count = node.profile.grid_cell_max_point_count
+        self.max_cell_insert_point_count = node.profile.grid_cell_insert_max_point_count
+        # the positions are only quantized when the grid is serialized, once the node has
+        # children (see Node.save_to_bytes)
+        self.quantization: QuantizationType | None = None
+        self.point_selection = node.profile.point_selection
+        # built on the first insertion, see _get_voxels
+        self.voxels: Dict[np.int64, np.int64] | None = None
 
         self.cells_xyz = List()
         self.cells_rgb = List()
@@ -116,7 +373,15 @@ class Grid:
         return {
             "cell_count": self.cell_count,
             "spacing": self.spacing,
-            "cells_xyz": list(self.cells_xyz),
+            "max_cell_point_count": self.max_cell_point_count,
+            "max_cell_insert_point_count": self.max_cell_insert_point_count,
+            "quantization": self.quantization,
+            "point_selection": self.point_selection,
+            "cells_xyz": (
+                list(self.cells_xyz)
+                if self.quantization is None
+                else [quantize_xyz(xyz, self.quantization) for xyz in self.cells_xyz]
+            ),
             "cells_rgb": list(self.cells_rgb),
             "cells_classification": list(self.cells_classification),
             "cells_intensity": list(self.cells_intensity),
@@ -125,7 +390,16 @@ class Grid:
     def __setstate__(self, state: dict[str, Any]) -> None:
         self.cell_count = state["cell_count"]
         self.spacing = state["spacing"]
-        self.cells_xyz = List(state["cells_xyz"])
+        self.max_cell_point_count = state["max_cell_point_count"]
+        self.max_cell_insert_point_count = state["max_cell_insert_point_count"]
+        self.quantization = state["quantization"]
+        self.point_selection = state["point_selection"]
+        self.voxels = None
+        self.cells_xyz = List(
+            state["cells_xyz"]
+            if self.quantization is None
+            else [dequantize_xyz(xyz, self.quantization) for xyz in state["cells_xyz"]]
+        )
         self.cells_rgb = List(state["cells_rgb"])
         self.cells_classification = List(state["cells_classification"])
         self.cells_intensity = List(state["cells_intensity"])
@@ -153,6 +427,30 @@ class Grid:
         npt.NDArray[np.uint8],
         bool,
     ]:
+        if not force and self.point_selection != PointSelection.POISSON:
+            voxel_size = math.sqrt(self.spacing)
+            voxel_count = (1.0 / (inv_aabb_size * voxel_size)).astype(np.int64) + 1
+            voxels = self._get_voxels(aabmin, voxel_size, voxel_count)
+            return _insert_in_voxels(  # type: ignore [no-any-return]
+                self.cells_xyz,
+                self.cells_rgb,
+                self.cells_classification,
+                self.cells_intensity,
+                aabmin,
+                inv_aabb_size,
+                self.cell_count,
+                xyz,
+                rgb,
+                classification,
+                intensity,
+                int(self.cell_count[0] - 1).bit_length(),
+                self.max_cell_insert_point_count,
+                voxels,
+                voxel_size,
+                voxel_count,
+                _VOXEL_SELECTION_CODES[self.point_selection],
+            )
+
         return _insert(  # type: ignore [no-any-return]
             self.cells_xyz,
             self.cells_rgb,
@@ -167,13 +465,29 @@ class Grid:
             intensity,
             self.spacing,
             int(self.cell_count[0] - 1).bit_length(),
+            self.max_cell_insert_point_count,
             force,
         )
 
+    def _get_voxels(
+        self,
+        aabmin: npt.NDArray[np.float32],
+        voxel_size: float,
+        voxel_count: npt.NDArray[np.int64],
+    ) -> Dict[np.int64, np.int64]:
+        """
+        Returns the voxels occupied by the points of the grid.
+        They are not serialized and are rebuilt from the points when needed.
+        """
+        if self.voxels is None:
+            self.voxels = Dict.empty(key_type=types.int64, value_type=types.int64)
+            _build_voxels(self.cells_xyz, aabmin, voxel_size, voxel_count, self.voxels)
+        return self.voxels
+
     def needs_balance(self) -> bool:
         if self.cell_count[0] < 8:
             for cell in self.cells_xyz:
-                if cell.shape[0] > 100000:
+                if cell.shape[0] > self.max_cell_point_count:
                     return True
         return False
 
@@ -182,8 +496,13 @@ class Grid:
         aabb_size: npt.NDArray[np.float32],
         aabmin: npt.NDArray[np.float32],
         inv_aabb_size: npt.NDArray[np.float32],
+        subdivision_type: SubdivisionType | None = None,
     ) -> None:
-        t = aabb_size_to_subdivision_type(aabb_size)
+        t = (
+            subdivision_type
+            if subdivision_type is not None
+            else aabb_size_to_subdivision_type(aabb_size)
+        )
         self.cell_count[0] += 1
         self.cell_count[1] += 1
         if t != SubdivisionType.QUADTREE:
@@ -220,6 +539,8 @@ class Grid:
                 cellintensity,
                 True,
             )
+        # the points have moved to other cells
+        self.voxels = None
 
     def get_points(
         self, include_rgb: bool, include_classification: bool, include_intensity: bool
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import numpy as np
+import numpy.typing as npt
+
+# (origin, step) of the quantization grid of a node
+QuantizationType = tuple[npt.NDArray[np.float32], npt.NDArray[np.float32]]
+
+QUANTIZED_MAX_VALUE = np.iinfo(np.uint16).max
+# the quantization error (half a step) must stay lower than this ratio of the node spacing
+MAX_QUANTIZATION_ERROR_RATIO = 0.1
+
+
+def get_quantization(
+    aabb: npt.NDArray[np.float32], spacing: float
+) -> QuantizationType | None:
+    """
+    Returns the uint16 quantization grid of a node aabb, or None if this grid is too coarse
+    compared to the spacing of the node (the positions are then stored as float32).
+    """
+    step = ((aabb[1] - aabb[0]) / QUANTIZED_MAX_VALUE).astype(np.float32)
+    if float(np.max(step)) * 0.5 > spacing * MAX_QUANTIZATION_ERROR_RATIO:
+        return None
+    # null sized axis
+    step[step == 0] = 1
+    return aabb[0].astype(np.float32), step
+
+
+def quantize_xyz(
+    xyz: npt.NDArray[np.float32], quantization: QuantizationType
+) -> npt.NDArray[np.uint16] | npt.NDArray[np.float32]:
+    """
+    Converts positions to uint16 offsets in the quantization grid.
+
+    The positions are returned unchanged if some of them are outside of the grid.
+    """
+    origin, step = quantization
+    offsets = np.rint((xyz - origin) / step)
+    if len(offsets) > 0 and (offsets.min() < 0 or offsets.max() > QUANTIZED_MAX_VALUE):
+        return xyz
+    return offsets.astype(np.uint16)  # type: ignore [no-any-return]
+
+
+def dequantize_xyz(
+    xyz: npt.NDArray[np.uint16] | npt.NDArray[np.float32],
+    quantization: QuantizationType,
+) -> npt.NDArray[np.float32]:
+    """
+    Converts positions returned by quantize_xyz back to float32.
+    """
+    if xyz.dtype != np.uint16:
+        return xyz.astype(np.float32, copy=False)
+    origin, step = quantization
+    return (xyz * step + origin).astype(np.float32)
@@ -9,6 +9,9 @@ import lz4.frame as gzip
 from py3dtiles.exceptions import TilerException
 from py3dtiles.utils import node_name_to_path
 
+# the memory limit is never lower than this value
+MIN_MEMORY_SIZE_MB = 200
+
 
 class SharedNodeStore:
     """
@@ -41,18 +44,12 @@ class SharedNodeStore:
         """
         Limit the memory usage of this instance.
         """
-        bytes_to_mb = 1.0 / (1024 * 1024)
-        max_size_mb = max(max_size_mb, 200)
+        max_size_mb = max(max_size_mb, MIN_MEMORY_SIZE_MB)
 
         if verbose >= 3:
             self.print_statistics()
 
-        # guess cache size
-        cache_size = (
-            self.memory_size["container"] + self.memory_size["content"]
-        ) * bytes_to_mb
-
-        before = cache_size
+        before = self.get_memory_size_mb()
         if before < max_size_mb:
             return
 
@@ -64,6 +61,20 @@ class SharedNodeStore:
         if verbose >= 2:
             print("<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<< CACHE CLEANING")
 
+    def get_memory_size_mb(self) -> float:
+        """
+        Returns a guess of the memory used by this instance, in MB.
+        """
+        return (self.memory_size["container"] + self.memory_size["content"]) / (
+            1024 * 1024
+        )
+
+    def get_memory_pressure(self, max_size_mb: int) -> float:
+        """
+        Returns the memory used by this instance divided by its limit (see `control_memory_usage`).
+        """
+        return self.get_memory_size_mb() / max(max_size_mb, MIN_MEMORY_SIZE_MB)
+
     def get(self, name: bytes, stat_inc: int = 1) -> bytes:
         """
         Get a node storage.
@@ -53,14 +53,25 @@ def node_to_pnts(
     include_rgb: bool,
     include_classification: bool,
     include_intensity: bool,
-) -> int:
+    duplicate_point_distance: float | None = None,
+) -> tuple[int, int]:
+    """
+    Writes the points of a node in a pnts file, and returns the number of written points and
+    the number of duplicate points removed (see Node.get_points).
+    """
     points = py3dtiles.tilers.point.node.Node.get_points(
-        node, include_rgb, include_classification, include_intensity
+        node,
+        include_rgb,
+        include_classification,
+        include_intensity,
+        duplicate_point_distance,
     )
     point_nb, _ = points_to_pnts_file(
         name, points, out_folder, include_rgb, include_classification, include_intensity
     )
-    return point_nb
+    if node.children is None:
+        return point_nb, sum(len(xyz) for xyz, _, _, _ in node.points) - point_nb
+    return point_nb, 0
 
 
 def run(
@@ -69,14 +80,28 @@ def run(
     write_rgb: bool,
     write_classification: bool,
     write_intensity: bool,
-) -> Generator[int, None, None]:
+    duplicate_point_distance: float | None = None,
+) -> Generator[tuple[int, int], None, None]:
+    """
+    Writes the pnts files of the nodes in data, and yields the number of written points and
+    the number of duplicate points removed.
+    """
     # we can safely write the .pnts file
     if len(data) > 0:
         root = pickle.loads(gzip.decompress(data))
         total = 0
+        duplicate_total = 0
         for name in root:
             node = py3dtiles.tilers.point.node.DummyNode(pickle.loads(root[name]))
-            total += node_to_pnts(
-                name, node, folder, write_rgb, write_classification, write_intensity
+            point_count, duplicate_count = node_to_pnts(
+                name,
+                node,
+                folder,
+                write_rgb,
+                write_classification,
+                write_intensity,
+                duplicate_point_distance,
             )
-        yield total
+            total += point_count
+            duplicate_total += duplicate_count
+        yield total, duplicate_total
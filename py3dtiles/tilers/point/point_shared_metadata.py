@@ -1,17 +1,21 @@
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
 import numpy as np
 import numpy.typing as npt
 from pyproj import Transformer
 
+from py3dtiles.reader.point_filter import PointFilter
 from py3dtiles.tilers.base_tiler import SharedMetadata
 
+from .grid_transformer import GridTransformer
+from .tiling_profile import TilingProfile
+
 
 @dataclass(frozen=True)
 class PointSharedMetadata(SharedMetadata):
-    transformer: Optional[Transformer]
+    transformer: Optional[Union[Transformer, GridTransformer]]
     root_aabb: npt.NDArray[np.float64]
     root_spacing: float
     scale: npt.NDArray[np.float32]
@@ -20,4 +24,8 @@ class PointSharedMetadata(SharedMetadata):
     color_scale: Optional[float]
     write_classification: bool
     write_intensity: bool
+    tiling_profile: TilingProfile
     verbosity: int
+    # the readers keep one point out of stride
+    stride: int = 1
+    point_filter: Optional[PointFilter] = None
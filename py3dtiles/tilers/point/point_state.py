@@ -1,20 +1,38 @@
 from py3dtiles.typing import PortionsType
 
+# the initial (and highest) ceiling of the points read but not processed yet
+MAX_POINT_IN_PROGRESS = 60_000_000
+# the lowest ceiling, reached when the node store is under memory pressure
+MIN_POINT_IN_PROGRESS = 5_000_000
+# above this multiple of the target, the points waiting to be processed are piling up
+PENDING_POINT_HIGH_FACTOR = 4
+
 
 class PointState:
     def __init__(
-        self, pointcloud_file_portions: PortionsType, max_reading_jobs: int
+        self,
+        pointcloud_file_portions: PortionsType,
+        max_reading_jobs: int,
+        number_of_jobs: int = 1,
     ) -> None:
         self.processed_points = 0
-        self.max_point_in_progress = 60_000_000
+        self.max_point_in_progress = MAX_POINT_IN_PROGRESS
         self.points_in_progress = 0
         self.points_in_pnts = 0
+        # the points discarded by the filter of the readers
+        self.filtered_points = 0
+        # the duplicate points removed from the leaf tiles when they are written
+        self.duplicate_points = 0
 
         # pointcloud_file_portions is a list of tuple (filename, (start offset, end offset))
         self.point_cloud_file_parts = pointcloud_file_portions
         self.initial_portion_count = len(pointcloud_file_portions)
         self.max_reading_jobs = max_reading_jobs
+        # at least one job is left to the processing of the points
+        self.reading_jobs_limit = max(1, number_of_jobs - 1, max_reading_jobs)
         self.number_of_reading_jobs = 0
+        # the streams whose portions are added to point_cloud_file_parts as they are pulled
+        self.number_of_open_streams = 0
         self.number_of_writing_jobs = 0
 
         # node_to_process is a dictionary of tasks,
@@ -37,7 +55,11 @@ class PointState:
         self.pnts_to_writing: list[bytes] = []
 
     def is_reading_finish(self) -> bool:
-        return not self.point_cloud_file_parts and self.number_of_reading_jobs == 0
+        return (
+            not self.point_cloud_file_parts
+            and self.number_of_reading_jobs == 0
+            and self.number_of_open_streams == 0
+        )
 
     def add_tasks_to_process(
         self, node_name: bytes, data: bytes, point_count: int
@@ -55,19 +77,68 @@ class PointState:
             self.node_to_process[node_name] = (tasks, count + point_count)
 
     def can_add_reading_jobs(self) -> bool:
-        return bool(
-            self.point_cloud_file_parts
-            and self.points_in_progress < self.max_point_in_progress
+        return bool(self.point_cloud_file_parts and self.has_reading_capacity())
+
+    def has_reading_capacity(self) -> bool:
+        return (
+            self.points_in_progress < self.max_point_in_progress
             and self.number_of_reading_jobs < self.max_reading_jobs
         )
 
+    def pending_point_count(self) -> int:
+        """
+        Returns the number of points read but not sent to a processing job yet.
+        """
+        return sum(point_count for _, point_count in self.node_to_process.values())
+
+    def balance_jobs(
+        self, target_pending_point_count: int, memory_pressure: float
+    ) -> None:
+        """
+        Adjusts the number of reading jobs and the ceiling of points in progress to the
+        observed queues, each time a job ends.
+
+        When the points waiting to be processed run out while all the reading jobs are busy,
+        the readers are the bottleneck (slow storage, compressed files...) and a reading job
+        is added. When they pile up, the processing is the bottleneck and a reading job is
+        removed. The ceiling of points in progress is halved while the node store is over
+        its memory budget, and slowly raised back when it's far below it.
+
+        :param target_pending_point_count: the number of pending points that keeps all the processing jobs busy
+        :param memory_pressure: the memory used by the node store, divided by its budget
+        """
+        pending_point_count = self.pending_point_count()
+        if (
+            pending_point_count < target_pending_point_count
+            and self.point_cloud_file_parts
+            and self.number_of_reading_jobs >= self.max_reading_jobs
+            and self.points_in_progress < self.max_point_in_progress
+        ):
+            self.max_reading_jobs = min(
+                self.max_reading_jobs + 1, self.reading_jobs_limit
+            )
+        elif (
+            pending_point_count > PENDING_POINT_HIGH_FACTOR * target_pending_point_count
+        ):
+            self.max_reading_jobs = max(self.max_reading_jobs - 1, 1)
+
+        if memory_pressure > 1:
+            self.max_point_in_progress = max(
+                self.max_point_in_progress // 2, MIN_POINT_IN_PROGRESS
+            )
+        elif memory_pressure < 0.5:
+            self.max_point_in_progress = min(
+                self.max_point_in_progress + MIN_POINT_IN_PROGRESS,
+                MAX_POINT_IN_PROGRESS,
+            )
+
     def print_debug(self) -> None:
         print("{:^16}|{:^8}|{:^8}|{:^8}".format("Step", "Input", "Active", "Inactive"))
         print(
             "{:^16}|{:^8}|{:^8}|{:^8}".format(
                 "Reader",
                 len(self.point_cloud_file_parts),
-                self.number_of_reading_jobs,
+                f"{self.number_of_reading_jobs}/{self.max_reading_jobs}",
                 "",
             )
         )
@@ -1,8 +1,10 @@
 import concurrent.futures
+import os
 import pickle
 import struct
 import time
-from collections.abc import Generator
+from collections.abc import Generator, Sequence
+from dataclasses import replace
 from pathlib import Path
 from typing import Any, Optional, Union
 
@@ -15,28 +17,46 @@ from py3dtiles.exceptions import (
     SrsInMixinException,
     TilerException,
 )
+from py3dtiles.reader.array_reader import (
+    PointArrayType,
+    PointStream,
+    SharedPointArray,
+    SharedPointStream,
+)
+from py3dtiles.reader.point_filter import PointFilter
+from py3dtiles.reader.post_processing import get_sampled_point_count
 from py3dtiles.tilers.base_tiler import Tiler
 from py3dtiles.tileset.content import read_binary_tile_content
 from py3dtiles.tileset.tileset import TileSet
+from py3dtiles.tileset.utils import number_of_points_per_tile
+from py3dtiles.typing import MetadataReaderType, PortionsType
 from py3dtiles.utils import (
     READER_MAP,
     compute_spacing,
     make_aabb_valid,
+    morton_codes,
     node_from_name,
     node_name_to_path,
 )
 
+from .density import DensityHistogram
+from .grid_transformer import GridTransformer
 from .matrix_manipulation import (
     make_rotation_matrix,
     make_scale_matrix,
     make_translation_matrix,
 )
+from .metadata_cache import MetadataCache
 from .node import Node, SharedNodeStore
 from .pnts import MIN_POINT_SIZE, pnts_writer
 from .point_message_type import PointManagerMessage, PointWorkerMessageType
 from .point_shared_metadata import PointSharedMetadata
 from .point_state import PointState
 from .point_tiler_worker import PointTilerWorker
+from .tiling_profile import TilingProfile
+
+# the maximum depth of the tree of a preview, if the tiling profile doesn't set one
+PREVIEW_MAX_DEPTH = 8
 
 
 def is_ancestor(node_name: bytes, ancestor: bytes) -> bool:
@@ -72,17 +92,21 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
     name = b"points"
 
     file_info: dict[str, Any]
+    file_scan_duration: float
     root_aabb: npt.NDArray[np.float64]
     root_scale: npt.NDArray[np.float32]
     root_spacing: float
     node_store: SharedNodeStore
     state: PointState
-    transformer: Optional[Transformer]
+    number_of_jobs: int
+    transformer: Optional[Union[Transformer, GridTransformer]]
 
     def __init__(
         self,
         out_folder: Path,
-        files: Union[list[Union[str, Path]], str, Path],
+        files: Union[
+            Sequence[Union[str, Path, PointArrayType]], str, Path, PointArrayType
+        ],
         crs_in: Optional[CRS],
         force_crs_in: bool,
         pyproj_always_xy: bool,
@@ -92,12 +116,35 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
         color_scale: Optional[float],
         cache_size: int,
         verbosity: int,
+        tiling_profile: TilingProfile,
+        density_prepass: bool = False,
+        metadata_cache: Optional[Path] = None,
+        reprojection_tolerance: Optional[float] = None,
+        preview: Optional[float] = None,
+        point_filter: Optional[PointFilter] = None,
     ):
         self.out_folder = out_folder
 
         # allow str directly if only one input
-        files = [files] if isinstance(files, (str, Path)) else files
-        self.files = [Path(file) for file in files]
+        files = (
+            [files]
+            if isinstance(files, (str, Path, np.ndarray, PointStream))
+            else files
+        )
+        self.files = [
+            Path(file)
+            for file in files
+            if not isinstance(file, (np.ndarray, PointStream))
+        ]
+        # the arrays are copied in shared memory blocks during the initialization,
+        # then read like files
+        self.point_arrays = [
+            file for file in files if isinstance(file, (np.ndarray, PointStream))
+        ]
+        self.shared_arrays: dict[str, SharedPointArray] = {}
+        # the streams of unknown point count, and the blocks of their portions being read
+        self.streams: list[SharedPointStream] = []
+        self.stream_arrays: dict[str, SharedPointArray] = {}
 
         self.rgb = rgb
         self.classification = classification
@@ -107,11 +154,31 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
         self.crs_in = crs_in
         self.force_crs_in = force_crs_in
         self.pyproj_always_xy = pyproj_always_xy
+        self.reprojection_tolerance = reprojection_tolerance
 
         self.cache_size = cache_size
 
         self.verbosity = verbosity
 
+        self.tiling_profile = tiling_profile
+        # a preview reads one point out of stride and stops the tree at a maximum depth
+        self.stride = 1
+        if preview is not None:
+            if not 0 < preview <= 100:
+                raise TilerException(
+                    f"The preview percentage must be in ]0, 100], not {preview}"
+                )
+            self.stride = max(1, round(100 / preview))
+            if tiling_profile.max_depth is None:
+                self.tiling_profile = replace(
+                    tiling_profile, max_depth=PREVIEW_MAX_DEPTH
+                )
+        self.point_filter = point_filter
+        self.density_prepass = density_prepass
+        self.metadata_cache = (
+            MetadataCache(metadata_cache) if metadata_cache is not None else None
+        )
+
     def get_worker(self) -> PointTilerWorker:
         return PointTilerWorker(self.shared_metadata)
 
@@ -123,8 +190,10 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
 
         yield from self.send_points_to_process(time.time() - startup)
 
+        self.pull_stream_portion()
         while self.state.can_add_reading_jobs():
             yield self.send_file_to_read()
+            self.pull_stream_portion()
 
     def initialization(
         self,
@@ -132,23 +201,50 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
         working_dir: Path,
         number_of_jobs: int,
     ) -> None:
+        for point_array in self.point_arrays:
+            if isinstance(point_array, PointStream) and point_array.point_count is None:
+                self.streams.append(SharedPointStream(point_array))
+                continue
+            shared_array = SharedPointArray(point_array)
+            self.shared_arrays[shared_array.name] = shared_array
+            self.files.append(Path(shared_array.name))
+
+        file_scan_start = time.time()
         self.file_info = self.get_file_info(self.crs_in, self.force_crs_in)
-        self.transformer = self.get_transformer(
-            crs_out, always_xy=self.pyproj_always_xy
+        self.file_info["point_count"] = sum(
+            get_sampled_point_count(portion[1] - portion[0], self.stride)
+            for _, portion in self.file_info["portions"]
         )
+        self.file_scan_duration = time.time() - file_scan_start
+        transformer = self.get_transformer(crs_out, always_xy=self.pyproj_always_xy)
         (
             self.rotation_matrix,
             self.original_aabb,
             self.avg_min,
-        ) = self.get_rotation_matrix(crs_out, self.transformer)
+        ) = self.get_rotation_matrix(crs_out, transformer)
+        self.transformer = self.get_reader_transformer(transformer)
 
         self.root_aabb, self.root_scale, self.root_spacing = self.get_root_aabb(
             self.original_aabb
         )
 
+        if self.density_prepass:
+            if self.streams:
+                raise ValueError(
+                    "The density prepass can't sample streams whose point count is unknown."
+                )
+            self.apply_density_prepass()
+
         self.node_store = SharedNodeStore(working_dir)
 
-        self.state = PointState(self.file_info["portions"], max(1, number_of_jobs // 2))
+        self.file_info["portions"] = self.order_portions(
+            self.file_info["portions"], self.file_info["file_aabbs"]
+        )
+        self.number_of_jobs = number_of_jobs
+        self.state = PointState(
+            self.file_info["portions"], max(1, number_of_jobs // 2), number_of_jobs
+        )
+        self.state.number_of_open_streams = len(self.streams)
 
         self.shared_metadata = PointSharedMetadata(
             self.transformer,
@@ -160,7 +256,10 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
             self.color_scale,
             self.classification,
             self.intensity,
+            self.tiling_profile,
             self.verbosity,
+            self.stride,
+            self.point_filter,
         )
 
     def get_file_info(
@@ -169,27 +268,22 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
         force_crs_in: bool = False,
     ) -> dict[str, Any]:
 
-        pointcloud_file_portions = []
+        pointcloud_file_portions: PortionsType = []
         aabb = None
         total_point_count = 0
         avg_min = np.array([0.0, 0.0, 0.0])
 
-        # read all input files headers and determine the aabb/spacing
-        for file in self.files:
-            extension = file.suffix
-            if extension in READER_MAP:
-                reader = READER_MAP[extension]
-            else:
-                raise ValueError(
-                    f"The file with {extension} extension can't be read, "
-                    f"the available extensions are: {READER_MAP.keys()}"
-                )
-
-            file_info = reader.get_metadata(file)
+        # read all input files headers concurrently (most of the time is spent waiting for the
+        # storage), then merge them in the order of the files to get a deterministic result
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            files_info = list(executor.map(self.get_file_metadata, self.files))
+        files_info += [stream.get_metadata() for stream in self.streams]
 
+        # determine the aabb/spacing
+        for file_info in files_info:
             pointcloud_file_portions += file_info["portions"]
             if aabb is None:
-                aabb = file_info["aabb"]
+                aabb = file_info["aabb"].copy()
             else:
                 aabb[0] = np.minimum(aabb[0], file_info["aabb"][0])
                 aabb[1] = np.maximum(aabb[1], file_info["aabb"][1])
@@ -204,7 +298,7 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
                         f" {crs_in} and {file_crs_in}"
                     )
             total_point_count += file_info["point_count"]
-            avg_min += file_info["avg_min"] / len(self.files)
+            avg_min += file_info["avg_min"] / len(files_info)
 
         # The fact self.files is not empty have been checked before, so this shouldn't happen
         # but this keeps mypy happy and also serve as "defensive programming"
@@ -215,12 +309,74 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
         make_aabb_valid(aabb)
         return {
             "portions": pointcloud_file_portions,
+            # the aabb of each file, to order the portions
+            "file_aabbs": {
+                file_info["portions"][0][0]: file_info["aabb"]
+                for file_info in files_info
+                if file_info["portions"]
+            },
             "aabb": aabb,
             "crs_in": crs_in,
             "point_count": total_point_count,
             "avg_min": avg_min,
         }
 
+    def order_portions(
+        self,
+        portions: PortionsType,
+        file_aabbs: dict[str, npt.NDArray[np.float64]],
+    ) -> PortionsType:
+        """
+        Orders the files along the Morton curve of the centers of their aabbs, so that the
+        consecutive portions are in the same subtree, that can be completed and written early.
+
+        The portions of a file stay in the same order and the files at the same position on
+        the curve stay in the order of the file list. The portions are consumed from the end
+        of the list, so the first file on the curve is put last.
+        """
+        file_portions: dict[str, PortionsType] = {}
+        for filename, portion in portions:
+            file_portions.setdefault(filename, []).append((filename, portion))
+        if len(file_portions) < 2:
+            return portions
+
+        filenames = list(file_portions)
+        centers = np.array(
+            [
+                (file_aabbs[filename][0] + file_aabbs[filename][1]) / 2
+                for filename in filenames
+            ]
+        )
+        codes = morton_codes(centers, self.file_info["aabb"])
+        order = np.argsort(codes, kind="stable")
+
+        ordered_portions: PortionsType = []
+        for index in order[::-1]:
+            ordered_portions += file_portions[filenames[index]]
+        return ordered_portions
+
+    def get_file_metadata(self, file: Path) -> MetadataReaderType:
+        if str(file) in self.shared_arrays:
+            return self.shared_arrays[str(file)].get_metadata()
+
+        extension = file.suffix
+        if extension in READER_MAP:
+            reader = READER_MAP[extension]
+        else:
+            raise ValueError(
+                f"The file with {extension} extension can't be read, "
+                f"the available extensions are: {READER_MAP.keys()}"
+            )
+
+        file_info = None
+        if self.metadata_cache is not None:
+            file_info = self.metadata_cache.get(file)
+        if file_info is None:
+            file_info = reader.get_metadata(file)
+            if self.metadata_cache is not None:
+                self.metadata_cache.put(file, file_info)
+        return file_info
+
     def get_transformer(
         self, crs_out: Optional[CRS], always_xy: bool = False
     ) -> Optional[Transformer]:
@@ -238,6 +394,27 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
 
         return transformer
 
+    def get_reader_transformer(
+        self, transformer: Optional[Transformer]
+    ) -> Optional[Union[Transformer, GridTransformer]]:
+        """
+        Returns the transformer given to the readers: the exact one, or its approximation on a
+        grid if a reprojection tolerance is set and can be reached.
+        """
+        if transformer is None or self.reprojection_tolerance is None:
+            return transformer
+
+        grid_transformer = GridTransformer.from_transformer(
+            transformer, self.file_info["aabb"], self.reprojection_tolerance
+        )
+        if grid_transformer is None:
+            print(
+                f"Warning: the reprojection can't be approximated with an error lower than "
+                f"{self.reprojection_tolerance}, the points are reprojected exactly"
+            )
+            return transformer
+        return grid_transformer
+
     def get_rotation_matrix(
         self, crs_out: Optional[CRS], transformer: Optional[Transformer]
     ) -> tuple[
@@ -301,9 +478,38 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
             root_scale = np.array([1, 1, 1])
 
         root_aabb = original_aabb * root_scale
-        root_spacing = compute_spacing(root_aabb)
+        root_spacing = compute_spacing(root_aabb, self.tiling_profile.spacing_divisor)
         return root_aabb, root_scale, root_spacing
 
+    def apply_density_prepass(self) -> None:
+        """
+        Samples the input points to adapt the root spacing, the grid cell count and
+        the subdivision type of the nodes to the actual point density.
+        """
+        # the streams must be complete to be sampled
+        for shared_array in self.shared_arrays.values():
+            shared_array.fill()
+
+        density = DensityHistogram.from_portions(
+            self.root_aabb,
+            self.file_info["portions"],
+            (
+                -self.avg_min,
+                self.root_scale.astype(np.float64),
+                self.rotation_matrix[:3, :3].T,
+                None,
+            ),
+            self.transformer,
+        )
+        self.root_spacing *= density.spacing_factor()
+        self.tiling_profile = replace(
+            self.tiling_profile,
+            grid_initial_cell_count=density.grid_initial_cell_count(
+                self.tiling_profile.grid_initial_cell_count
+            ),
+            density=density,
+        )
+
     def print_summary(self) -> None:
         print("Summary:")
         print("  - points to process: {}".format(self.file_info["point_count"]))
@@ -312,12 +518,53 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
         print(f"  - root aabb: {self.root_aabb}")
         print(f"  - original aabb: {self.original_aabb}")
         print(f"  - scale: {self.root_scale}")
+        print(f"  - tiling profile: {self.tiling_profile}")
+        if self.stride > 1:
+            print(f"  - preview: one point out of {self.stride}")
+        if isinstance(self.transformer, GridTransformer):
+            print(f"  - reprojection grid: {self.transformer.values.shape[:3]} nodes")
+        print(f"  - input files scanned in: {self.file_scan_duration:.2f} s")
+
+    def pull_stream_portion(self) -> None:
+        """
+        Pulls the next portion of the open streams when there is no other portion to read,
+        so that the streams are read while the previous portions are processed.
+        """
+        while (
+            self.streams
+            and not self.state.point_cloud_file_parts
+            and self.state.has_reading_capacity()
+        ):
+            stream = self.streams[0]
+            rejected_point_count = stream.rejected_point_count
+            shared_array = stream.pull()
+            # the points outside of the aabb of the stream are rejected as they are pulled
+            self.state.filtered_points += (
+                stream.rejected_point_count - rejected_point_count
+            )
+            if shared_array is None:
+                self.streams.pop(0)
+                self.state.number_of_open_streams -= 1
+                continue
+
+            self.stream_arrays[shared_array.name] = shared_array
+            self.state.point_cloud_file_parts.append(
+                (shared_array.name, (0, len(shared_array.points)))
+            )
+            self.file_info["point_count"] += get_sampled_point_count(
+                len(shared_array.points), self.stride
+            )
 
     def send_file_to_read(self) -> tuple[bytes, list[bytes]]:
         if self.verbosity >= 1:
             print(f"Submit next portion {self.state.point_cloud_file_parts[-1]}")
         file, portion = self.state.point_cloud_file_parts.pop()
-        self.state.points_in_progress += portion[1] - portion[0]
+        if file in self.shared_arrays:
+            # the chunks of a stream are pulled when its portions are read
+            self.shared_arrays[file].fill(portion[1])
+        self.state.points_in_progress += get_sampled_point_count(
+            portion[1] - portion[0], self.stride
+        )
 
         self.state.number_of_reading_jobs += 1
 
@@ -349,7 +596,7 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
         )  # sort by node name size, the root nodes first
 
         while potentials:
-            target_count = 100_000
+            target_count = self.tiling_profile.process_job_point_count
             job_list = []
             count = 0
             idx = len(potentials) - 1
@@ -395,6 +642,24 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
 
         if return_type == PointWorkerMessageType.READ.value:
             self.state.number_of_reading_jobs -= 1
+            # the points expected from the portion that the reader didn't read (filtered out)
+            # won't be processed nor written, the points read beyond them are counted
+            unread_point_count = struct.unpack(">q", result[1])[0]
+            if unread_point_count > 0:
+                self.state.filtered_points += unread_point_count
+            self.state.points_in_progress -= unread_point_count
+            self.file_info["point_count"] -= unread_point_count
+            # all the points read before this message have been counted
+            if self.state.points_in_progress < 0:
+                raise TilerException(
+                    f"Invalid point count reported for a portion of {os.fsdecode(result[0])}"
+                )
+            if self.state.is_reading_finish() and self.file_info["point_count"] == 0:
+                raise TilerException("All the points have been filtered out.")
+            # the portion of a stream is read, its block can be released
+            stream_array = self.stream_arrays.pop(os.fsdecode(result[0]), None)
+            if stream_array is not None:
+                stream_array.release()
             at_least_one_job_ended = True
 
         elif return_type == PointWorkerMessageType.PROCESSED.value:
@@ -409,7 +674,9 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
             at_least_one_job_ended = True
 
         elif return_type == PointWorkerMessageType.PNTS_WRITTEN.value:
-            self.state.points_in_pnts += struct.unpack(">I", result[0])[0]
+            point_count, duplicate_point_count = struct.unpack(">II", result[0])
+            self.state.points_in_pnts += point_count
+            self.state.duplicate_points += duplicate_point_count
             self.state.number_of_writing_jobs -= 1
 
         elif return_type == PointWorkerMessageType.NEW_TASK.value:
@@ -422,6 +689,12 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
         else:
             raise NotImplementedError(f"The command {return_type!r} is not implemented")
 
+        if at_least_one_job_ended:
+            self.state.balance_jobs(
+                self.tiling_profile.process_job_point_count * self.number_of_jobs,
+                self.node_store.get_memory_pressure(self.cache_size),
+            )
+
         return at_least_one_job_ended
 
     def dispatch_processed_nodes(self, content: dict[str, bytes]) -> None:
@@ -465,11 +738,20 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
             self.state.waiting_writing_nodes.clear()
 
     def validate_binary_data(self) -> None:
-        if self.state.points_in_pnts != self.file_info["point_count"]:
+        if (
+            self.state.points_in_pnts + self.state.duplicate_points
+            != self.file_info["point_count"]
+        ):
             raise ValueError(
                 "Invalid point count in the written .pnts"
-                + f"(expected: {self.file_info['point_count']}, was: {self.state.points_in_pnts})"
+                + f"(expected: {self.file_info['point_count']}, was: {self.state.points_in_pnts}, "
+                + f"filtered out: {self.state.filtered_points}, "
+                + f"duplicates removed: {self.state.duplicate_points})"
             )
+        if self.verbosity >= 1 and self.state.filtered_points:
+            print(f"{self.state.filtered_points} points filtered out")
+        if self.verbosity >= 1 and self.state.duplicate_points:
+            print(f"{self.state.duplicate_points} duplicate points removed")
 
     def write_tileset(self, use_process_pool: bool = True) -> None:
         # compute tile transform matrix
@@ -478,7 +760,9 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
         transform = np.dot(make_translation_matrix(self.avg_min), transform)
 
         # Create the root tile by sampling (or taking all points?) of child nodes
-        root_node = Node(b"", self.root_aabb, self.root_spacing * 2)
+        root_node = Node(
+            b"", self.root_aabb, self.root_spacing * 2, self.tiling_profile
+        )
         root_node.children = []
         inv_aabb_size = (
             1.0
@@ -555,9 +839,9 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
             pool_executor = concurrent.futures.ProcessPoolExecutor()
         else:
             pool_executor = None
-        root_tile = node_from_name(b"", self.root_aabb, self.root_spacing).to_tileset(
-            self.out_folder, self.root_scale, None, 0, pool_executor
-        )
+        root_tile = node_from_name(
+            b"", self.root_aabb, self.root_spacing, self.tiling_profile
+        ).to_tileset(self.out_folder, self.root_scale, None, 0, pool_executor)
         if pool_executor is not None:
             pool_executor.shutdown()
 
@@ -583,12 +867,19 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
         tileset.write_as_json(self.out_folder / "tileset.json")
 
     def benchmark(self, benchmark_id: str, startup: float) -> None:
+        # the tile count and the number of points per tile, to compare how balanced the tilesets are
+        point_counts = number_of_points_per_tile(self.out_folder / "tileset.json")
         print(
-            "{},{},{},{}".format(
-                self.benchmark,
+            "{},{},{},{},{},{},{},{},{}".format(
+                benchmark_id,
                 ",".join([f.name for f in self.files]),
                 self.state.points_in_pnts,
                 round(time.time() - startup, 1),
+                round(self.file_scan_duration, 2),
+                len(point_counts),
+                min(point_counts, default=0),
+                round(float(np.mean(point_counts)) if point_counts else 0, 1),
+                max(point_counts, default=0),
             )
         )
 
@@ -654,3 +945,11 @@ class PointTiler(Tiler[PointSharedMetadata, PointTilerWorker]):
 
     def memory_control(self) -> None:
         self.node_store.control_memory_usage(self.cache_size, self.verbosity)
+
+    def release(self) -> None:
+        for shared_array in self.shared_arrays.values():
+            shared_array.release()
+        self.shared_arrays.clear()
+        for shared_array in self.stream_arrays.values():
+            shared_array.release()
+        self.stream_arrays.clear()
@@ -6,8 +6,9 @@ from pathlib import PurePath
 
 import zmq
 
+from py3dtiles.reader.post_processing import get_sampled_point_count
 from py3dtiles.tilers.base_tiler import TilerWorker
-from py3dtiles.utils import READER_MAP
+from py3dtiles.utils import READER_MAP, prefetch
 
 from .node import NodeCatalog, NodeProcess
 from .pnts import pnts_writer
@@ -47,8 +48,21 @@ class PointTilerWorker(TilerWorker[PointSharedMetadata]):
             self.shared_metadata.transformer,
             self.shared_metadata.color_scale,
             self.shared_metadata.write_intensity,
+            self.shared_metadata.stride,
+            self.shared_metadata.point_filter,
         )
-        for coords, colors, classification, intensity in reader_gen:
+        # the difference between the points expected from the portion and the points read is
+        # reported to the manager: the points filtered out by the reader, or minus the points
+        # read beyond the expected count (the real point count of a portion may differ)
+        portion = parameters["portion"]
+        unread_point_count = get_sampled_point_count(
+            portion[1] - portion[0], self.shared_metadata.stride
+        )
+        # the next chunk is read while the current one is sent
+        for coords, colors, classification, intensity in prefetch(reader_gen):
+            unread_point_count -= len(coords)
+            if len(coords) == 0:
+                continue
             skt.send_multipart(
                 [
                     PointWorkerMessageType.NEW_TASK.value,
@@ -66,23 +80,37 @@ class PointTilerWorker(TilerWorker[PointSharedMetadata]):
                 copy=False,
             )
 
-        skt.send_multipart([PointWorkerMessageType.READ.value])
+        skt.send_multipart(
+            [
+                PointWorkerMessageType.READ.value,
+                os.fsencode(parameters["filename"]),
+                struct.pack(">q", unread_point_count),
+            ]
+        )
 
     def execute_write_pnts(
         self, skt: zmq.Socket[bytes], content: bytes, node_name: bytes
     ) -> None:
+        duplicate_point_distance = (
+            self.shared_metadata.tiling_profile.duplicate_point_distance
+        )
         pnts_writer_gen = pnts_writer.run(
             content,
             self.shared_metadata.out_folder,
             self.shared_metadata.write_rgb,
             self.shared_metadata.write_classification,
             self.shared_metadata.write_intensity,
+            (
+                None
+                if duplicate_point_distance is None
+                else duplicate_point_distance * self.shared_metadata.scale[0]
+            ),
         )
-        for total in pnts_writer_gen:
+        for total, duplicate_total in pnts_writer_gen:
             skt.send_multipart(
                 [
                     PointWorkerMessageType.PNTS_WRITTEN.value,
-                    struct.pack(">I", total),
+                    struct.pack(">II", total, duplicate_total),
                     node_name,
                 ]
             )
@@ -111,6 +139,7 @@ class PointTilerWorker(TilerWorker[PointSharedMetadata]):
                 name,
                 self.shared_metadata.root_aabb,
                 self.shared_metadata.root_spacing,
+                self.shared_metadata.tiling_profile,
             )
 
             node_process = NodeProcess(
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import numpy.typing as npt
+
+from py3dtiles.exceptions import TilerException
+
+if TYPE_CHECKING:
+    from py3dtiles.utils import SubdivisionType
+
+    from .density import DensityHistogram
+
+
+class PointSelection(Enum):
+    """
+    How the grid of a node selects the points it keeps for its level of detail.
+    The points that are not selected are pushed to the children.
+    """
+
+    # keep a point if it is farther than the spacing from all the points kept in its grid cell.
+    # The result depends on the order of the points and the cost of a point grows with the cell size.
+    POISSON = "poisson"
+    # the node is divided in voxels of the size of the spacing, the first point of each voxel is kept
+    VOXEL_FIRST = "voxel-first"
+    # same voxels, the point the closest to the center of each voxel is kept
+    VOXEL_CENTER = "voxel-center"
+    # same voxels, a random point of each voxel is kept: the one with the lowest hash of its
+    # position, so that the result is reproducible and independent of the order of the points
+    VOXEL_RANDOM = "voxel-random"
+
+
+@dataclass(frozen=True)
+class TilingProfile:
+    """
+    Set of parameters driving the level of detail and the subdivision of the point tiler.
+
+    The default values are the ones py3dtiles has always used. The number of tiles and their size
+    depend mostly on `node_max_point_count` and `spacing_divisor`.
+    """
+
+    # a leaf node is split in children once it holds this number of points
+    node_max_point_count: int = 20_000
+    # a node is not split anymore if its spacing is lower than this value (in meters)
+    min_node_spacing: float = 0.001
+    # ... or if it is at this depth (the root being at depth 0), None for no limit
+    max_depth: int | None = None
+    # a grid cell is rebalanced in a finer grid once it holds this number of points...
+    grid_cell_max_point_count: int = 100_000
+    # ... or during the insertion, once it holds this number of points
+    grid_cell_insert_max_point_count: int = 200_000
+    # number of levels a process job handles, in function of the length of the node name.
+    # Each item is (minimum length of the name, depth), the first matching item is used.
+    process_depths: tuple[tuple[int, int], ...] = ((7, 5), (5, 3), (3, 2), (1, 1))
+    # number of points that are sent to a worker in a single process job
+    process_job_point_count: int = 100_000
+    # the root spacing is the diagonal of the root aabb divided by this value
+    spacing_divisor: float = 125
+    # a leaf tile with less points than this value is merged in its parent tile
+    prune_point_count: int = 100
+    # the sampling used for the level of detail of the nodes
+    point_selection: PointSelection = PointSelection.POISSON
+    # store the positions of the grids of the internal nodes as uint16 offsets in the node aabb in
+    # the node store (instead of float32), for the nodes where the quantization error stays low
+    # compared to their spacing. This is lossy for the points of the levels of detail, the
+    # points of the leaves are never quantized. It can't be used with the point selections that
+    # replace the points of a grid, the replaced points going down to the leaves
+    quantized_storage: bool = False
+    # the points of a leaf tile in the same cell of a grid of this size (in meters) are written
+    # once, to remove the duplicates of overlapping inputs. None to write all the points
+    duplicate_point_distance: float | None = None
+    # number of cells per axis of a new node grid
+    grid_initial_cell_count: int = 3
+    # histogram of the input density, set by the density pre-pass (see PointTiler)
+    density: DensityHistogram | None = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.quantized_storage and self.point_selection in (
+            PointSelection.VOXEL_CENTER,
+            PointSelection.VOXEL_RANDOM,
+        ):
+            raise TilerException(
+                f"The quantized storage can't be used with the {self.point_selection.value} point selection: "
+                "it replaces the points of the levels of detail, that would reach the leaves quantized."
+            )
+
+    def subdivision_type(
+        self, aabb: npt.NDArray[np.floating[Any]]
+    ) -> SubdivisionType | None:
+        """
+        Returns the subdivision type of a node from the input density,
+        or None if there is no density histogram (the aabb size decides then).
+        """
+        if self.density is None:
+            return None
+        return self.density.subdivision_type(aabb)
+
+    def get_process_depth(self, name: bytes) -> int:
+        for min_name_length, depth in self.process_depths:
+            if len(name) >= min_name_length:
+                return depth
+        return 0
+
+
+DEFAULT_TILING_PROFILE = TilingProfile()
+
+TILING_PROFILES = {
+    "default": DEFAULT_TILING_PROFILE,
+    # smaller tiles and fewer points per level, so that a web viewer
+    # quickly gets something to display and only loads what it needs.
+    "web": TilingProfile(
+        node_max_point_count=10_000,
+        spacing_divisor=100,
+        prune_point_count=100,
+    ),
+    # fewer and bigger tiles, for desktop viewers that handle large
+    # tiles well but suffer from the number of requests and files.
+    "desktop": TilingProfile(
+        node_max_point_count=60_000,
+        spacing_divisor=200,
+        prune_point_count=1_000,
+    ),
+}
+
+
+def get_tiling_profile(profile: TilingProfile | str | None) -> TilingProfile:
+    """
+    Returns a tiling profile from a profile instance, a preset name or None (the default profile).
+    """
+    if profile is None:
+        return DEFAULT_TILING_PROFILE
+    if isinstance(profile, TilingProfile):
+        return profile
+    if profile not in TILING_PROFILES:
+        raise TilerException(
+            f"Unknown tiling profile {profile!r}, the available profiles are: {', '.join(TILING_PROFILES)}"
+        )
+    return TILING_PROFILES[profile]
@@ -8,7 +8,7 @@ from .bounding_volume_box import BoundingVolumeBox
 from .root_property import RootProperty
 from .tile import Tile
 from .tileset import TileSet
-from .utils import number_of_points_in_tileset
+from .utils import number_of_points_in_tileset, number_of_points_per_tile
 
 __all__ = [
     "BoundingVolume",
@@ -16,6 +16,7 @@ __all__ = [
     "content",
     "extension",
     "number_of_points_in_tileset",
+    "number_of_points_per_tile",
     "RootProperty",
     "Tile",
     "TileSet",
@@ -1,9 +1,24 @@
-from .b3dm import B3dm, B3dmBody, B3dmHeader
-from .gltf_utils import GltfAttribute, GltfPrimitive, gltf_component_from_primitive
+import importlib
+from typing import TYPE_CHECKING, Any
+
 from .pnts import Pnts, PntsBody, PntsHeader
 from .tile_content import TileContent, TileContentBody, TileContentHeader
 from .tile_content_reader import read_binary_tile_content
 
+if TYPE_CHECKING:
+    from .b3dm import B3dm, B3dmBody, B3dmHeader
+    from .gltf_utils import GltfAttribute, GltfPrimitive, gltf_component_from_primitive
+
+# the names whose module imports pygltflib, imported only when they are used
+_LAZY_NAMES = {
+    "B3dm": ".b3dm",
+    "B3dmBody": ".b3dm",
+    "B3dmHeader": ".b3dm",
+    "GltfAttribute": ".gltf_utils",
+    "GltfPrimitive": ".gltf_utils",
+    "gltf_component_from_primitive": ".gltf_utils",
+}
+
 __all__ = [
     "batch_table",
     "B3dm",
@@ -21,3 +36,9 @@ __all__ = [
     "TileContentBody",
     "TileContentHeader",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_NAMES:
+        return getattr(importlib.import_module(_LAZY_NAMES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
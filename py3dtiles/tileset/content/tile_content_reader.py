@@ -8,7 +8,6 @@ import numpy.typing as npt
 
 from py3dtiles.exceptions import Invalid3dtilesError
 
-from .b3dm import B3dm
 from .pnts import Pnts
 
 if TYPE_CHECKING:
@@ -36,5 +35,8 @@ def read_array(array: npt.NDArray[np.uint8]) -> TileContent | None:
     if magic == "pnts":
         return Pnts.from_array(array)
     if magic == "b3dm":
+        # imported here, so that reading pnts doesn't import pygltflib
+        from .b3dm import B3dm
+
         return B3dm.from_array(array)
     return None
@@ -1,15 +1,18 @@
 import json
+from collections.abc import Iterator
 from pathlib import Path
 
 from .content import Pnts, read_binary_tile_content
 
 
-def number_of_points_in_tileset(tileset_path: Path) -> int:
+def _iter_pnts_in_tileset(tileset_path: Path) -> Iterator[tuple[Pnts, bool]]:
+    """
+    Yields every pnts tile content of the tileset (and of its sub-tilesets), with a boolean telling
+    if its points are part of the point cloud (they are not if they are replaced by the children ones).
+    """
     with tileset_path.open() as f:
         tileset = json.load(f)
 
-    nb_points = 0
-
     children_tileset_info = [(tileset["root"], tileset["root"]["refine"])]
     while children_tileset_info:
         child_tileset, parent_refine = children_tileset_info.pop()
@@ -21,10 +24,10 @@ def number_of_points_in_tileset(tileset_path: Path) -> int:
             content = tileset_path.parent / child_tileset["content"]["uri"]
 
             pnts_should_count = "children" not in child_tileset or child_refine == "ADD"
-            if content.suffix == ".pnts" and pnts_should_count:
+            if content.suffix == ".pnts":
                 tile = read_binary_tile_content(content)
                 if isinstance(tile, Pnts):
-                    nb_points += tile.body.feature_table.nb_points()
+                    yield tile, pnts_should_count
             elif content.suffix == ".json":
                 with content.open() as f:
                     sub_tileset = json.load(f)
@@ -36,4 +39,21 @@ def number_of_points_in_tileset(tileset_path: Path) -> int:
                 for sub_child_tileset in child_tileset["children"]
             ]
 
-    return nb_points
+
+def number_of_points_in_tileset(tileset_path: Path) -> int:
+    return sum(
+        tile.body.feature_table.nb_points()
+        for tile, should_count in _iter_pnts_in_tileset(tileset_path)
+        if should_count
+    )
+
+
+def number_of_points_per_tile(tileset_path: Path) -> list[int]:
+    """
+    Returns the number of points of each pnts tile of the tileset.
+    Useful to check how balanced the tiles of a tileset are.
+    """
+    return [
+        tile.body.feature_table.nb_points()
+        for tile, _ in _iter_pnts_in_tileset(tileset_path)
+    ]
@@ -4,9 +4,9 @@ from typing import TYPE_CHECKING, Any, Literal, Optional, TypedDict, Union
 
 import numpy as np
 import numpy.typing as npt
-from pyproj import CRS
 
 if TYPE_CHECKING:
+    from pyproj import CRS
     from typing_extensions import NotRequired
 
 # Tileset types
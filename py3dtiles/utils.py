@@ -1,25 +1,32 @@
 from __future__ import annotations
 
 import shutil
+import threading
+from collections.abc import Generator, Iterable
 from enum import Enum
 from io import StringIO
 from pathlib import Path, PurePath
-from typing import TYPE_CHECKING, Callable, TypeVar
+from queue import Full, Queue
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
 
 import numpy as np
 import numpy.typing as npt
 from pyproj import CRS
 
-from py3dtiles.reader import xyz_reader
+from py3dtiles.reader import array_reader, npy_reader, xyz_reader
 
 if TYPE_CHECKING:
     from typing_extensions import ParamSpec
 
     from py3dtiles.tilers.point.node import Node
+    from py3dtiles.tilers.point.tiling_profile import TilingProfile
 
 _T = TypeVar("_T", bound=npt.NBitBase)
+_Item = TypeVar("_Item")
 
 MIN_AABB_SIZE = 0.00001
+# the number of bits per axis of the Morton codes
+MORTON_BITS = 16
 
 
 def str_to_CRS(srs: str | CRS | None) -> CRS | None:
@@ -39,6 +46,9 @@ def str_to_CRS(srs: str | CRS | None) -> CRS | None:
 READER_MAP = {
     ".xyz": xyz_reader,
     ".csv": xyz_reader,
+    ".npy": npy_reader,
+    ".bin": npy_reader,
+    array_reader.SHARED_MEMORY_SUFFIX: array_reader,
 }
 
 try:
@@ -110,8 +120,8 @@ def node_name_to_path(
     return full_path
 
 
-def compute_spacing(aabb: npt.NDArray[np.floating[_T]]) -> float:
-    return float(np.linalg.norm(aabb[1] - aabb[0]) / 125)
+def compute_spacing(aabb: npt.NDArray[np.floating[_T]], divisor: float = 125) -> float:
+    return float(np.linalg.norm(aabb[1] - aabb[0]) / divisor)
 
 
 def aabb_size_to_subdivision_type(
@@ -124,10 +134,22 @@ def aabb_size_to_subdivision_type(
 
 
 def split_aabb(
-    aabb: npt.NDArray[np.floating[_T]], index: int, force_quadtree: bool = False
+    aabb: npt.NDArray[np.floating[_T]],
+    index: int,
+    force_quadtree: bool = False,
+    subdivision_type: SubdivisionType | None = None,
 ) -> npt.NDArray[np.floating[_T]]:
+    """
+    Returns the aabb of the child at index.
+
+    The subdivision type is computed from the aabb size, unless it is given by subdivision_type.
+    """
     half = (aabb[1] - aabb[0]) * 0.5
-    t = aabb_size_to_subdivision_type(half)
+    t = (
+        subdivision_type
+        if subdivision_type is not None
+        else aabb_size_to_subdivision_type(half)
+    )
 
     new_aabb = np.array([aabb[0], aabb[0] + half])
     if index & 4:
@@ -154,6 +176,33 @@ def make_aabb_cubic(aabb: npt.NDArray[np.floating[_T]]) -> npt.NDArray[np.floati
     return aabb
 
 
+def morton_codes(
+    positions: npt.NDArray[np.floating[_T]], aabb: npt.NDArray[np.floating[_T]]
+) -> npt.NDArray[np.uint64]:
+    """
+    Returns the codes of positions along the Morton curve (or Z-order curve) of aabb.
+
+    The positions are quantized on MORTON_BITS bits per axis in the cube of the size of the
+    largest side of aabb, so that the curve follows the octree (or quadtree, for flat
+    datasets) subdivision of the tiler: the positions of a node are consecutive on the curve.
+    """
+    size = max(float(np.max(aabb[1] - aabb[0])), MIN_AABB_SIZE)
+    max_cell = (1 << MORTON_BITS) - 1
+    cells = np.clip(
+        ((positions - aabb[0]) / size * (1 << MORTON_BITS)).astype(np.int64),
+        0,
+        max_cell,
+    ).astype(np.uint64)
+
+    codes = np.zeros(len(positions), dtype=np.uint64)
+    for bit in range(MORTON_BITS):
+        for axis in range(3):
+            codes |= ((cells[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(
+                3 * bit + 2 - axis
+            )
+    return codes
+
+
 def make_aabb_valid(aabb: npt.NDArray[np.float64]) -> None:
     """
     Modify inplace the aabb so that no dimension is 0-sized
@@ -167,13 +216,30 @@ def node_from_name(
     name: bytes,
     parent_aabb: npt.NDArray[np.floating[_T]],
     parent_spacing: float,
+    profile: TilingProfile | None = None,
 ) -> Node:
     from py3dtiles.tilers.point.node import Node
+    from py3dtiles.tilers.point.tiling_profile import DEFAULT_TILING_PROFILE
 
     spacing = parent_spacing * 0.5
-    aabb = split_aabb(parent_aabb, int(name[-1])) if len(name) > 0 else parent_aabb
+    if profile is None:
+        profile = DEFAULT_TILING_PROFILE
+    aabb = (
+        split_aabb(
+            parent_aabb,
+            int(name[-1]),
+            subdivision_type=profile.subdivision_type(parent_aabb),
+        )
+        if len(name) > 0
+        else parent_aabb
+    )
     # let's build a new Node
-    return Node(name, aabb.astype(np.float64), spacing)
+    return Node(
+        name,
+        aabb.astype(np.float64),
+        spacing,
+        profile,
+    )
 
 
 def mkdir_or_raise(folder: Path, overwrite: bool = False) -> None:
@@ -206,3 +272,52 @@ def mkdir_or_raise(folder: Path, overwrite: bool = False) -> None:
             )
     else:
         folder.mkdir()
+
+
+def prefetch(items: Iterable[_Item], size: int = 1) -> Generator[_Item, None, None]:
+    """
+    Iterates over items in a background thread, that produces up to `size` items ahead of the
+    consumer. The production of the next items (reading, decompressing...) then overlaps the
+    processing of the current one, as long as they release the GIL.
+
+    An exception raised by items is raised again to the consumer. If the consumer stops early,
+    the production stops after the current item.
+    """
+    queue: Queue[tuple[bool, Any]] = Queue(maxsize=size)
+    stopped = threading.Event()
+
+    def put(is_item: bool, value: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                queue.put((is_item, value), timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(True, item):
+                    break
+            else:
+                put(False, None)
+        except BaseException as exception:
+            put(False, exception)
+        finally:
+            if isinstance(items, Generator):
+                items.close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            is_item, value = queue.get()
+            if not is_item:
+                if value is not None:
+                    raise value
+                return
+            yield value
+    finally:
+        stopped.set()
+        thread.join()
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+DATA_DIRECTORY = Path(__file__).parent / "fixtures"
+
+# the dependencies of the commands that read or write points
+HEAVY_MODULES = ["laspy", "numba", "plyfile", "psutil", "pygltflib", "pyproj", "zmq"]
+
+
+def run_command_line(*args: str) -> "subprocess.CompletedProcess[str]":
+    return subprocess.run(
+        [sys.executable, "-m", "py3dtiles.command_line", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_info_imports_only_its_dependencies() -> None:
+    # the command line is run in a new interpreter, because the tests import all the modules
+    script = (
+        "import sys\n"
+        "from py3dtiles import command_line\n"
+        f"sys.argv = ['py3dtiles', 'info', {str(DATA_DIRECTORY / 'pointCloudRGB.pnts')!r}]\n"
+        "command_line.main()\n"
+        f"print([module for module in {HEAVY_MODULES!r} if module in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+
+    assert "Tile content" in result.stdout
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+def test_help_lists_all_the_commands() -> None:
+    result = run_command_line("--help")
+
+    for command in ["convert", "info", "merge", "export"]:
+        assert command in result.stdout
+
+
+def test_info_startup_perf(benchmark: BenchmarkFixture) -> None:
+    # info is called by scripts for each tile, so its duration is mostly the startup time
+    benchmark(run_command_line, "info", str(DATA_DIRECTORY / "pointCloudRGB.pnts"))
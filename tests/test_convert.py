@@ -1,26 +1,43 @@
 import json
+import math
 import multiprocessing
 import os
 import shutil
+import threading
+from collections.abc import Generator
 from contextlib import nullcontext
 from pathlib import Path
 from time import sleep
-from typing import Union
+from typing import Any, Union
 from unittest.mock import patch
 
 import laspy
 import numpy as np
+import numpy.typing as npt
 import plyfile
 from _pytest.python_api import RaisesContext
 from numpy.testing import assert_array_almost_equal, assert_array_equal
 from pyproj import CRS
-from pytest import mark, raises
+from pytest import CaptureFixture, mark, raises
 
-from py3dtiles.convert import convert
-from py3dtiles.exceptions import SrsInMissingException, SrsInMixinException
+from py3dtiles.convert import _open_stream, convert
+from py3dtiles.exceptions import (
+    SrsInMissingException,
+    SrsInMixinException,
+    TilerException,
+)
+from py3dtiles.reader import xyz_reader
+from py3dtiles.reader.array_reader import PointStream
 from py3dtiles.reader.ply_reader import create_plydata_with_renamed_property
-from py3dtiles.tileset import TileSet, number_of_points_in_tileset
+from py3dtiles.reader.point_filter import PointFilter
+from py3dtiles.tilers.point.tiling_profile import PointSelection, TilingProfile
+from py3dtiles.tileset import (
+    TileSet,
+    number_of_points_in_tileset,
+    number_of_points_per_tile,
+)
 from py3dtiles.tileset.content import Pnts
+from py3dtiles.utils import READER_MAP
 
 DATA_DIRECTORY = Path(__file__).parent / "fixtures"
 
@@ -117,6 +134,134 @@ def test_convert_without_srs(tmp_dir: Path) -> None:
     assert_array_equal(pt1_color, np.array((187, 187, 187), dtype=np.uint8))
 
 
+def test_convert_with_reprojection_tolerance(tmp_dir: Path) -> None:
+    exact_dir = tmp_dir / "exact"
+    approximated_dir = tmp_dir / "approximated"
+    for outfolder, reprojection_tolerance in (
+        (exact_dir, None),
+        (approximated_dir, 0.001),
+    ):
+        convert(
+            DATA_DIRECTORY / "without_srs.las",
+            outfolder=outfolder,
+            crs_in=CRS.from_epsg(3949),
+            crs_out=CRS.from_epsg(4978),
+            jobs=1,
+            reprojection_tolerance=reprojection_tolerance,
+        )
+
+    exact_tiles = sorted(path.name for path in exact_dir.glob("*.pnts"))
+    assert exact_tiles == sorted(path.name for path in approximated_dir.glob("*.pnts"))
+    for tile in exact_tiles:
+        exact_positions, approximated_positions = (
+            np.sort(
+                Pnts.from_file(outfolder / tile)
+                .body.feature_table.body.position.reshape(-1, 3)
+                .astype(np.float64),
+                axis=0,
+            )
+            for outfolder in (exact_dir, approximated_dir)
+        )
+        assert_array_almost_equal(exact_positions, approximated_positions, decimal=2)
+
+
+def test_convert_preview(tmp_dir: Path) -> None:
+    path = DATA_DIRECTORY / "ripple.las"
+    convert(path, outfolder=tmp_dir, jobs=1, preview=10)
+
+    # one point out of 10
+    with laspy.open(path) as f:
+        assert number_of_points_in_tileset(tmp_dir / "tileset.json") == math.ceil(
+            f.header.point_count / 10
+        )
+
+
+def test_convert_preview_max_depth(tmp_dir: Path) -> None:
+    rng = np.random.default_rng(0)
+    points = rng.random((200_000, 3)) * 100
+    convert(
+        points,
+        outfolder=tmp_dir,
+        jobs=1,
+        preview=50,
+        tiling_profile=TilingProfile(max_depth=1),
+    )
+
+    assert number_of_points_in_tileset(tmp_dir / "tileset.json") == 100_000
+    # the children of the root are not split, even if they have more points than node_max_point_count
+    assert {path.name for path in tmp_dir.glob("*.pnts")} == {"r.pnts"} | {
+        f"r{i}.pnts" for i in range(8)
+    }
+
+
+def test_convert_with_point_filter(tmp_dir: Path) -> None:
+    path = DATA_DIRECTORY / "ripple.las"
+    las = laspy.read(path)
+    aabb = [[2.0, 2.0, -10.0], [8.0, 6.0, 10.0]]
+    convert(
+        path,
+        outfolder=tmp_dir,
+        jobs=1,
+        point_filter=PointFilter(aabb=aabb),
+    )
+
+    inside = (
+        (las.x >= 2)
+        & (las.x <= 8)
+        & (las.y >= 2)
+        & (las.y <= 6)
+        & (np.abs(las.z) <= 10)
+    )
+    assert 0 < np.count_nonzero(inside) < len(las.points)
+    assert number_of_points_in_tileset(tmp_dir / "tileset.json") == np.count_nonzero(
+        inside
+    )
+
+    with raises(TilerException, match="All the points have been filtered out"):
+        convert(
+            path,
+            outfolder=tmp_dir / "empty",
+            jobs=1,
+            point_filter=PointFilter(classifications=[99]),
+        )
+
+
+@mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="'patch' function works only with the multiprocessing 'fork' method (not available on windows).",
+)
+def test_convert_reader_reading_more_points_than_its_portion(tmp_dir: Path) -> None:
+    # the real point count of a portion may differ from the count it was split with
+    run = xyz_reader.run
+
+    def run_with_extra_points(
+        *args: Any, **kwargs: Any
+    ) -> Generator[tuple[npt.NDArray[Any], ...], None, None]:
+        for coords, colors, classification, intensity in run(*args, **kwargs):
+            yield coords, colors, classification, intensity
+            yield coords[:10], colors[:10], classification[:10], intensity[:10]
+
+    with patch("py3dtiles.reader.xyz_reader.run", run_with_extra_points):
+        convert(DATA_DIRECTORY / "simple.xyz", outfolder=tmp_dir, jobs=1)
+
+    # the 3 points of the file and their copies
+    assert number_of_points_in_tileset(tmp_dir / "tileset.json") == 6
+
+
+def test_convert_remove_duplicates(tmp_dir: Path) -> None:
+    rng = np.random.default_rng(0)
+    points = rng.random((50_000, 3)) * 100
+    convert(
+        np.concatenate((points, points)),
+        outfolder=tmp_dir,
+        jobs=1,
+        tiling_profile=TilingProfile(duplicate_point_distance=0.001),
+    )
+
+    # the points are in the leaf tiles of the first level
+    assert number_of_points_in_tileset(tmp_dir / "tileset.json") == 50_000
+
+
 def test_convert_las_color_scale(tmp_dir: Path) -> None:
     convert(
         DATA_DIRECTORY / "without_srs.las",
@@ -241,7 +386,7 @@ def test_convert_simple_xyz(tmp_dir: Path) -> None:
     with tileset_path.open() as f:
         tileset = json.load(f)
 
-    expecting_box = [0.3916, 0.3253, -0.0001, 0.39, 0, 0, 0, 0.3099, 0, 0, 0, 0.0001]
+    expecting_box = [0.3883, 0.3251, -0.0001, 0.3883, 0, 0, 0, 0.3251, 0, 0, 0, 0.0001]
     box = [round(value, 4) for value in tileset["root"]["boundingVolume"]["box"]]
     assert box == expecting_box
 
@@ -954,3 +1099,277 @@ def test_convert_crs_traditional_ordering(
     assert_array_almost_equal(
         tileset.root_tile.transform[:-1, 3], [12706441.9, 2544660, 530], decimal=0
     )
+
+
+def test_convert_with_tiling_profiles(tmp_dir: Path) -> None:
+    path = DATA_DIRECTORY / "ripple.las"
+    with laspy.open(path) as f:
+        las_point_count = f.header.point_count
+
+    pnts_counts = {}
+    for profile in ("web", "default", "desktop"):
+        convert(path, outfolder=tmp_dir / profile, tiling_profile=profile, jobs=2)
+        assert las_point_count == number_of_points_in_tileset(
+            tmp_dir / profile / "tileset.json"
+        )
+        pnts_counts[profile] = len(list((tmp_dir / profile).glob("**/*.pnts")))
+
+    assert pnts_counts["web"] >= pnts_counts["default"] >= pnts_counts["desktop"]
+
+
+def test_convert_with_custom_tiling_profile(tmp_dir: Path) -> None:
+    path = DATA_DIRECTORY / "ripple.las"
+    convert(
+        path,
+        outfolder=tmp_dir,
+        tiling_profile=TilingProfile(
+            node_max_point_count=1_000, spacing_divisor=20, prune_point_count=10
+        ),
+        jobs=2,
+    )
+
+    with laspy.open(path) as f:
+        las_point_count = f.header.point_count
+    assert las_point_count == number_of_points_in_tileset(tmp_dir / "tileset.json")
+    # with such a low split threshold and a sparse level of detail,
+    # there must be tiles at depth 2 at least
+    assert any(len(p.stem) > 2 for p in tmp_dir.glob("*.pnts"))
+
+
+def test_convert_with_unknown_tiling_profile(tmp_dir: Path) -> None:
+    with raises(TilerException, match="Unknown tiling profile 'mobile'"):
+        convert(
+            DATA_DIRECTORY / "ripple.las", outfolder=tmp_dir, tiling_profile="mobile"
+        )
+
+
+@mark.parametrize("filename", ["ripple.las", "simple.xyz", "simple.ply"])
+def test_convert_with_density_prepass(tmp_dir: Path, filename: str) -> None:
+    path = DATA_DIRECTORY / filename
+    convert(
+        path,
+        outfolder=tmp_dir,
+        tiling_profile=TilingProfile(node_max_point_count=1_000),
+        density_prepass=True,
+        jobs=2,
+    )
+
+    point_count = READER_MAP[path.suffix].get_metadata(path)["point_count"]
+    assert point_count == number_of_points_in_tileset(tmp_dir / "tileset.json")
+
+
+def test_convert_benchmark_report(tmp_dir: Path, capsys: CaptureFixture[str]) -> None:
+    path = DATA_DIRECTORY / "ripple.las"
+    convert(path, outfolder=tmp_dir, benchmark="ripple", density_prepass=True, jobs=2)
+
+    point_counts = number_of_points_per_tile(tmp_dir / "tileset.json")
+    assert len(point_counts) == len(list(tmp_dir.glob("**/*.pnts")))
+    assert sum(point_counts) >= number_of_points_in_tileset(tmp_dir / "tileset.json")
+
+    # the progress bar can be printed on the same line
+    report = capsys.readouterr().out.strip().splitlines()[-1].split(",")[-9:]
+    assert report[0].endswith("ripple")
+    assert report[1] == "ripple.las"
+    # the time spent to scan the input files
+    assert 0 <= float(report[4]) <= float(report[3])
+    assert int(report[5]) == len(point_counts)
+    assert int(report[6]) == min(point_counts)
+    assert int(report[8]) == max(point_counts)
+
+
+@mark.parametrize(
+    "point_selection", [PointSelection.POISSON, PointSelection.VOXEL_FIRST]
+)
+def test_convert_with_quantized_storage(
+    tmp_dir: Path, point_selection: PointSelection
+) -> None:
+    path = DATA_DIRECTORY / "ripple.las"
+    for quantized_storage in (False, True):
+        convert(
+            path,
+            outfolder=tmp_dir / str(quantized_storage),
+            tiling_profile=TilingProfile(
+                node_max_point_count=1_000,
+                point_selection=point_selection,
+                quantized_storage=quantized_storage,
+            ),
+            jobs=1,
+        )
+
+    with laspy.open(path) as f:
+        las_point_count = f.header.point_count
+    assert las_point_count == number_of_points_in_tileset(
+        tmp_dir / "True" / "tileset.json"
+    )
+
+    # the points of the leaf tiles are the same, bit for bit
+    tiles = sorted(path.stem for path in (tmp_dir / "False").glob("*.pnts"))
+    assert tiles == sorted(path.stem for path in (tmp_dir / "True").glob("*.pnts"))
+    leaves = [
+        tile
+        for tile in tiles
+        if not any(other.startswith(tile) and other != tile for other in tiles)
+    ]
+    assert 1 < len(leaves) < len(tiles)
+    for leaf in leaves:
+        exact_positions, positions = (
+            Pnts.from_file(tmp_dir / str(quantized_storage) / f"{leaf}.pnts")
+            .body.feature_table.body.position.reshape(-1, 3)
+            .view(np.uint32)
+            for quantized_storage in (False, True)
+        )
+        assert_array_equal(
+            exact_positions[np.lexsort(exact_positions.T)],
+            positions[np.lexsort(positions.T)],
+        )
+
+
+@mark.parametrize(
+    "point_selection", [PointSelection.VOXEL_CENTER, PointSelection.VOXEL_RANDOM]
+)
+def test_quantized_storage_with_replacing_point_selection(
+    point_selection: PointSelection,
+) -> None:
+    # the points replaced in the grids would reach the leaves quantized
+    with raises(TilerException, match="can't be used with the voxel-"):
+        TilingProfile(point_selection=point_selection, quantized_storage=True)
+
+
+@mark.parametrize("point_selection", list(PointSelection))
+def test_convert_with_point_selection(
+    tmp_dir: Path, point_selection: PointSelection
+) -> None:
+    path = DATA_DIRECTORY / "ripple.las"
+    convert(
+        path,
+        outfolder=tmp_dir,
+        tiling_profile=TilingProfile(
+            node_max_point_count=1_000, point_selection=point_selection
+        ),
+        jobs=2,
+    )
+
+    with laspy.open(path) as f:
+        las_point_count = f.header.point_count
+    assert las_point_count == number_of_points_in_tileset(tmp_dir / "tileset.json")
+
+
+def test_convert_with_metadata_cache(tmp_dir: Path) -> None:
+    path = DATA_DIRECTORY / "simple.xyz"
+    cache_folder = tmp_dir / "cache"
+    convert(path, outfolder=tmp_dir / "first", metadata_cache=cache_folder, jobs=2)
+    assert len(list(cache_folder.iterdir())) == 1
+
+    # the second conversion doesn't scan the file
+    with patch("py3dtiles.reader.xyz_reader.get_metadata") as mock_get_metadata:
+        convert(path, outfolder=tmp_dir / "second", metadata_cache=cache_folder, jobs=2)
+    mock_get_metadata.assert_not_called()
+
+    assert number_of_points_in_tileset(
+        tmp_dir / "first" / "tileset.json"
+    ) == number_of_points_in_tileset(tmp_dir / "second" / "tileset.json")
+
+
+def test_convert_npy(tmp_dir: Path) -> None:
+    las = laspy.read(DATA_DIRECTORY / "ripple.las")
+    points = np.zeros(
+        len(las.points),
+        dtype=[("x", "f8"), ("y", "f8"), ("z", "f8"), ("classification", "u1")],
+    )
+    points["x"], points["y"], points["z"] = las.x, las.y, las.z
+    points["classification"] = las.classification
+    np.save(tmp_dir / "ripple.npy", points)
+
+    convert(tmp_dir / "ripple.npy", outfolder=tmp_dir / "tiles", jobs=2)
+
+    assert len(points) == number_of_points_in_tileset(
+        tmp_dir / "tiles" / "tileset.json"
+    )
+
+
+def test_convert_arrays(tmp_dir: Path) -> None:
+    las = laspy.read(DATA_DIRECTORY / "ripple.las")
+    xyz = np.vstack((las.x, las.y, las.z)).transpose()
+    points = np.zeros(
+        len(xyz),
+        dtype=[("x", "f8"), ("y", "f8"), ("z", "f8"), ("classification", "u1")],
+    )
+    points["x"], points["y"], points["z"] = las.x, las.y, las.z
+    points["classification"] = las.classification
+
+    stream = PointStream(
+        (xyz[start : start + 3_000] for start in range(0, len(xyz), 3_000)),
+        [xyz.min(axis=0), xyz.max(axis=0)],
+        len(xyz),
+    )
+    convert(
+        [points, xyz, stream],
+        outfolder=tmp_dir,
+        jobs=2,
+        classification=True,
+    )
+
+    assert 3 * len(xyz) == number_of_points_in_tileset(tmp_dir / "tileset.json")
+    # the shared memory blocks are released
+    assert not list(Path("/dev/shm").glob("py3dtiles_*"))
+
+
+def test_convert_stream_of_unknown_point_count(tmp_dir: Path) -> None:
+    las = laspy.read(DATA_DIRECTORY / "ripple.las")
+    xyz = np.vstack((las.x, las.y, las.z)).transpose()
+
+    stream = PointStream(
+        (xyz[start : start + 1_000] for start in range(0, len(xyz), 1_000)),
+        [xyz.min(axis=0), xyz.max(axis=0)],
+    )
+    # the stream is pulled by several portions
+    with patch("py3dtiles.reader.npy_reader.PORTION_POINT_COUNT", 3_000):
+        convert(stream, outfolder=tmp_dir, jobs=2)
+
+    assert len(xyz) == number_of_points_in_tileset(tmp_dir / "tileset.json")
+    assert not list(Path("/dev/shm").glob("py3dtiles_*"))
+
+
+def test_convert_stream_rejects_points_outside_of_its_aabb(
+    tmp_dir: Path, capsys: CaptureFixture[str]
+) -> None:
+    las = laspy.read(DATA_DIRECTORY / "ripple.las")
+    xyz = np.vstack((las.x, las.y, las.z)).transpose()
+    aabb = np.array([xyz.min(axis=0), xyz.max(axis=0)])
+    aabb[1][0] = np.median(xyz[:, 0])
+    inside_point_count = np.count_nonzero(xyz[:, 0] <= aabb[1][0])
+
+    stream = PointStream(
+        (xyz[start : start + 1_000] for start in range(0, len(xyz), 1_000)), aabb
+    )
+    with patch("py3dtiles.reader.npy_reader.PORTION_POINT_COUNT", 3_000):
+        convert(stream, outfolder=tmp_dir, jobs=2, verbose=1)
+
+    assert inside_point_count == number_of_points_in_tileset(tmp_dir / "tileset.json")
+    assert (
+        f"{len(xyz) - inside_point_count} points filtered out"
+        in capsys.readouterr().out
+    )
+    assert not list(Path("/dev/shm").glob("py3dtiles_*"))
+
+
+@mark.skipif(not hasattr(os, "mkfifo"), reason="named pipes are not supported")
+def test_named_pipe_closed_after_its_stream(tmp_dir: Path) -> None:
+    pipe = tmp_dir / "points.pipe"
+    os.mkfifo(pipe)
+
+    def write() -> None:
+        with open(pipe, "w") as f:
+            f.write("x y z\n" + "".join(f"{i} {i} {i}\n" for i in range(100)))
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    stream = _open_stream(str(pipe), [0, 0, 0, 100, 100, 100])
+    assert isinstance(stream, PointStream)
+    assert sum(len(chunk) for chunk in stream.chunks) == 100
+    writer.join()
+
+    open_files = [
+        os.path.realpath(f"/proc/self/fd/{fd}") for fd in os.listdir("/proc/self/fd")
+    ]
+    assert str(pipe.resolve()) not in open_files
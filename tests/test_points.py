@@ -1,12 +1,16 @@
+import pickle
 from pathlib import Path
 
 import numpy as np
+import numpy.typing as npt
 from numpy.testing import assert_array_equal
+from pytest import mark
 from pytest_benchmark.fixture import BenchmarkFixture
 
 from py3dtiles.tilers.point.node import Grid, Node
-from py3dtiles.tilers.point.node.distance import is_point_far_enough
-from py3dtiles.utils import node_name_to_path
+from py3dtiles.tilers.point.node.distance import is_point_far_enough, xyz_to_key
+from py3dtiles.tilers.point.tiling_profile import PointSelection, TilingProfile
+from py3dtiles.utils import compute_spacing, node_name_to_path
 
 # test point
 xyz = np.array([0.25, 0.25, 0.25], dtype=np.float32)
@@ -79,6 +83,125 @@ def test_grid_get_point_count(grid: Grid, node: Node) -> None:
     assert len(grid.get_points(False, False, False)) == 1 * (3 * 4) * 1
 
 
+@mark.parametrize("point_selection", list(PointSelection))
+def test_grid_point_selection(point_selection: PointSelection) -> None:
+    bbox = np.array([[0, 0, 0], [2, 2, 2]])
+    node = Node(
+        b"noeud",
+        bbox,
+        compute_spacing(bbox),
+        TilingProfile(point_selection=point_selection),
+    )
+    points = np.random.default_rng(0).uniform(0, 2, (10_000, 3)).astype(np.float32)
+    remainder = node.grid.insert(
+        node.aabb[0],
+        node.inv_aabb_size,
+        points,
+        np.zeros((10_000, 3), dtype=np.uint8),
+        np.zeros((10_000, 1), dtype=np.uint8),
+        np.zeros((10_000, 1), dtype=np.uint8),
+    )[0]
+
+    # no point is lost or duplicated
+    kept = node.grid.get_points(False, False, False).view(np.float32).reshape(-1, 3)
+    assert len(kept) + len(remainder) == len(points)
+    assert_array_equal(
+        np.unique(np.concatenate((kept, remainder)), axis=0),
+        np.unique(points, axis=0),
+    )
+
+    if point_selection != PointSelection.POISSON:
+        # one point per voxel
+        voxels = np.floor(kept / node.spacing).astype(np.int64)
+        assert len(np.unique(voxels, axis=0)) == len(kept)
+
+    # the voxels are rebuilt after the serialization
+    grid = pickle.loads(pickle.dumps(node.grid))
+    assert grid.insert(
+        node.aabb[0],
+        node.inv_aabb_size,
+        kept,
+        np.zeros((len(kept), 3), dtype=np.uint8),
+        np.zeros((len(kept), 1), dtype=np.uint8),
+        np.zeros((len(kept), 1), dtype=np.uint8),
+    )[0].shape[0] == len(kept)
+
+
+@mark.parametrize(
+    "point_selection", [PointSelection.VOXEL_CENTER, PointSelection.VOXEL_RANDOM]
+)
+def test_grid_voxel_replacement(point_selection: PointSelection) -> None:
+    bbox = np.array([[0, 0, 0], [2, 2, 2]])
+    # a coarse spacing, so that most of the voxels get several points
+    spacing = 0.1
+    points = np.random.default_rng(0).uniform(0, 2, (10_000, 3)).astype(np.float32)
+
+    def insert_by_batches(order: npt.NDArray[np.int64]) -> Grid:
+        node = Node(
+            b"noeud",
+            bbox,
+            spacing,
+            TilingProfile(point_selection=point_selection),
+        )
+        # the points of the first batches are replaced by the ones of the next batches
+        for batch in np.array_split(points[order], 10):
+            node.grid.insert(
+                node.aabb[0],
+                node.inv_aabb_size,
+                batch,
+                np.zeros((len(batch), 3), dtype=np.uint8),
+                np.zeros((len(batch), 1), dtype=np.uint8),
+                np.zeros((len(batch), 1), dtype=np.uint8),
+            )
+        # each point is in the cell of its position
+        shift = int(node.grid.cell_count[0] - 1).bit_length()
+        for k, cell in enumerate(node.grid.cells_xyz):
+            if cell.size:
+                keys = xyz_to_key(
+                    cell,
+                    node.grid.cell_count,
+                    node.aabb[0],
+                    node.inv_aabb_size,
+                    shift,
+                )
+                assert np.all(keys == k)
+        return node.grid
+
+    grid = insert_by_batches(np.arange(len(points)))
+    kept = grid.get_points(False, False, False).view(np.float32).reshape(-1, 3)
+    voxels = np.floor(kept / spacing).astype(np.int64)
+    assert len(np.unique(voxels, axis=0)) == len(kept)
+
+    # the selected points don't depend on the order of the points
+    other_grid = insert_by_batches(np.random.default_rng(1).permutation(len(points)))
+    other_kept = (
+        other_grid.get_points(False, False, False).view(np.float32).reshape(-1, 3)
+    )
+    assert_array_equal(np.unique(kept, axis=0), np.unique(other_kept, axis=0))
+
+
+@mark.parametrize("point_selection", list(PointSelection))
+def test_grid_point_selection_perf(
+    point_selection: PointSelection, benchmark: BenchmarkFixture
+) -> None:
+    bbox = np.array([[0, 0, 0], [2, 2, 2]])
+    points = np.random.default_rng(0).uniform(0, 2, (20_000, 3)).astype(np.float32)
+    rgb = np.zeros((20_000, 3), dtype=np.uint8)
+    scalar = np.zeros((20_000, 1), dtype=np.uint8)
+
+    def insert_in_new_grid() -> int:
+        node = Node(
+            b"noeud",
+            bbox,
+            compute_spacing(bbox),
+            TilingProfile(point_selection=point_selection),
+        )
+        node.grid.insert(node.aabb[0], node.inv_aabb_size, points, rgb, scalar, scalar)
+        return node.grid.get_point_count()
+
+    benchmark(insert_in_new_grid)
+
+
 def test_is_point_far_enough() -> None:
     points = np.array(
         [
@@ -4,14 +4,152 @@ The example that is run in the test (`simple.ply`) comes from the [CGAL reposito
 
 """
 
+import concurrent.futures
+import io
+import json
+import os
+import struct
+import threading
+from collections.abc import Generator
+from importlib.util import find_spec
 from pathlib import Path
 from typing import Any
+from unittest.mock import patch
 
+import laspy
 import numpy as np
+import numpy.typing as npt
 import plyfile
-from pytest import raises
+from numpy.testing import assert_array_equal
+from pytest import mark, raises
 
-from py3dtiles.reader import ply_reader
+from py3dtiles.reader import (
+    array_reader,
+    las_reader,
+    npy_reader,
+    ply_reader,
+    post_processing,
+    xyz_reader,
+)
+from py3dtiles.reader.point_filter import PointFilter, read_geojson_polygon
+
+
+def test_post_processing() -> None:
+    rng = np.random.default_rng(0)
+    x, y, z = rng.integers(-100_000, 100_000, (3, 1000), dtype=np.int32)
+    offset_scale = (
+        np.array([-10.0, 20.0, 0.5]),
+        np.array([0.1, 0.1, 0.2]),
+        np.array([[0, 1, 0], [-1, 0, 0], [0, 0, 1]], dtype=np.float64),
+        None,
+    )
+    coords = post_processing.transform_coordinates(
+        x, y, z, offset_scale, None, [0.01, 0.01, 0.001], [1000, 2000, 0]
+    )
+    expected_coords = np.dot(
+        (
+            np.vstack((x * 0.01 + 1000, y * 0.01 + 2000, z * 0.001)).transpose()
+            + offset_scale[0]
+        )
+        * offset_scale[1],
+        offset_scale[2],
+    )
+    assert coords.dtype == np.float32
+    assert coords.flags.c_contiguous
+    assert_array_equal(coords, expected_coords.astype(np.float32))
+
+    # 16 bits colors, scaled then clipped
+    red, green, blue = rng.integers(0, 65536, (3, 1000), dtype=np.uint16)
+    colors = post_processing.convert_colors(red, green, blue, 1.5, 256)
+    expected_colors = (
+        np.clip(np.vstack((red, green, blue)).transpose() * 1.5, 0, 65535) / 256
+    ).astype(np.uint8)
+    assert_array_equal(colors, expected_colors)
+    # big endian components
+    assert_array_equal(
+        post_processing.convert_colors(
+            red.astype(">u2"), green.astype(">u2"), blue.astype(">u2"), 1.5, 256
+        ),
+        expected_colors,
+    )
+
+    # the chunks of a portion are converted in the rows of the same buffers
+    buffers = post_processing.OutputBuffers(1500)
+    for chunk in (slice(0, 600), slice(600, 1000)):
+        coords_out, colors_out = buffers.next_rows(chunk.stop - chunk.start)
+        assert coords_out is not None and colors_out is not None
+        chunk_coords = post_processing.transform_coordinates(
+            x[chunk],
+            y[chunk],
+            z[chunk],
+            offset_scale,
+            None,
+            [0.01, 0.01, 0.001],
+            [1000, 2000, 0],
+            coords_out,
+        )
+        chunk_colors = post_processing.convert_colors(
+            red[chunk], green[chunk], blue[chunk], 1.5, 256, colors_out
+        )
+        assert chunk_coords.base is buffers.coords
+        assert chunk_colors.base is buffers.colors
+    assert_array_equal(buffers.coords[:1000], coords)
+    assert_array_equal(buffers.colors[:1000], expected_colors)
+    # the buffers are full
+    assert buffers.next_rows(600) == (None, None)
+
+    with raises(ValueError, match="must have the shape"):
+        post_processing.convert_colors(
+            red, green, blue, 1.5, 256, np.empty((999, 3), dtype=np.uint8)
+        )
+
+
+def test_point_filter() -> None:
+    x, y = np.meshgrid(np.arange(10.0), np.arange(10.0))
+    x, y = x.ravel() + 0.5, y.ravel() + 0.5
+    z = np.arange(100.0)
+    classification = np.arange(100, dtype=np.uint8) % 4
+
+    point_filter = PointFilter(classifications=[1, 2], excluded_classifications=[2])
+    assert_array_equal(point_filter.mask(x, y, z, classification), classification == 1)
+    # the points without classification are of class 0
+    assert not np.any(point_filter.mask(x, y, z, None))
+
+    point_filter = PointFilter(aabb=[[2, 0, 10], [4, 10, 90]])
+    assert_array_equal(
+        point_filter.mask(x, y, z, classification),
+        (x >= 2) & (x <= 4) & (z >= 10) & (z <= 90),
+    )
+
+    # a square with a square hole, given as a closed ring and an open ring
+    point_filter = PointFilter(
+        polygon=[
+            [(1, 1), (9, 1), (9, 9), (1, 9), (1, 1)],
+            [(3, 3), (7, 3), (7, 7), (3, 7)],
+        ]
+    )
+    inside_square = (x > 1) & (x < 9) & (y > 1) & (y < 9)
+    inside_hole = (x > 3) & (x < 7) & (y > 3) & (y < 7)
+    assert_array_equal(
+        point_filter.mask(x, y, z, classification), inside_square & ~inside_hole
+    )
+
+
+def test_read_geojson_polygon() -> None:
+    rings = read_geojson_polygon(
+        Path(__file__).parent / "fixtures" / "star_clockwise.geojson"
+    )
+    assert len(rings) == 1
+    assert rings[0].shape[1] == 2
+
+    # the center of the star is inside, the corners of its bounding box are outside
+    center = np.mean(rings[0], axis=0)
+    corners = np.array([np.min(rings[0], axis=0), np.max(rings[0], axis=0)])
+    x = np.array([center[0], corners[0][0], corners[1][0]])
+    y = np.array([center[1], corners[0][1], corners[1][1]])
+    assert_array_equal(
+        PointFilter(polygon=rings).mask(x, y, np.zeros(3), None), [True, False, False]
+    )
 
 
 def test_ply_get_metadata(ply_filepath: Path) -> None:
@@ -61,3 +199,701 @@ def test_create_plydata_with_renamed_property(ply_filepath: Path) -> None:
         modified_ply_data["vertex"].data.dtype.names,
     ):
         assert dtype1 == dtype2 or (dtype1 == "label" and dtype2 == "classification")
+
+
+def test_las_run() -> None:
+    path = Path(__file__).parent / "fixtures" / "ripple.las"
+    metadata = las_reader.get_metadata(path)
+    offset = -metadata["avg_min"]
+    scale = np.array([0.1, 0.1, 0.1])
+    rotation = np.array([[0, 1, 0], [-1, 0, 0], [0, 0, 1]], dtype=np.float64)
+
+    chunks = [
+        chunk
+        for _, portion in metadata["portions"]
+        for chunk in las_reader.run(
+            str(path), (offset, scale, rotation, None), portion, None, None, True
+        )
+    ]
+    coords = np.concatenate([coords for coords, _, _, _ in chunks])
+    classification = np.concatenate([cls for _, _, cls, _ in chunks])
+
+    las = laspy.read(path)
+    expected_coords = np.dot(
+        (np.vstack((las.x, las.y, las.z)).transpose() + offset) * scale, rotation
+    ).astype(np.float32)
+    assert coords.dtype == np.float32
+    assert_array_equal(coords, expected_coords)
+    assert_array_equal(classification.ravel(), np.array(las.classification))
+
+    # one point out of 7
+    _, portion = metadata["portions"][0]
+    sampled_chunks = list(
+        las_reader.run(
+            str(path), (offset, scale, rotation, None), portion, None, None, True, 7
+        )
+    )
+    assert_array_equal(
+        np.concatenate([coords for coords, _, _, _ in sampled_chunks]),
+        expected_coords[portion[0] : portion[1]][::7],
+    )
+
+
+@mark.skipif(find_spec("lazrs") is None, reason="lazrs is not installed")
+def test_laz_portions_aligned_on_chunks(tmp_dir: Path) -> None:
+    header = laspy.LasHeader(point_format=3, version="1.2")
+    header.scales = np.array([0.01, 0.01, 0.01])
+    las = laspy.LasData(header)
+    las.x = np.arange(120_000) * 0.01
+    las.y = np.zeros(120_000)
+    las.z = np.zeros(120_000)
+    laz_path = tmp_dir / "points.laz"
+    # lazrs writes chunks of 50_000 points
+    las.write(laz_path, laz_backend=laspy.LazBackend.Lazrs)
+
+    with patch.object(las_reader, "PORTION_POINT_COUNT", 20_000):
+        metadata = las_reader.get_metadata(laz_path)
+    assert [portion for _, portion in metadata["portions"]] == [
+        (0, 50_000),
+        (50_000, 100_000),
+        (100_000, 120_000),
+    ]
+
+    read_x = np.concatenate(
+        [
+            coords[:, 0]
+            for _, portion in metadata["portions"]
+            for coords, _, _, _ in las_reader.run(
+                str(laz_path),
+                (np.zeros(3), np.ones(3), None, None),
+                portion,
+                None,
+                None,
+                False,
+            )
+        ]
+    )
+    assert_array_equal(read_x, np.array(las.x, dtype=np.float32))
+
+
+def _write_copc(
+    path: Path, nodes: list[tuple[tuple[int, int, int, int], npt.NDArray[np.float64]]]
+) -> npt.NDArray[np.float64]:
+    """
+    Writes a minimal COPC file whose chunks are the given nodes (a key and the coordinates
+    of its points), in this order. Returns the coordinates in the order of the file.
+    """
+    import lazrs
+
+    xyz = np.concatenate([node_xyz for _, node_xyz in nodes])
+    laz_vlr = lazrs.LazVlr.new_for_compression(6, 0, True)
+    header = laspy.LasHeader(point_format=6, version="1.4")
+    header.scales = np.array([0.01, 0.01, 0.01])
+    header.offsets = np.zeros(3)
+    # the info vlr is filled once the hierarchy is written
+    header.vlrs.append(laspy.VLR("copc", 1, "", bytes(160)))
+    header.vlrs.append(laspy.VLR("laszip encoded", 22204, "", laz_vlr.record_data()))
+    las = laspy.LasData(header)
+    las.x, las.y, las.z = xyz[:, 0], xyz[:, 1], xyz[:, 2]
+    las_file = io.BytesIO()
+    las.write(las_file)
+    (offset_to_point_data,) = struct.unpack_from("<I", las_file.getvalue(), 96)
+
+    # compress each node in its own chunk
+    laz_file = io.BytesIO(las_file.getvalue()[:offset_to_point_data])
+    laz_file.seek(0, io.SEEK_END)
+    compressor = lazrs.LasZipCompressor(laz_file, laz_vlr)
+    compressor.reserve_offset_to_chunk_table()
+    records = las.points.array
+    hierarchy = b""
+    start = 0
+    for key, node_xyz in nodes:
+        chunk_offset = laz_file.tell()
+        compressor.compress_many(records[start : start + len(node_xyz)].tobytes())
+        start += len(node_xyz)
+        if start < len(records):
+            compressor.finish_current_chunk()
+        else:
+            # writes the last chunk and the chunk table
+            compressor.done()
+        hierarchy += struct.pack(
+            "<4iQii", *key, chunk_offset, laz_file.tell() - chunk_offset, len(node_xyz)
+        )
+    laz_file.seek(0, io.SEEK_END)
+
+    evlr_offset = laz_file.tell()
+    laz_file.write(struct.pack("<H16sHQ32s", 0, b"copc", 1000, len(hierarchy), b""))
+    hierarchy_offset = laz_file.tell()
+    laz_file.write(hierarchy)
+
+    data = bytearray(laz_file.getvalue())
+    # the point format is flagged as compressed
+    data[104] |= 0x80
+    # the info vlr (center, halfsize, spacing, hierarchy root offset and size, gps min and max)
+    mins, maxs = np.min(xyz, axis=0), np.max(xyz, axis=0)
+    struct.pack_into(
+        "<5d2Q2d",
+        data,
+        375 + 54,
+        *((mins + maxs) / 2),
+        np.max(maxs - mins) / 2,
+        1.0,
+        hierarchy_offset,
+        len(hierarchy),
+        0.0,
+        0.0,
+    )
+    # the start of the first evlr and the evlr count
+    struct.pack_into("<QI", data, 235, evlr_offset, 1)
+    path.write_bytes(data)
+    return np.vstack((las.x, las.y, las.z)).transpose()
+
+
+@mark.skipif(find_spec("lazrs") is None, reason="lazrs is not installed")
+def test_copc_portions_follow_the_hierarchy(tmp_dir: Path) -> None:
+    rng = np.random.default_rng(0)
+    copc_path = tmp_dir / "points.copc.laz"
+    # the nodes are not written in depth first order
+    xyz = _write_copc(
+        copc_path,
+        [
+            ((2, 3, 0, 0), rng.random((3000, 3)) * 2.5 + [7.5, 0, 0]),
+            ((1, 1, 0, 0), rng.random((2000, 3)) * 5 + [5, 0, 0]),
+            ((0, 0, 0, 0), rng.random((1000, 3)) * 10),
+            ((1, 0, 0, 0), rng.random((4000, 3)) * 5),
+        ],
+    )
+    with laspy.CopcReader.open(copc_path) as f:
+        assert len(f.query()) == 10_000
+
+    metadata = las_reader.get_metadata(copc_path)
+    assert metadata["point_count"] == 10_000
+    # the root, then its first child, then its second child and its child
+    # with the offset and the index of their first chunk
+    with laspy.open(copc_path) as f:
+        header = f.header
+    chunk_table = las_reader._read_chunk_table(str(copc_path), header)
+    assert chunk_table is not None
+    chunk_offsets = np.cumsum(
+        [header.offset_to_point_data + 8] + [size for _, size in chunk_table]
+    ).tolist()
+    assert [portion for _, portion in metadata["portions"]] == [
+        (5000, 10_000, chunk_offsets[2], 2),
+        (3000, 5000, chunk_offsets[1], 1),
+        (0, 3000, chunk_offsets[0], 0),
+    ]
+
+    # the contiguous nodes are gathered up to PORTION_POINT_COUNT points
+    with patch.object(las_reader, "PORTION_POINT_COUNT", 500):
+        metadata = las_reader.get_metadata(copc_path)
+    portions = [portion for _, portion in metadata["portions"]]
+    assert [portion[:2] for portion in portions] == [
+        (5000, 6000),
+        (6000, 10_000),
+        (3000, 5000),
+        (0, 3000),
+    ]
+
+    # each portion is decompressed from its chunk
+    read_xyz = np.concatenate(
+        [
+            coords
+            for portion in portions
+            for coords, _, _, _ in las_reader.run(
+                str(copc_path),
+                (np.zeros(3), np.ones(3), None, None),
+                portion,
+                None,
+                None,
+                False,
+            )
+        ]
+    )
+    expected_xyz = np.concatenate([xyz[start:end] for start, end, _, _ in portions])
+    assert_array_equal(read_xyz, expected_xyz.astype(np.float32))
+
+    # a fraction of the file is read from its first points
+    metadata = las_reader.get_metadata(copc_path, fraction=40)
+    assert [portion[:2] for _, portion in metadata["portions"]] == [
+        (3000, 4000),
+        (0, 3000),
+    ]
+
+    # the portions of the other files with variable-sized chunks follow the chunks of the file
+    with patch.object(las_reader, "PORTION_POINT_COUNT", 2500):
+        portions = las_reader._get_chunk_portions(str(copc_path), header, 10_000)
+    assert portions == [
+        (0, 3000, chunk_offsets[0], 0),
+        (3000, 6000, chunk_offsets[1], 1),
+        (6000, 10_000, chunk_offsets[3], 3),
+    ]
+
+
+def test_xyz_read_by_blocks(tmp_dir: Path) -> None:
+    points = np.column_stack(
+        (
+            np.arange(10) * 1.25 - 3,
+            np.arange(10) * -0.5,
+            np.full(10, 2e2),
+            np.arange(10),
+            np.arange(10) * 10,
+            np.arange(10) * 20,
+            np.full(10, 255),
+            np.arange(10) % 3,
+            np.arange(10) + 0.5,
+        )
+    )
+    lines = [";".join(str(value) for value in point) for point in points]
+    # a blank line in the middle, and a last line without end of line
+    content = "x;y;z;i;r;g;b;class;extra\n" + "\n".join(lines[:5]) + "\n\n"
+    content += "\n".join(lines[5:])
+    xyz_path = tmp_dir / "points.csv"
+    xyz_path.write_bytes(content.encode())
+
+    with patch.object(xyz_reader, "BLOCK_SIZE", 64), patch.object(
+        xyz_reader, "PORTION_POINT_COUNT", 4
+    ):
+        metadata = xyz_reader.get_metadata(xyz_path)
+        portions = [portion for _, portion in metadata["portions"]]
+        assert [portion[:2] for portion in portions] == [(0, 4), (4, 8), (8, 10)]
+        for portion in portions:
+            # the portions start on a point
+            assert content[portion[2] :].startswith(lines[portion[0]])
+        assert_array_equal(
+            metadata["aabb"], [points[:, :3].min(axis=0), points[:, :3].max(axis=0)]
+        )
+        assert metadata["point_count"] == 10
+
+        chunks = [
+            chunk
+            for portion in portions
+            for chunk in xyz_reader.run(
+                str(xyz_path),
+                (np.zeros(3), np.ones(3), None, None),
+                portion,
+                None,
+                None,
+                True,
+            )
+        ]
+        # one point out of 3 of each portion, whatever the blocks
+        sampled_chunks = [
+            chunk
+            for portion in portions
+            for chunk in xyz_reader.run(
+                str(xyz_path),
+                (np.zeros(3), np.ones(3), None, None),
+                portion,
+                None,
+                None,
+                True,
+                3,
+            )
+        ]
+
+    assert_array_equal(
+        np.concatenate([coords for coords, _, _, _ in chunks]),
+        points[:, :3].astype(np.float32),
+    )
+    assert_array_equal(
+        np.concatenate([coords for coords, _, _, _ in sampled_chunks]),
+        points[[0, 3, 4, 7, 8], :3].astype(np.float32),
+    )
+    assert_array_equal(np.concatenate([rgb for _, rgb, _, _ in chunks]), points[:, 4:7])
+    assert_array_equal(
+        np.concatenate([cls for _, _, cls, _ in chunks]).ravel(), points[:, 7]
+    )
+    assert_array_equal(
+        np.concatenate([intensity for _, _, _, intensity in chunks]).ravel(),
+        points[:, 3],
+    )
+
+
+def test_xyz_invalid_point(tmp_dir: Path) -> None:
+    xyz_path = tmp_dir / "points.xyz"
+    xyz_path.write_text("1 2 3\n4 5 6\n7 8 nan\n")
+    with raises(ValueError, match="Could not read the point '7 8 nan' at offset 12"):
+        xyz_reader.get_metadata(xyz_path)
+
+
+def test_xyz_metadata_scanned_by_ranges(tmp_dir: Path) -> None:
+    points = np.column_stack(
+        (np.arange(100) * 0.5, np.arange(100) % 7, -np.arange(100))
+    )
+    lines = [" ".join(str(value) for value in point) for point in points]
+    content = "\n".join(lines) + "\n"
+    xyz_path = tmp_dir / "points.xyz"
+    xyz_path.write_text(content)
+
+    with patch.object(xyz_reader, "SCAN_RANGE_SIZE", 300), patch.object(
+        xyz_reader, "PORTION_POINT_COUNT", 8
+    ):
+        metadata = xyz_reader.get_metadata(xyz_path)
+    portions = [portion for _, portion in metadata["portions"]]
+
+    # the portions of each range are contiguous and start on a point
+    assert len(portions) > 100 // 8 + 1
+    assert portions[0][0] == 0
+    assert portions[-1][1] == 100
+    for portion, next_portion in zip(portions, portions[1:]):
+        assert portion[1] == next_portion[0]
+    for portion in portions:
+        assert 0 < portion[1] - portion[0] <= 8
+        assert content[portion[2] :].startswith(lines[portion[0]] + "\n")
+
+    assert metadata["point_count"] == 100
+    assert_array_equal(metadata["aabb"], [points.min(axis=0), points.max(axis=0)])
+
+    # the files can be scanned concurrently
+    with patch.object(xyz_reader, "SCAN_RANGE_SIZE", 300), patch.object(
+        xyz_reader, "PORTION_POINT_COUNT", 8
+    ), concurrent.futures.ThreadPoolExecutor(4) as executor:
+        all_metadata = list(executor.map(xyz_reader.get_metadata, [xyz_path] * 4))
+    for other_metadata in all_metadata:
+        assert other_metadata["portions"] == metadata["portions"]
+
+
+def test_xyz_read_stream() -> None:
+    points = np.column_stack(
+        (
+            np.arange(1_000) * 0.5,
+            -np.arange(1_000),
+            np.arange(1_000) % 7,
+            np.arange(1_000) % 256,
+            np.full(1_000, 10),
+            np.full(1_000, 20),
+            np.full(1_000, 30),
+        )
+    )
+    content = "x y z i r g b\n" + "\n".join(
+        " ".join(str(value) for value in point) for point in points
+    )
+
+    # a pipe can't seek
+    read_fd, write_fd = os.pipe()
+
+    def write() -> None:
+        with os.fdopen(write_fd, "wb") as f:
+            f.write(content.encode())
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    with os.fdopen(read_fd, "rb") as f, patch.object(xyz_reader, "BLOCK_SIZE", 1_024):
+        chunks = list(xyz_reader.read_stream(f))
+    writer.join()
+
+    assert len(chunks) > 1
+    stream_points = np.concatenate(chunks)
+    assert stream_points.dtype.names == (
+        "x",
+        "y",
+        "z",
+        "red",
+        "green",
+        "blue",
+        "intensity",
+    )
+    for i, field in enumerate(("x", "y", "z", "intensity", "red", "green", "blue")):
+        assert_array_equal(stream_points[field], points[:, i])
+
+
+def test_xyz_read_stream_yields_the_lines_already_written() -> None:
+    read_fd, write_fd = os.pipe()
+    first_chunk_read = threading.Event()
+    waited = []
+
+    def write() -> None:
+        with os.fdopen(write_fd, "wb") as f:
+            f.write(b"x y z\n" + b"".join(b"%d 0 0\n" % i for i in range(100)))
+            f.flush()
+            # the rest of the stream is only written once its beginning has been read
+            waited.append(first_chunk_read.wait(timeout=10))
+            f.write(b"".join(b"%d 1 0\n" % i for i in range(50)))
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    with os.fdopen(read_fd, "rb") as f:
+        chunks = xyz_reader.read_stream(f)
+        first_chunk = next(chunks)
+        first_chunk_read.set()
+        other_chunks = list(chunks)
+    writer.join()
+
+    assert waited == [True]
+    assert_array_equal(first_chunk["x"], np.arange(100))
+    assert sum(len(chunk) for chunk in other_chunks) == 50
+
+
+@mark.parametrize("text", [False, True])
+@mark.parametrize("byte_order", ["<", ">"])
+def test_ply_read_by_portions(tmp_dir: Path, text: bool, byte_order: str) -> None:
+    point_count = 2_500
+    vertices = np.zeros(
+        point_count,
+        dtype=[("x", "f8"), ("y", "f8"), ("z", "f4"), ("classification", "u1")],
+    )
+    vertices["x"] = np.arange(point_count) * 0.5
+    vertices["y"] = -np.arange(point_count)
+    vertices["z"] = np.arange(point_count) % 17
+    vertices["classification"] = np.arange(point_count) % 5
+    # an element before the vertices, and an element with a list property after them
+    camera = np.array([(1.0, 2.0)], dtype=[("focal", "f4"), ("width", "f4")])
+    faces = np.array(
+        [([0, 1, 2],), ([1, 2, 3],)], dtype=[("vertex_indices", "i4", (3,))]
+    )
+    ply_path = tmp_dir / "points.ply"
+    plyfile.PlyData(
+        [
+            plyfile.PlyElement.describe(camera, "camera"),
+            plyfile.PlyElement.describe(vertices, "vertex"),
+            plyfile.PlyElement.describe(faces, "face"),
+        ],
+        text=text,
+        byte_order=byte_order,
+    ).write(ply_path)
+
+    with patch.object(ply_reader, "PORTION_POINT_COUNT", 1_000):
+        metadata = ply_reader.get_metadata(ply_path)
+    portions = [portion for _, portion in metadata["portions"]]
+    if text:
+        # ascii files are parsed by plyfile, at once
+        assert portions == [(0, point_count)]
+    else:
+        assert portions == [(0, 1_000), (1_000, 2_000), (2_000, point_count)]
+    assert_array_equal(
+        metadata["aabb"],
+        np.array([[0, 1 - point_count, 0], [(point_count - 1) * 0.5, 0, 16]]),
+    )
+
+    chunks = [
+        chunk
+        for portion in portions
+        for chunk in ply_reader.run(
+            str(ply_path),
+            (np.zeros(3), np.ones(3), None, None),
+            portion,
+            None,
+            None,
+            False,
+        )
+    ]
+    coords = np.concatenate([coords for coords, _, _, _ in chunks])
+    assert_array_equal(coords[:, 0], vertices["x"].astype(np.float32))
+    assert_array_equal(coords[:, 1], vertices["y"].astype(np.float32))
+    assert_array_equal(coords[:, 2], vertices["z"])
+    assert_array_equal(
+        np.concatenate([cls for _, _, cls, _ in chunks]).ravel(),
+        vertices["classification"],
+    )
+
+
+@mark.parametrize("suffix", [".npy", ".bin"])
+def test_npy_read_by_portions(tmp_dir: Path, suffix: str) -> None:
+    point_count = 2_500
+    points = np.zeros(
+        point_count,
+        dtype=[
+            ("x", "<f8"),
+            ("y", "<f8"),
+            ("z", "<f4"),
+            ("red", "<u2"),
+            ("green", "<u2"),
+            ("blue", "<u2"),
+            ("classification", "u1"),
+            ("other", "<i4"),
+        ],
+    )
+    points["x"] = np.arange(point_count) * 0.5
+    points["y"] = -np.arange(point_count)
+    points["z"] = np.arange(point_count) % 17
+    points["red"] = np.arange(point_count) * 20
+    points["classification"] = np.arange(point_count) % 5
+
+    path = tmp_dir / f"points{suffix}"
+    if suffix == ".npy":
+        np.save(path, points)
+    else:
+        # a header before the points
+        path.write_bytes(b"header" + points.tobytes())
+        schema = {"dtype": points.dtype.descr, "offset": 6, "crs": "EPSG:2154"}
+        Path(f"{path}.json").write_text(json.dumps(schema))
+
+    with patch.object(npy_reader, "PORTION_POINT_COUNT", 1_000):
+        metadata = npy_reader.get_metadata(path)
+    portions = [portion for _, portion in metadata["portions"]]
+    assert portions == [(0, 1_000), (1_000, 2_000), (2_000, point_count)]
+    assert metadata["point_count"] == point_count
+    assert_array_equal(
+        metadata["aabb"],
+        np.array([[0, 1 - point_count, 0], [(point_count - 1) * 0.5, 0, 16]]),
+    )
+    if suffix == ".bin":
+        assert metadata["crs_in"] is not None
+        assert metadata["crs_in"].to_epsg() == 2154
+    else:
+        assert metadata["crs_in"] is None
+
+    chunks = [
+        chunk
+        for portion in portions
+        for chunk in npy_reader.run(
+            str(path),
+            (np.zeros(3), np.ones(3), None, None),
+            portion,
+            None,
+            None,
+            False,
+        )
+    ]
+    coords = np.concatenate([coords for coords, _, _, _ in chunks])
+    assert_array_equal(coords[:, 0], points["x"].astype(np.float32))
+    assert_array_equal(coords[:, 1], points["y"].astype(np.float32))
+    assert_array_equal(coords[:, 2], points["z"])
+    colors = np.concatenate([rgb for _, rgb, _, _ in chunks])
+    assert_array_equal(colors[:, 0], (points["red"] / 256).astype(np.uint8))
+    assert_array_equal(
+        np.concatenate([cls for _, _, cls, _ in chunks]).ravel(),
+        points["classification"],
+    )
+
+
+def test_npy_invalid_inputs(tmp_dir: Path) -> None:
+    path = tmp_dir / "points.npy"
+    np.save(path, np.zeros((10, 3)))
+    with raises(KeyError, match="structured array with the fields x, y and z"):
+        npy_reader.get_metadata(path)
+
+    with raises(FileNotFoundError, match="has no json sidecar"):
+        npy_reader.get_metadata(tmp_dir / "points.bin")
+
+
+def test_array_read_from_shared_memory() -> None:
+    points = np.zeros(2_500, dtype=[("x", "<f8"), ("y", "<f8"), ("z", "<f8")])
+    points["x"] = np.arange(len(points))
+    points["z"] = np.arange(len(points)) % 7
+
+    shared_array = array_reader.SharedPointArray(points)
+    try:
+        metadata = array_reader.get_metadata(Path(shared_array.name))
+        assert metadata["point_count"] == len(points)
+        assert_array_equal(metadata["aabb"], np.array([[0, 0, 0], [2_499, 0, 6]]))
+
+        offset_scale = (np.zeros(3), np.ones(3), None, None)
+        chunks = list(
+            array_reader.run(
+                shared_array.name, offset_scale, (1_000, 2_000), None, None, False
+            )
+        )
+    finally:
+        shared_array.release()
+
+    coords = np.concatenate([coords for coords, _, _, _ in chunks])
+    assert_array_equal(coords[:, 0], np.arange(1_000, 2_000))
+    assert_array_equal(coords[:, 2], np.arange(1_000, 2_000) % 7)
+
+
+def test_array_stream_pulled_by_portions() -> None:
+    xyz = np.random.default_rng(0).random((2_500, 3))
+    pulled_chunks = []
+
+    def chunks() -> Generator[npt.NDArray[np.float64], None, None]:
+        for start in range(0, len(xyz), 500):
+            pulled_chunks.append(start)
+            yield xyz[start : start + 500]
+
+    stream = array_reader.PointStream(chunks(), [[0, 0, 0], [1, 1, 1]], len(xyz))
+    shared_array = array_reader.SharedPointArray(stream)
+    try:
+        with patch.object(npy_reader, "PORTION_POINT_COUNT", 1_000):
+            metadata = shared_array.get_metadata()
+        # the portions are read from the end of the list
+        assert [portion for _, portion in metadata["portions"]] == [
+            (2_000, 2_500),
+            (1_000, 2_000),
+            (0, 1_000),
+        ]
+        assert_array_equal(metadata["aabb"], np.array([[0, 0, 0], [1, 1, 1]]))
+
+        shared_array.fill(1_000)
+        assert pulled_chunks == [0, 500]
+        shared_array.fill()
+        assert pulled_chunks == [0, 500, 1_000, 1_500, 2_000]
+        assert_array_equal(shared_array.points["y"], xyz[:, 1])
+    finally:
+        shared_array.release()
+
+
+@mark.parametrize(
+    "point_count,aabb,error",
+    [
+        (3_000, [[0, 0, 0], [1, 1, 1]], "ended after 2500 points"),
+        (2_000, [[0, 0, 0], [1, 1, 1]], "more points than the 2000 declared"),
+        (2_500, [[0, 0, 0], [1, 0.5, 1]], "outside of its declared aabb"),
+    ],
+)
+def test_array_invalid_stream(
+    point_count: int, aabb: list[list[float]], error: str
+) -> None:
+    xyz = np.random.default_rng(0).random((2_500, 3))
+    stream = array_reader.PointStream(
+        (xyz[start : start + 500] for start in range(0, len(xyz), 500)),
+        aabb,
+        point_count,
+    )
+    shared_array = array_reader.SharedPointArray(stream)
+    try:
+        with raises(ValueError, match=error):
+            shared_array.fill()
+    finally:
+        shared_array.release()
+
+
+def test_array_stream_of_unknown_point_count() -> None:
+    xyz = np.random.default_rng(0).random((2_500, 3))
+    stream = array_reader.PointStream(
+        (xyz[start : start + 300] for start in range(0, len(xyz), 300)),
+        [[0, 0, 0], [1, 1, 1]],
+    )
+    with raises(ValueError, match="point count of the stream must be declared"):
+        array_reader.SharedPointArray(stream)
+
+    shared_stream = array_reader.SharedPointStream(stream)
+    assert shared_stream.get_metadata()["portions"] == []
+    portions = []
+    with patch.object(npy_reader, "PORTION_POINT_COUNT", 1_000):
+        while (shared_array := shared_stream.pull()) is not None:
+            portions.append(shared_array.points.copy())
+            shared_array.release()
+
+    assert [len(points) for points in portions] == [1_000, 1_000, 500]
+    assert_array_equal(np.concatenate(portions)["z"], xyz[:, 2])
+    assert shared_stream.point_count == len(xyz)
+    assert shared_stream.rejected_point_count == 0
+
+
+def test_array_stream_rejects_points_outside_of_its_aabb() -> None:
+    xyz = np.random.default_rng(0).random((2_500, 3))
+    inside = xyz[:, 1] <= 0.5
+    shared_stream = array_reader.SharedPointStream(
+        array_reader.PointStream(
+            (xyz[start : start + 300] for start in range(0, len(xyz), 300)),
+            [[0.0, 0.0, 0.0], [1.0, 0.5, 1.0]],
+        )
+    )
+    portions = []
+    with patch.object(npy_reader, "PORTION_POINT_COUNT", 1_000):
+        while (shared_array := shared_stream.pull()) is not None:
+            portions.append(shared_array.points.copy())
+            shared_array.release()
+
+    assert_array_equal(np.concatenate(portions)["y"], xyz[inside, 1])
+    assert shared_stream.point_count == np.count_nonzero(inside)
+    assert shared_stream.rejected_point_count == np.count_nonzero(~inside)
+
+    shared_stream = array_reader.SharedPointStream(
+        array_reader.PointStream([xyz], [[2, 2, 2], [3, 3, 3]])
+    )
+    with raises(
+        ValueError, match="All the 2500 points of the point stream are outside"
+    ):
+        shared_stream.pull()
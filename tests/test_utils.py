@@ -1,10 +1,19 @@
+import itertools
 import shutil
+import threading
+from collections.abc import Generator
 from pathlib import Path
 
 import numpy as np
 from pytest import raises
 
-from py3dtiles.utils import make_aabb_valid, mkdir_or_raise
+from py3dtiles.utils import (
+    make_aabb_valid,
+    mkdir_or_raise,
+    morton_codes,
+    prefetch,
+    split_aabb,
+)
 
 
 def test_make_aabb_valid() -> None:
@@ -29,6 +38,27 @@ def test_make_aabb_valid() -> None:
     np.testing.assert_array_equal(aabb, np.array([[9, 12, 14], [9.00001, 13, 15]]))
 
 
+def test_morton_codes() -> None:
+    aabb = np.array([[0.0, 0.0, 0.0], [8.0, 8.0, 8.0]])
+    # the centers of the children of aabb, then of the children of its first child
+    positions = np.array(
+        [np.mean(split_aabb(aabb, i), axis=0) for i in range(8)]
+        + [np.mean(split_aabb(split_aabb(aabb, 0), i), axis=0) for i in range(8)]
+    )
+
+    codes = morton_codes(positions, aabb)
+
+    # the codes follow the order of the children of the octree
+    assert list(np.argsort(codes[:8])) == list(range(8))
+    # the points of a child are consecutive on the curve
+    assert np.all(codes[8:] < codes[1])
+    # the positions outside of aabb are clamped
+    assert (
+        morton_codes(np.array([[-1.0, -1.0, -1.0], [9.0, 9.0, 9.0]]), aabb)[0]
+        == morton_codes(np.array([[0.0, 0.0, 0.0]]), aabb)[0]
+    )
+
+
 def test_mkdir_or_raise(tmp_dir: Path) -> None:
     mkdir_or_raise(tmp_dir)
     (tmp_dir / "foo").touch()
@@ -57,3 +87,35 @@ def test_mkdir_or_raise(tmp_dir: Path) -> None:
     ):
         mkdir_or_raise(tmp_dir)
     tmp_dir.unlink()
+
+
+def test_prefetch() -> None:
+    assert list(prefetch(range(10))) == list(range(10))
+    assert list(prefetch(iter([]), size=3)) == []
+
+    def failing_items() -> Generator[int, None, None]:
+        yield 1
+        raise ValueError("unreadable")
+
+    items = prefetch(failing_items())
+    assert next(items) == 1
+    with raises(ValueError, match="unreadable"):
+        next(items)
+
+    # the production stops when the consumer stops
+    produced = []
+    closed = threading.Event()
+
+    def endless_items() -> Generator[int, None, None]:
+        try:
+            for i in itertools.count():
+                produced.append(i)
+                yield i
+        finally:
+            closed.set()
+
+    items = prefetch(endless_items(), size=2)
+    assert next(items) == 0
+    items.close()
+    assert closed.is_set()
+    assert len(produced) <= 4
@@ -1,9 +1,15 @@
+import pickle
 from pathlib import Path
 
 import numpy as np
 from numpy.testing import assert_array_equal
 
-from py3dtiles.tilers.point.node.node import split_tileset
+from py3dtiles.tilers.point.node.node import (
+    DummyNode,
+    Node,
+    get_unique_point_indices,
+    split_tileset,
+)
 from py3dtiles.tileset.bounding_volume_box import BoundingVolumeBox
 from py3dtiles.tileset.tile import Tile
 from py3dtiles.tileset.tileset import TileSet
@@ -32,3 +38,35 @@ def test_split_tileset(tmp_dir: Path) -> None:
     assert_array_equal(ts.root_tile.bounding_volume._box, tile.bounding_volume._box)
     # sure about this one?
     assert ts.root_tile.get_refine_mode() == "ADD"
+
+
+def test_get_unique_point_indices() -> None:
+    xyz = np.array(
+        [
+            [0.0, 0.0, 0.0],
+            [5.0, 5.0, 5.0],
+            [0.0, 0.0, 0.0],
+            [0.0004, 0.0, 0.0002],
+            [5.0, 5.0, 5.5],
+        ],
+        dtype=np.float32,
+    )
+    assert_array_equal(get_unique_point_indices(xyz, 0.001), [0, 1, 4])
+    assert_array_equal(get_unique_point_indices(xyz, 1.0), [0, 1])
+
+
+def test_get_points_removes_the_duplicates_of_leaves() -> None:
+    node = Node(b"0", np.array([[0, 0, 0], [10, 10, 10]], dtype=np.float32), 1.0)
+    xyz = np.array([[1, 1, 1], [2, 2, 2], [1, 1, 1]], dtype=np.float32)
+    rgb = np.array([[1, 1, 1], [2, 2, 2], [3, 3, 3]], dtype=np.uint8)
+    classification = np.array([[1], [2], [3]], dtype=np.uint8)
+    intensity = np.zeros((3, 1), dtype=np.uint8)
+    node.insert(1.0, xyz, rgb, classification, intensity)
+    dummy_node = DummyNode(pickle.loads(node.save_to_bytes()))
+
+    assert len(Node.get_points(dummy_node, True, True, False)) == 3 * (12 + 3 + 1)
+    points = Node.get_points(dummy_node, True, True, False, 0.01)
+    # the first point of each position is kept
+    assert_array_equal(points[: 2 * 12].view(np.float32), xyz[:2].ravel())
+    assert_array_equal(points[2 * 12 : 2 * 15], rgb[:2].ravel())
+    assert_array_equal(points[2 * 15 :], [1, 2])
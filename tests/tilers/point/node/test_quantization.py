@@ -0,0 +1,84 @@
+import pickle
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from py3dtiles.tilers.point.node import DummyNode, Node
+from py3dtiles.tilers.point.node.quantization import (
+    dequantize_xyz,
+    get_quantization,
+    quantize_xyz,
+)
+from py3dtiles.tilers.point.tiling_profile import TilingProfile
+
+AABB = np.array([[0, 0, 0], [10, 20, 5]], dtype=np.float32)
+
+
+def test_quantization_round_trip() -> None:
+    quantization = get_quantization(AABB, 0.1)
+    assert quantization is not None
+
+    xyz = (
+        np.random.default_rng(0).uniform(AABB[0], AABB[1], (1000, 3)).astype(np.float32)
+    )
+    quantized = quantize_xyz(xyz, quantization)
+    assert quantized.dtype == np.uint16
+
+    error = np.abs(dequantize_xyz(quantized, quantization) - xyz)
+    assert np.all(error <= quantization[1] * 0.5 + 1e-6)
+
+
+def test_quantization_fallbacks() -> None:
+    # the quantization step is too large compared to the spacing
+    assert get_quantization(AABB, 0.0001) is None
+
+    quantization = get_quantization(AABB, 0.1)
+    assert quantization is not None
+    # a point outside of the aabb can't be quantized, nothing is changed
+    xyz = np.array([[1, 1, 1], [1, 1, 6]], dtype=np.float32)
+    assert quantize_xyz(xyz, quantization) is xyz
+    assert_array_equal(dequantize_xyz(xyz, quantization), xyz)
+
+
+def test_node_quantized_storage() -> None:
+    profile = TilingProfile(quantized_storage=True)
+    xyz = (
+        np.random.default_rng(0).uniform(AABB[0], AABB[1], (100, 3)).astype(np.float32)
+    )
+    rgb = np.zeros((100, 3), dtype=np.uint8)
+    classification = np.zeros((100, 1), dtype=np.uint8)
+    intensity = np.zeros((100, 1), dtype=np.uint8)
+
+    node = Node(b"", AABB, 0.1, profile)
+    assert node.quantization is not None
+    node.insert(1.0, xyz, rgb, classification, intensity)
+    data = node.save_to_bytes()
+
+    # the points of a leaf are the full resolution points, they are not quantized
+    loaded_node = Node(b"", AABB, 0.1, profile)
+    loaded_node.load_from_bytes(data)
+    dummy_node = DummyNode(pickle.loads(data))
+    for points in (loaded_node.points, dummy_node.points):
+        assert points[0][0].dtype == np.float32
+        assert_array_equal(points[0][0], xyz)
+
+    # the grid of a node without children makes a leaf tile, it is not quantized
+    node.children = []
+    node.grid.insert(
+        node.aabb[0], node.inv_aabb_size, xyz, rgb, classification, intensity
+    )
+    point_count = node.grid.get_point_count()
+    node.save_to_bytes()
+    assert all(
+        cell.dtype == np.float32 for cell in node.grid.__getstate__()["cells_xyz"]
+    )
+
+    # the grid of an internal node is quantized
+    node.children = [b"0"]
+    node.save_to_bytes()
+    assert any(
+        cell.dtype == np.uint16 for cell in node.grid.__getstate__()["cells_xyz"]
+    )
+    grid = pickle.loads(pickle.dumps(node.grid))
+    assert grid.get_point_count() == point_count
+    assert all(cell.dtype == np.float32 for cell in grid.cells_xyz)
@@ -0,0 +1,92 @@
+from pathlib import Path
+
+import numpy as np
+
+from py3dtiles.tilers.point.density import DensityHistogram, subdivision_cost
+from py3dtiles.utils import READER_MAP, SubdivisionType
+
+DATA_DIRECTORY = Path(__file__).parent.parent.parent / "fixtures"
+
+
+def test_density_histogram_flat_data() -> None:
+    aabb = np.array([[0, 0, 0], [100, 100, 100]], dtype=np.float64)
+    histogram = DensityHistogram(aabb)
+    # a thin horizontal layer of points at the bottom of a cubic aabb
+    rng = np.random.default_rng(0)
+    xyz = rng.uniform([0, 0, 0], [100, 100, 2], (10_000, 3)).astype(np.float32)
+    histogram.add_points(xyz)
+
+    assert histogram.sampled_point_count == 10_000
+    assert histogram.counts.sum() == 10_000
+    # the aabb is cubic, but the points are flat
+    assert histogram.subdivision_type(aabb) == SubdivisionType.QUADTREE
+    # the horizontal extent is covered: the default spacing is kept
+    assert histogram.spacing_factor() == 1.0
+    assert histogram.grid_initial_cell_count(3) == 3
+
+
+def test_density_histogram_sparse_data() -> None:
+    aabb = np.array([[0, 0, 0], [100, 100, 10]], dtype=np.float64)
+    histogram = DensityHistogram(aabb)
+    # a corridor along the diagonal
+    t = np.linspace(0, 100, 10_000, dtype=np.float32)
+    histogram.add_points(np.column_stack([t, t, np.full_like(t, 5)]))
+
+    assert 1 / 16 <= histogram.spacing_factor() < 0.5
+    assert 3 < histogram.grid_initial_cell_count(3) <= 8
+    # the empty part of the aabb uses the default rule
+    empty_aabb = np.array([[75, 0, 0], [100, 25, 10]], dtype=np.float64)
+    assert histogram.occupied_size(empty_aabb) is None
+    assert histogram.subdivision_type(empty_aabb) == SubdivisionType.QUADTREE
+
+
+def test_density_histogram_empty() -> None:
+    histogram = DensityHistogram(np.array([[0, 0, 0], [10, 10, 10]], dtype=np.float64))
+    assert histogram.spacing_factor() == 1.0
+    assert histogram.grid_initial_cell_count(3) == 3
+
+
+def test_density_histogram_from_portions() -> None:
+    path = DATA_DIRECTORY / "ripple.las"
+    metadata = READER_MAP[".las"].get_metadata(path)
+    aabb = metadata["aabb"]
+    offset_scale = (-aabb[0], np.array([1.0, 1.0, 1.0]), None, None)
+
+    histogram = DensityHistogram.from_portions(
+        aabb - aabb[0], metadata["portions"], offset_scale, None, 1_000
+    )
+
+    assert 0 < histogram.sampled_point_count <= metadata["point_count"]
+    assert histogram.counts.sum() == histogram.sampled_point_count
+
+
+def test_density_histogram_subdivision_cost_model() -> None:
+    aabb = np.array([[0, 0, 0], [100, 100, 100]], dtype=np.float64)
+    rng = np.random.default_rng(0)
+
+    # points filling the whole volume: the octree gives smaller children
+    volume = DensityHistogram(aabb)
+    volume.add_points(rng.uniform(0, 100, (100_000, 3)).astype(np.float32))
+    assert volume.subdivision_type(aabb) == SubdivisionType.OCTREE
+
+    # a flat city with a few towers: the aabb is cubic, but an octree
+    # would make small tiles with the top of the towers
+    city = DensityHistogram(aabb)
+    city.add_points(
+        rng.uniform([0, 0, 0], [100, 100, 1], (100_000, 3)).astype(np.float32)
+    )
+    for x, y in [(10, 10), (70, 20), (40, 80), (85, 85)]:
+        city.add_points(
+            rng.uniform([x, y, 0], [x + 5, y + 5, 100], (1_000, 3)).astype(np.float32)
+        )
+    assert city.subdivision_type(aabb) == SubdivisionType.QUADTREE
+
+
+def test_subdivision_cost() -> None:
+    balanced_quadtree = np.array([25, 25, 25, 25], dtype=np.uint64)
+    balanced_octree = np.array([12, 13, 12, 13, 12, 13, 12, 13], dtype=np.uint64)
+    assert subdivision_cost(balanced_octree) < subdivision_cost(balanced_quadtree)
+
+    sparse_octree = np.array([24, 1, 24, 1, 24, 1, 24, 1], dtype=np.uint64)
+    assert subdivision_cost(sparse_octree) > subdivision_cost(balanced_quadtree)
+    assert subdivision_cost(np.zeros(4, dtype=np.uint64)) == 0
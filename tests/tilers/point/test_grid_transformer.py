@@ -0,0 +1,42 @@
+import pickle
+
+import numpy as np
+from pyproj import CRS, Transformer
+
+from py3dtiles.tilers.point.grid_transformer import GridTransformer
+
+
+def test_grid_transformer_error_bound() -> None:
+    transformer = Transformer.from_crs(CRS.from_epsg(3949), CRS.from_epsg(4978))
+    aabb = np.array([[1_700_000, 8_200_000, 0], [1_705_000, 8_202_000, 200]])
+
+    grid_transformer = GridTransformer.from_transformer(transformer, aabb, 0.001)
+    assert grid_transformer is not None
+    # the longest axes are divided first
+    node_counts = grid_transformer.values.shape[:3]
+    assert node_counts[0] > node_counts[1] > node_counts[2] >= 2
+
+    rng = np.random.default_rng(42)
+    points = aabb[0] + rng.random((100_000, 3)) * (aabb[1] - aabb[0])
+    expected = np.array(transformer.transform(points[:, 0], points[:, 1], points[:, 2]))
+    approximated = np.array(
+        grid_transformer.transform(points[:, 0], points[:, 1], points[:, 2])
+    )
+    assert np.max(np.linalg.norm(approximated - expected, axis=0)) < 0.001
+
+    # the grid is sent to the workers
+    unpickled = pickle.loads(pickle.dumps(grid_transformer))
+    assert np.array_equal(
+        np.array(unpickled.transform(points[:, 0], points[:, 1], points[:, 2])),
+        approximated,
+    )
+
+
+def test_grid_transformer_unreachable_tolerance() -> None:
+    transformer = Transformer.from_crs(CRS.from_epsg(3949), CRS.from_epsg(4978))
+    aabb = np.array([[1_700_000, 8_200_000, 0], [1_800_000, 8_300_000, 200]])
+
+    assert (
+        GridTransformer.from_transformer(transformer, aabb, 1e-6, max_node_count=1000)
+        is None
+    )
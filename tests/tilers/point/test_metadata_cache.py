@@ -0,0 +1,50 @@
+import os
+import shutil
+from pathlib import Path
+
+from numpy.testing import assert_array_equal
+from pytest import MonkeyPatch
+
+from py3dtiles.reader import xyz_reader
+from py3dtiles.tilers.point.metadata_cache import MetadataCache
+
+DATA_DIRECTORY = Path(__file__).parent.parent.parent / "fixtures"
+
+
+def test_metadata_cache(tmp_dir: Path, monkeypatch: MonkeyPatch) -> None:
+    path = tmp_dir.resolve() / "simple.xyz"
+    shutil.copy(DATA_DIRECTORY / "simple.xyz", path)
+    cache = MetadataCache(tmp_dir.resolve() / "cache")
+    assert cache.get(path) is None
+
+    metadata = xyz_reader.get_metadata(path)
+    cache.put(path, metadata)
+    cached_metadata = cache.get(path)
+    assert cached_metadata is not None
+    assert cached_metadata["portions"] == metadata["portions"]
+    assert_array_equal(cached_metadata["aabb"], metadata["aabb"])
+    assert cached_metadata["point_count"] == metadata["point_count"]
+
+    # the portions use the path given to get
+    monkeypatch.chdir(tmp_dir)
+    cached_metadata = cache.get(Path("simple.xyz"))
+    assert cached_metadata is not None
+    assert [filename for filename, _ in cached_metadata["portions"]] == ["simple.xyz"]
+
+    # the entry is invalidated when the file changes
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.get(path) is None
+    cache.put(path, metadata)
+    with path.open("a") as f:
+        f.write("281346 369124 1\n")
+    assert cache.get(path) is None
+
+
+def test_metadata_cache_corrupted_entry(tmp_dir: Path) -> None:
+    path = DATA_DIRECTORY / "simple.xyz"
+    cache = MetadataCache(tmp_dir / "cache")
+    cache.put(path, xyz_reader.get_metadata(path))
+    for entry in (tmp_dir / "cache").iterdir():
+        entry.write_bytes(b"not a pickle")
+    assert cache.get(path) is None
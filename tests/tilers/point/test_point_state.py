@@ -0,0 +1,57 @@
+from py3dtiles.tilers.point.point_state import (
+    MAX_POINT_IN_PROGRESS,
+    MIN_POINT_IN_PROGRESS,
+    PointState,
+)
+
+
+def test_balance_jobs_reading_bottleneck() -> None:
+    state = PointState([("a.laz", (0, 10))] * 10, 2, 4)
+    state.number_of_reading_jobs = 2
+
+    # the processing jobs are starving while all the readers are busy
+    state.balance_jobs(400_000, 0.1)
+    assert state.max_reading_jobs == 3
+    state.number_of_reading_jobs = 3
+    state.balance_jobs(400_000, 0.1)
+    # one job is left to the processing
+    assert state.max_reading_jobs == 3
+
+    # no more portion to read
+    state.point_cloud_file_parts.clear()
+    state.number_of_reading_jobs = 3
+    state.reading_jobs_limit = 8
+    state.balance_jobs(400_000, 0.1)
+    assert state.max_reading_jobs == 3
+
+
+def test_balance_jobs_processing_bottleneck() -> None:
+    state = PointState([("a.las", (0, 10))] * 10, 3, 8)
+    for i in range(20):
+        state.add_tasks_to_process(str(i).encode(), b"", 100_000)
+
+    state.balance_jobs(400_000, 0.1)
+    assert state.max_reading_jobs == 2
+    state.balance_jobs(400_000, 0.1)
+    state.balance_jobs(400_000, 0.1)
+    # at least one reading job is kept
+    assert state.max_reading_jobs == 1
+
+
+def test_balance_jobs_memory_pressure() -> None:
+    state = PointState([("a.las", (0, 10))], 1, 2)
+    assert state.max_point_in_progress == MAX_POINT_IN_PROGRESS
+
+    for _ in range(10):
+        state.balance_jobs(0, 1.5)
+    assert state.max_point_in_progress == MIN_POINT_IN_PROGRESS
+
+    # the ceiling isn't changed near the memory limit
+    state.balance_jobs(0, 0.8)
+    assert state.max_point_in_progress == MIN_POINT_IN_PROGRESS
+
+    state.balance_jobs(0, 0.2)
+    assert state.max_point_in_progress == 2 * MIN_POINT_IN_PROGRESS
+    for _ in range(20):
+        state.balance_jobs(0, 0.2)
+    assert state.max_point_in_progress == MAX_POINT_IN_PROGRESS
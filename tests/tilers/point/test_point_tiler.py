@@ -0,0 +1,97 @@
+import time
+from pathlib import Path
+from typing import Union
+from unittest.mock import patch
+
+import numpy as np
+
+from py3dtiles.reader import las_reader
+from py3dtiles.tilers.point.point_tiler import PointTiler
+from py3dtiles.tilers.point.tiling_profile import get_tiling_profile
+from py3dtiles.typing import MetadataReaderType, PortionsType
+
+DATA_DIRECTORY = Path(__file__).parent.parent.parent / "fixtures"
+
+
+def test_get_file_info_keeps_the_file_order(tmp_dir: Path) -> None:
+    files: list[Union[str, Path]] = [
+        DATA_DIRECTORY / "ripple.las",
+        DATA_DIRECTORY / "with_srs_3857.las",
+    ]
+    tiler = PointTiler(
+        tmp_dir,
+        files,
+        None,
+        False,
+        False,
+        True,
+        True,
+        True,
+        None,
+        100,
+        0,
+        get_tiling_profile("default"),
+    )
+
+    get_metadata = las_reader.get_metadata
+
+    def slow_first_file(path: Path, fraction: int = 100) -> MetadataReaderType:
+        # the first file is scanned after the second one
+        if path == files[0]:
+            time.sleep(0.5)
+        return get_metadata(path, fraction)
+
+    with patch.object(las_reader, "get_metadata", side_effect=slow_first_file):
+        file_info = tiler.get_file_info(None, force_crs_in=True)
+
+    assert [filename for filename, _ in file_info["portions"]] == [
+        str(file) for file in files
+    ]
+    assert file_info["point_count"] == sum(
+        get_metadata(Path(file))["point_count"] for file in files
+    )
+
+
+def test_order_portions_along_the_morton_curve(tmp_dir: Path) -> None:
+    tiler = PointTiler(
+        tmp_dir,
+        [DATA_DIRECTORY / "ripple.las"],
+        None,
+        False,
+        False,
+        True,
+        True,
+        True,
+        None,
+        100,
+        0,
+        get_tiling_profile("default"),
+    )
+    # 4 tiles of a 2x2 grid, listed row by row, the top right one being split in 2 portions
+    file_aabbs = {
+        "a": np.array([[0.0, 0.0, 0.0], [1.0, 1.0, 0.1]]),
+        "b": np.array([[1.0, 0.0, 0.0], [2.0, 1.0, 0.1]]),
+        "c": np.array([[0.0, 1.0, 0.0], [1.0, 2.0, 0.1]]),
+        "d": np.array([[1.0, 1.0, 0.0], [2.0, 2.0, 0.1]]),
+    }
+    tiler.file_info = {"aabb": np.array([[0.0, 0.0, 0.0], [2.0, 2.0, 0.1]])}
+    portions: PortionsType = [
+        ("a", (0, 10)),
+        ("b", (0, 10)),
+        ("c", (0, 10)),
+        ("d", (0, 5)),
+        ("d", (5, 10)),
+    ]
+
+    ordered_portions = tiler.order_portions(portions, file_aabbs)
+
+    # the portions are popped from the end: a, c (the other tile with x < 1), b, d
+    assert ordered_portions == [
+        ("d", (0, 5)),
+        ("d", (5, 10)),
+        ("b", (0, 10)),
+        ("c", (0, 10)),
+        ("a", (0, 10)),
+    ]
+    # a single file is kept as it is
+    assert tiler.order_portions(portions[3:], file_aabbs) == portions[3:]
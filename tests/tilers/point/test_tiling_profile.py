@@ -0,0 +1,36 @@
+from pytest import raises
+
+from py3dtiles.exceptions import TilerException
+from py3dtiles.tilers.point.tiling_profile import (
+    DEFAULT_TILING_PROFILE,
+    TILING_PROFILES,
+    TilingProfile,
+    get_tiling_profile,
+)
+
+
+def test_get_process_depth() -> None:
+    expected_depths = {
+        b"": 0,
+        b"1": 1,
+        b"12": 1,
+        b"123": 2,
+        b"1234": 2,
+        b"12345": 3,
+        b"123456": 3,
+        b"1234567": 5,
+        b"123456701": 5,
+    }
+    for name, depth in expected_depths.items():
+        assert DEFAULT_TILING_PROFILE.get_process_depth(name) == depth
+
+
+def test_get_tiling_profile() -> None:
+    assert get_tiling_profile(None) is DEFAULT_TILING_PROFILE
+    assert get_tiling_profile("web") is TILING_PROFILES["web"]
+
+    profile = TilingProfile(node_max_point_count=42)
+    assert get_tiling_profile(profile) is profile
+
+    with raises(TilerException, match="Unknown tiling profile"):
+        get_tiling_profile("unknown")